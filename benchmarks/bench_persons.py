@@ -0,0 +1,274 @@
+import io
+import json
+import os
+import tracemalloc
+from itertools import count
+
+import pytest
+
+from benchmarks.payloads import fill_table, make_API_results
+from benchmarks.randomuser_stub import MAX_RESULTS as MAX_API_RESULTS
+from benchmarks.randomuser_stub import RandomUserStub
+from persons_table import models
+from persons_table.config import API_SLICE_SIZE, ENTRIES_PER_PAGE, INGEST_CHUNK_SIZE
+from persons_table.disk_cache import APIResponseCache
+from persons_table.models import (
+    STAT_DIMENSIONS,
+    DatabaseHandler,
+    Person,
+    bulk_insert_into_db,
+    db,
+    iter_API_results,
+    iter_chunks,
+    serialize_API_data,
+    serialize_API_rows,
+)
+
+STUB_LATENCY = 0.05
+
+# ---------- Benchmarking working with API data and Database functionality ----------- #
+
+
+def bench_serialize_API_data(benchmark, rows):
+    API_results = make_API_results(rows)
+    result = benchmark(serialize_API_data, API_results)
+    assert len(result) == rows
+
+
+def bench_bulk_insert_into_db(benchmark, rows, empty_app):
+    def setup():
+        db.session.query(Person).delete()
+        db.session.commit()
+        return (serialize_API_data(make_API_results(rows)),), {}
+
+    benchmark.pedantic(bulk_insert_into_db, setup=setup, rounds=3)
+    assert DatabaseHandler.count_entries() == rows
+
+
+def bench_rerecord_data_grow(benchmark, rows, empty_app, monkeypatch):
+    # Every response gets new emails, so no entries are dropped as duplicates
+    response_numbers = count()
+    monkeypatch.setattr(
+        models,
+        "open_API_response",
+        lambda quantity, seed=None, page=None: io.BytesIO(
+            json.dumps(
+                {"results": make_API_results(quantity, next(response_numbers) * 10**7)}
+            ).encode()
+        ),
+    )
+
+    def setup():
+        DatabaseHandler.rerecord_data(rows // 2)
+        return (rows,), {}
+
+    benchmark.pedantic(DatabaseHandler.rerecord_data, setup=setup, rounds=3)
+    assert DatabaseHandler.count_entries() == rows
+
+
+def bench_rerecord_data_grow_through_stub(benchmark, rows, empty_app, monkeypatch):
+    with RandomUserStub(latency=STUB_LATENCY) as stub:
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+
+        def setup():
+            DatabaseHandler.rerecord_data(0)
+            return (min(rows, MAX_API_RESULTS),), {}
+
+        stats = benchmark.pedantic(DatabaseHandler.rerecord_data, setup=setup, rounds=3)
+    assert DatabaseHandler.count_entries() == min(rows, MAX_API_RESULTS)
+    benchmark.extra_info["ingestion_pipeline"] = stats
+
+
+def measure_peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_parse_API_response_whole(benchmark, rows, monkeypatch):
+    quantity = min(rows, MAX_API_RESULTS)
+    with RandomUserStub() as stub:
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+
+        def collect():
+            serialize_API_rows(
+                models.get_API_response(quantity, seed="bench")["results"]
+            )
+
+        benchmark(collect)
+        benchmark.extra_info["peak_memory_bytes"] = measure_peak_memory(collect)
+
+
+def bench_parse_API_response_streaming(benchmark, rows, monkeypatch):
+    quantity = min(rows, MAX_API_RESULTS)
+    with RandomUserStub() as stub:
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+
+        def collect():
+            API_results = iter_API_results(quantity, seed="bench")
+            for API_data_chunk in iter_chunks(API_results, INGEST_CHUNK_SIZE):
+                serialize_API_rows(API_data_chunk)
+
+        benchmark(collect)
+        benchmark.extra_info["peak_memory_bytes"] = measure_peak_memory(collect)
+
+
+# Numbers of processes serializing API data, scaling efficiency is reported against 1
+SERIALIZE_PROCESSES = sorted({1, 2, 4, os.cpu_count() or 1})
+# Parallel serialization only pays off when there are many pages of API data
+PARALLEL_MIN_ROWS = 20 * INGEST_CHUNK_SIZE
+single_process_means = {}
+
+
+@pytest.mark.parametrize(
+    "processes", SERIALIZE_PROCESSES, ids=lambda processes: f"{processes}_processes"
+)
+def bench_rerecord_data_grow_in_parallel(
+    benchmark, rows, processes, empty_app, monkeypatch, tmp_path_factory
+):
+    quantity = max(rows, PARALLEL_MIN_ROWS)
+    # Pages are parsed from a shared on-disk cache, so the stub in this process
+    # is not a bottleneck and workers do nothing but parsing and serialization
+    cache_dir = tmp_path_factory.getbasetemp() / f"api_cache_{quantity}"
+    monkeypatch.setattr(
+        models, "api_response_cache", APIResponseCache(str(cache_dir), 10**10)
+    )
+    with RandomUserStub() as stub:
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+
+        def setup():
+            DatabaseHandler.rerecord_data(0)
+            return (quantity,), {"processes": processes, "seed": "bench"}
+
+        benchmark.pedantic(
+            DatabaseHandler.rerecord_data, setup=setup, rounds=3, warmup_rounds=1
+        )
+    assert DatabaseHandler.count_entries() == quantity
+
+    if benchmark.disabled:
+        return
+    mean = benchmark.stats.stats.mean
+    if processes == 1:
+        single_process_means[quantity] = mean
+    if quantity in single_process_means:
+        speedup = single_process_means[quantity] / mean
+        benchmark.extra_info["speedup"] = speedup
+        benchmark.extra_info["scaling_efficiency"] = speedup / processes
+
+
+def bench_rerecord_data_shrink(benchmark, rows, empty_app):
+    def setup():
+        fill_table(rows - DatabaseHandler.count_entries())
+        return (rows // 2,), {}
+
+    benchmark.pedantic(DatabaseHandler.rerecord_data, setup=setup, rounds=3)
+    assert DatabaseHandler.count_entries() == rows // 2
+
+
+def bench_delete_person_one_by_one(benchmark, rows, empty_app):
+    def setup():
+        fill_table(rows - DatabaseHandler.count_entries())
+        return (), {}
+
+    def delete_all():
+        for (person_id,) in db.session.query(Person.id).all():
+            DatabaseHandler.delete_person(person_id)
+
+    benchmark.pedantic(delete_all, setup=setup, rounds=3)
+    assert DatabaseHandler.count_entries() == 0
+
+
+def bench_delete_people(benchmark, rows, empty_app):
+    def setup():
+        fill_table(rows - DatabaseHandler.count_entries())
+        return ([person_id for person_id, in db.session.query(Person.id)],), {}
+
+    benchmark.pedantic(DatabaseHandler.delete_people, setup=setup, rounds=3)
+    assert DatabaseHandler.count_entries() == 0
+
+
+def bench_update_people(benchmark, rows, populated_app):
+    people_data = [
+        {"id": person_id, "first_name": f"Name{person_id}"}
+        for person_id, in db.session.query(Person.id)
+    ]
+    assert benchmark(DatabaseHandler.update_people, people_data) == rows
+
+
+def bench_paginate_first_page(benchmark, populated_app):
+    query = DatabaseHandler.all_records_query()
+    page = benchmark(query.paginate, 1, ENTRIES_PER_PAGE, True)
+    assert page.items
+
+
+def bench_paginate_last_page(benchmark, populated_app):
+    query = DatabaseHandler.all_records_query()
+    last_page = -(-DatabaseHandler.count_entries() // ENTRIES_PER_PAGE)
+    page = benchmark(query.paginate, last_page, ENTRIES_PER_PAGE, True)
+    assert page.items
+
+
+def bench_generate_random_person_id(benchmark, populated_app):
+    random_id = benchmark(DatabaseHandler.generate_random_person_id)
+    assert random_id
+
+
+def bench_get_stats(benchmark, populated_app):
+    stats = benchmark(DatabaseHandler.get_stats)
+    assert (
+        sum(entries for _, entries in stats["gender"])
+        == DatabaseHandler.count_entries()
+    )
+
+
+def bench_count_stats_with_group_by(benchmark, populated_app):
+    """Counts the same numbers as 'DatabaseHandler.get_stats' reads, over the whole table"""
+
+    def count_stats():
+        return {
+            dimension: db.session.query(value, db.func.count())
+            .filter(Person.deleted_at.is_(None))
+            .group_by(value)
+            .all()
+            for dimension, value in STAT_DIMENSIONS.items()
+        }
+
+    stats = benchmark(count_stats)
+    assert (
+        sum(entries for _, entries in stats["gender"])
+        == DatabaseHandler.count_entries()
+    )
+
+
+# ------------ Benchmarking Flask Rendering ---------------- #
+
+
+def bench_render_index_page(benchmark, populated_app):
+    client = populated_app.test_client()
+    rv = benchmark(client.get, "/index/1")
+    assert rv.status_code == 200
+
+
+def bench_render_index_page_gzip(benchmark, populated_app):
+    client = populated_app.test_client()
+    rv = benchmark(client.get, "/index/1", headers={"Accept-Encoding": "gzip"})
+    assert rv.headers["Content-Encoding"] == "gzip"
+
+
+def bench_serve_last_slice_after_id(benchmark, populated_app):
+    """Serves the last slice of the scrolling table following the id of the previous one"""
+    client = populated_app.test_client()
+    offset = DatabaseHandler.count_entries() - API_SLICE_SIZE
+    after = DatabaseHandler.get_people_slice(1, offset=offset - 1)[0].id
+    rv = benchmark(client.get, f"/api/persons?after={after}")
+    assert rv.get_json()["persons"]
+
+
+def bench_serve_last_slice_by_offset(benchmark, populated_app):
+    client = populated_app.test_client()
+    offset = DatabaseHandler.count_entries() - API_SLICE_SIZE
+    rv = benchmark(client.get, f"/api/persons?offset={offset}")
+    assert rv.get_json()["persons"]
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from benchmarks.payloads import fill_table
+from persons_table import create_app
+from persons_table.models import DatabaseHandler, db
+
+# Comma separated numbers of rows, e.g. BENCHMARK_ROWS=1000,100000,1000000
+ROW_COUNTS = [int(rows) for rows in os.environ.get("BENCHMARK_ROWS", "1000").split(",")]
+
+
+def make_app(database_uri):
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    app.config["WTF_CSRF_ENABLED"] = False
+    return app
+
+
+@pytest.fixture(scope="session", params=ROW_COUNTS, ids=lambda rows: f"{rows}_rows")
+def rows(request):
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def populated_database_uri(rows, tmp_path_factory):
+    """Creates a database with a requested number of rows once per session"""
+    database_path = tmp_path_factory.mktemp("databases") / f"persons_{rows}.db"
+    database_uri = f"sqlite:///{database_path}"
+    with make_app(database_uri).app_context():
+        DatabaseHandler.create_table()
+        fill_table(rows)
+    return database_uri
+
+
+@pytest.fixture
+def populated_app(populated_database_uri):
+    app = make_app(populated_database_uri)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def empty_app(tmp_path):
+    app = make_app(f"sqlite:///{tmp_path / 'persons.db'}")
+    with app.app_context():
+        DatabaseHandler.create_table()
+        yield app
+        db.session.remove()
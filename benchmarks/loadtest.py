@@ -0,0 +1,307 @@
+"""HTTP load test of the persons app.
+
+Launches the app under each server configuration from a config file against a
+seeded SQLite database and a local randomuser.me stand-in, drives a weighted mix
+of routes and flows from concurrent clients, and reports throughput and
+p50/p95/p99 latency per route.
+
+Usage:
+    python -m benchmarks.loadtest --config benchmarks/loadtest.json --servers dev gunicorn
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from itertools import count
+from random import Random
+from statistics import quantiles
+
+import requests
+
+from benchmarks.payloads import fill_table
+from benchmarks.randomuser_stub import RandomUserStub
+from persons_table import create_app
+from persons_table.config import ENTRIES_PER_PAGE
+from persons_table.models import DatabaseHandler
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSRF_TOKEN_PATTERN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+VERSION_PATTERN = re.compile(r'name="version" type="hidden" value="(\d*)"')
+READY_TIMEOUT = 30
+
+
+def find_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_database(database_path, rows):
+    """Creates an SQLite database with a number of generated entries"""
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database_path}"
+    with app.app_context():
+        DatabaseHandler.create_table()
+        fill_table(rows)
+
+
+class Scenario:
+    """This is a class to pick and run requests of a weighted routes mix.
+    Reads and edits use the lower half of ids, deletes consume the upper half,
+    so reads never hit deleted entries.
+
+    :param base_url: URL of a running app
+    :type base_url: str
+    :param routes: routes from the config file
+    :type routes: list[dict, ...]
+    :param rows: number of entries in the database
+    :type rows: int
+    :param pic_link: link to an image to submit in edit forms
+    :type pic_link: str
+    """
+
+    def __init__(self, base_url, routes, rows, pic_link):
+        self.base_url = base_url
+        self.routes = routes
+        self.weights = [route["weight"] for route in routes]
+        self.pages = max(1, -(-rows // ENTRIES_PER_PAGE))
+        self.read_ids = max(1, rows // 2)
+        self.pic_link = pic_link
+        self._ids_to_delete = count(rows, -1)
+        self._lock = threading.Lock()
+
+    def run_one(self, session, rng):
+        """Runs one randomly picked request or flow.
+
+        :return: route name, latency in seconds and whether it succeeded
+        :rtype: tuple[str, float, bool]
+        """
+        route = rng.choices(self.routes, self.weights)[0]
+        started_at = time.perf_counter()
+        try:
+            if route.get("flow") == "edit":
+                ok = self._edit(session, rng)
+            elif route.get("flow") == "delete":
+                ok = self._delete(session)
+            else:
+                path = route["path"].format(
+                    page=rng.randint(1, self.pages),
+                    person_id=rng.randint(1, self.read_ids),
+                )
+                ok = self._get(session, path).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return route["name"], time.perf_counter() - started_at, ok
+
+    def _get(self, session, path):
+        return session.get(self.base_url + path, allow_redirects=False)
+
+    def _edit(self, session, rng):
+        path = f"/edit-person/{rng.randint(1, self.read_ids)}"
+        page = self._get(session, path)
+        match = CSRF_TOKEN_PATTERN.search(page.text)
+        if page.status_code != 200 or not match:
+            return False
+        form = {
+            "csrf_token": match.group(1),
+            "first_name": "Load",
+            "last_name": f"Test{rng.randrange(1000)}",
+            "gender": "female",
+            "cell": "(000)-000-0000",
+            "email": f"load.test{rng.randrange(10 ** 6)}@example.com",
+            "location": "Denton, United States",
+            "pic_link": self.pic_link,
+        }
+        version = VERSION_PATTERN.search(page.text)
+        if version:
+            form["version"] = version.group(1)
+        rv = session.post(self.base_url + path, data=form, allow_redirects=False)
+        # Another client editing the same entry in between is a conflict, not an error
+        return rv.status_code in (302, 409)
+
+    def _delete(self, session):
+        with self._lock:
+            person_id = next(self._ids_to_delete)
+        if person_id <= self.read_ids:
+            return True
+        return self._get(session, f"/delete-person/{person_id}").status_code < 400
+
+
+def drive_load(scenario, concurrency, duration, seed=0):
+    """Runs the scenario from concurrent clients for a number of seconds.
+
+    :return: list of (route name, latency, ok) tuples and elapsed seconds
+    :rtype: tuple[list[tuple], float]
+    """
+    results = []
+    results_lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(client_number):
+        rng = Random(seed * 1000 + client_number)
+        client_results = []
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                client_results.append(scenario.run_one(session, rng))
+        with results_lock:
+            results.extend(client_results)
+
+    started_at = time.perf_counter()
+    clients = [
+        threading.Thread(target=client, args=(number,)) for number in range(concurrency)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return results, time.perf_counter() - started_at
+
+
+def summarize(results, elapsed):
+    """Aggregates results per route.
+
+    :return: statistics per route name, 'total' included
+    :rtype: dict
+    """
+    by_route = {}
+    for route_name, latency, ok in results:
+        for name in (route_name, "total"):
+            by_route.setdefault(name, {"latencies": [], "errors": 0})
+            by_route[name]["latencies"].append(latency)
+            by_route[name]["errors"] += not ok
+
+    summary = {}
+    for name, data in by_route.items():
+        latencies = sorted(data["latencies"])
+        percentiles = (
+            quantiles(latencies, n=100, method="inclusive")
+            if len(latencies) > 1
+            else latencies * 99
+        )
+        summary[name] = {
+            "requests": len(latencies),
+            "errors": data["errors"],
+            "throughput": len(latencies) / elapsed,
+            "p50_ms": percentiles[49] * 1000,
+            "p95_ms": percentiles[94] * 1000,
+            "p99_ms": percentiles[98] * 1000,
+        }
+    return summary
+
+
+def print_summary(server_name, summary):
+    print(f"\n== {server_name}")
+    print(
+        f"{'route':<16}{'requests':>10}{'errors':>8}{'req/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for name in sorted(summary, key=lambda name: name == "total"):
+        stats = summary[name]
+        print(
+            f"{name:<16}{stats['requests']:>10}{stats['errors']:>8}"
+            f"{stats['throughput']:>10.1f}{stats['p50_ms']:>10.1f}"
+            f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+        )
+
+
+class AppServer:
+    """This is a class to launch the app with a server command from the config file
+    and wait until it answers requests.
+    """
+
+    def __init__(self, server_config, env):
+        self.port = find_free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.command = [
+            part.format(port=self.port) for part in server_config["command"]
+        ]
+        self.env = {**os.environ, **env, **server_config.get("env", {})}
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            self.command, cwd=REPO_ROOT, env=self.env, stdout=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited: {' '.join(self.command)}")
+            try:
+                requests.get(self.url, timeout=1)
+                return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f"Server is not ready in {READY_TIMEOUT}s")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--config", default=os.path.join(REPO_ROOT, "benchmarks", "loadtest.json")
+    )
+    parser.add_argument("--servers", nargs="+", help="defaults to all in the config")
+    parser.add_argument("--duration", type=float)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--rows", type=int)
+    parser.add_argument("--output", help="file to save results to as JSON")
+    args = parser.parse_args()
+
+    with open(args.config) as config_file:
+        config = json.load(config_file)
+    duration = args.duration or config["duration"]
+    concurrency = args.concurrency or config["concurrency"]
+    rows = args.rows or config["database_rows"]
+    servers = args.servers or list(config["servers"])
+
+    all_results = {}
+    with tempfile.TemporaryDirectory() as work_dir, RandomUserStub() as stub:
+        template_database = os.path.join(work_dir, "template.db")
+        seed_database(template_database, rows)
+
+        for server_name in servers:
+            database = os.path.join(work_dir, f"{server_name}.db")
+            shutil.copy(template_database, database)
+            env = {
+                "DATABASE_URL": f"sqlite:///{database}",
+                "RANDOMUSER_API_URL": stub.url,
+            }
+            with AppServer(config["servers"][server_name], env) as server:
+                scenario = Scenario(
+                    server.url,
+                    config["routes"],
+                    rows,
+                    f"{stub.base_url}/api/portraits/women/1.jpg",
+                )
+                drive_load(scenario, concurrency, config["warmup"], seed=1)
+                results, elapsed = drive_load(scenario, concurrency, duration)
+            all_results[server_name] = summarize(results, elapsed)
+            print_summary(server_name, all_results[server_name])
+
+    if len(all_results) > 1:
+        print("\n== comparison (all routes)")
+        for server_name, summary in all_results.items():
+            total = summary["total"]
+            print(
+                f"{server_name:<16}{total['throughput']:>10.1f} req/s"
+                f"{total['p50_ms']:>10.1f} p50 ms{total['p99_ms']:>10.1f} p99 ms"
+            )
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(all_results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from itertools import cycle, islice
+
+from sqlalchemy import func
+
+from persons_table.models import Person, bulk_insert_into_db, db, serialize_API_data
+from tests.mock_json import mock_json
+
+FILL_CHUNK_SIZE = 10000
+
+
+def make_API_results(quantity, offset=0):
+    """Generates a list of people data in randomuser.me API format.
+    Records are taken from the mocked API response in a loop and get unique emails,
+    so any number of them can be produced without network access.
+
+    :param quantity: number of records to generate
+    :type quantity: int
+    :param offset: number to start numbering of emails from, defaults to 0
+    :type offset: int, optional
+
+    :return: list of people data as in 'results' of API response
+    :rtype: list[dict, ...]
+    """
+    API_results = []
+    templates = islice(cycle(mock_json["results"]), quantity)
+    for number, person_data in enumerate(templates, start=offset):
+        person_data = dict(person_data)
+        person_data["email"] = f"{number}.{person_data['email']}"
+        API_results.append(person_data)
+    return API_results
+
+
+def fill_table(quantity):
+    """Inserts a number of generated entries to the Person table in chunks.
+    Emails are numbered after the last id, so they never repeat emails of entries
+    inserted before. Must be called within an app context.
+
+    :param quantity: number of entries to insert
+    :type quantity: int
+    """
+    first_number = db.session.query(func.max(Person.id)).scalar() or 0
+    for offset in range(0, quantity, FILL_CHUNK_SIZE):
+        chunk_size = min(FILL_CHUNK_SIZE, quantity - offset)
+        API_results = make_API_results(chunk_size, first_number + offset)
+        bulk_insert_into_db(serialize_API_data(API_results))
@@ -0,0 +1,272 @@
+"""Local stand-in for randomuser.me API.
+
+Serves generated people data in randomuser.me format honouring 'inc', 'results',
+'seed' and 'page' parameters, with configurable latency, error rate and payload size.
+Same seed and page always give the same people. Portraits are served as tiny PNG files.
+
+Usage:
+    python -m benchmarks.randomuser_stub --port 8001 --latency 0.05 --error-rate 0.01
+    RANDOMUSER_API_URL=http://127.0.0.1:8001/api/ python wsgi.py
+"""
+
+import argparse
+import json
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from random import Random
+from urllib.parse import parse_qs, urlparse
+from uuid import UUID
+
+from tests.mock_json import mock_json
+
+MAX_RESULTS = 5000
+ALL_FIELDS = (
+    "gender",
+    "name",
+    "location",
+    "email",
+    "login",
+    "dob",
+    "registered",
+    "phone",
+    "cell",
+    "id",
+    "picture",
+    "nat",
+)
+
+
+def make_png():
+    """Returns bytes of a 1x1 grey PNG image"""
+
+    def chunk(chunk_type, data):
+        body = chunk_type + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"\x00\x80"))
+        + chunk(b"IEND", b"")
+    )
+
+
+PORTRAIT = make_png()
+
+
+class PeopleGenerator:
+    """This is a class to generate people data in randomuser.me format.
+    Names and locations are combined from the mocked API response.
+
+    :param base_url: URL of a server to build portrait links with
+    :type base_url: str
+    :param padding: number of extra bytes to add to every record, defaults to 0
+    :type padding: int, optional
+    """
+
+    def __init__(self, base_url, padding=0):
+        self.base_url = base_url.rstrip("/")
+        self.padding = padding
+        self.samples = mock_json["results"]
+
+    def generate(self, quantity, seed, page, fields):
+        """Generates a list of people data.
+
+        :param quantity: number of records to generate
+        :type quantity: int
+        :param seed: seed of a dataset
+        :type seed: str
+        :param page: page of a dataset
+        :type page: int
+        :param fields: fields to include in every record
+        :type fields: tuple[str, ...]
+
+        :return: list of people data as in 'results' of API response
+        :rtype: list[dict, ...]
+        """
+        rng = Random(f"{seed}-{page}")
+        return [self._make_person(rng, fields) for _ in range(quantity)]
+
+    def _make_person(self, rng, fields):
+        sample = rng.choice(self.samples)
+        gender = rng.choice(("female", "male"))
+        first_name = rng.choice(self.samples)["name"]["first"]
+        last_name = rng.choice(self.samples)["name"]["last"]
+        portrait = (
+            f"{'women' if gender == 'female' else 'men'}/{rng.randrange(100)}.jpg"
+        )
+        person_data = {
+            "gender": gender,
+            "name": {
+                "title": sample["name"]["title"],
+                "first": first_name,
+                "last": last_name,
+            },
+            "location": sample["location"],
+            "email": f"{first_name}.{last_name}@example.com".lower(),
+            "login": {
+                "uuid": str(UUID(int=rng.getrandbits(128), version=4)),
+                "username": f"{last_name}{rng.randrange(1000)}".lower(),
+            },
+            "dob": {"date": "1970-01-01T00:00:00.000Z", "age": rng.randrange(18, 80)},
+            "registered": {
+                "date": "2010-01-01T00:00:00.000Z",
+                "age": rng.randrange(12),
+            },
+            "phone": sample["cell"],
+            "cell": f"({rng.randrange(100, 1000)})-{rng.randrange(100, 1000)}-"
+            f"{rng.randrange(1000, 10000)}",
+            "id": {"name": "", "value": None},
+            "picture": {
+                "large": f"{self.base_url}/api/portraits/{portrait}",
+                "medium": f"{self.base_url}/api/portraits/med/{portrait}",
+                "thumbnail": f"{self.base_url}/api/portraits/thumb/{portrait}",
+            },
+            "nat": "US",
+        }
+        person_data = {field: person_data[field] for field in fields}
+        if self.padding:
+            person_data["padding"] = "x" * self.padding
+        return person_data
+
+
+class RandomUserStub:
+    """This is a class to run a local stand-in for randomuser.me API in a background thread.
+
+    :param host: host to bind, defaults to '127.0.0.1'
+    :type host: str, optional
+    :param port: port to bind, 0 picks a free one, defaults to 0
+    :type port: int, optional
+    :param latency: seconds to wait before every response, defaults to 0
+    :type latency: float, optional
+    :param error_rate: share of requests answered with error 500, defaults to 0
+    :type error_rate: float, optional
+    :param padding: number of extra bytes to add to every record, defaults to 0
+    :type padding: int, optional
+    """
+
+    def __init__(
+        self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, padding=0
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests_served = 0
+        self._error_rng = Random(0)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.generator = PeopleGenerator(self.base_url, padding)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self):
+        """URL to use as 'RANDOMUSER_API_URL'"""
+        return f"{self.base_url}/api/"
+
+    def start(self):
+        """Starts serving requests in a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving requests and closes the socket"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests_served += 1
+            return self._error_rng.random() < self.error_rate
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                url = urlparse(self.path)
+                if url.path.startswith("/api/portraits/"):
+                    self._send(200, PORTRAIT, "image/png")
+                elif url.path.rstrip("/") != "/api":
+                    self._send_json(404, {"error": "Not found"})
+                elif stub._should_fail():
+                    self._send_json(500, {"error": "Uh oh, something has gone wrong."})
+                else:
+                    self._send_json(200, self._make_API_response(parse_qs(url.query)))
+
+            def _make_API_response(self, query):
+                results = min(int(query.get("results", ["1"])[0]), MAX_RESULTS)
+                seed = query.get("seed", [f"{Random().getrandbits(64):016x}"])[0]
+                page = int(query.get("page", ["1"])[0])
+                included = query.get("inc", [",".join(ALL_FIELDS)])[0]
+                fields = tuple(
+                    field
+                    for field in (field.strip() for field in included.split(","))
+                    if field in ALL_FIELDS
+                )
+                return {
+                    "results": stub.generator.generate(results, seed, page, fields),
+                    "info": {
+                        "seed": seed,
+                        "results": results,
+                        "page": page,
+                        "version": "1.3",
+                    },
+                }
+
+            def _send_json(self, status, data):
+                self._send(status, json.dumps(data).encode(), "application/json")
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0.0-1.0")
+    parser.add_argument("--padding", type=int, default=0, help="bytes per record")
+    args = parser.parse_args()
+
+    stub = RandomUserStub(
+        args.host, args.port, args.latency, args.error_rate, args.padding
+    )
+    print(f"Serving randomuser.me stand-in at {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Production serving settings, run with: gunicorn -c gunicorn.conf.py wsgi:app"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault("MIGRATE_ENABLED", "0")
+
+from persons_table.config import WORKER_THREADS
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = WORKER_THREADS
+# The app is imported once in the master process and shared by forked workers
+preload_app = True
+timeout = 60
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    """Drops database connections inherited from the master process,
+    so every worker opens its own ones. Parent's connections are left open to the master.
+    """
+    from persons_table import db
+    from wsgi import app
+
+    db.get_engine(app).dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """Closes pooled outbound HTTP connections of a worker"""
+    from persons_table import http_client
+
+    http_client.close()
@@ -0,0 +1,37 @@
+"""person version
+
+Revision ID: 2d8f6a1b7c35
+Revises: 9e4b7d3c2a61
+Create Date: 2026-10-19 12:20:53.174338
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2d8f6a1b7c35"
+down_revision = "9e4b7d3c2a61"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "person",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade():
+    # SQLite recreates the table without expression-based indexes, so it is dropped
+    # and created again around the batch
+    op.drop_index("ix_person_email_normalized", table_name="person")
+    with op.batch_alter_table("person") as batch_op:
+        batch_op.drop_column("version")
+    op.create_index(
+        "ix_person_email_normalized",
+        "person",
+        [sa.text("lower(trim(email))")],
+        unique=True,
+    )
@@ -0,0 +1,49 @@
+"""person stats
+
+Revision ID: 4b8e2f6c9d13
+Revises: 7a3c9e5d1b24
+Create Date: 2026-10-19 14:12:37.905214
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4b8e2f6c9d13"
+down_revision = "7a3c9e5d1b24"
+branch_labels = None
+depends_on = None
+
+
+def last_part(column, separator):
+    """Same as 'persons_table.models.last_part' in plain SQL"""
+    return (
+        f"trim(substr({column}, length(rtrim({column}, "
+        f"replace({column}, '{separator}', ''))) + 1))"
+    )
+
+
+def upgrade():
+    op.create_table(
+        "person_stat",
+        sa.Column("dimension", sa.String(length=20), nullable=False),
+        sa.Column("value", sa.String(length=200), nullable=False),
+        sa.Column("entries", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("dimension", "value"),
+    )
+    # Existing entries are counted once, later changes keep the numbers up to date
+    counts = " UNION ALL ".join(
+        f"SELECT '{dimension}', {value}, count(*) FROM person "
+        "WHERE deleted_at IS NULL GROUP BY 2"
+        for dimension, value in (
+            ("gender", "gender"),
+            ("country", last_part("location", ",")),
+            ("email_domain", f"lower({last_part('email', '@')})"),
+        )
+    )
+    op.execute(f"INSERT INTO person_stat (dimension, value, entries) {counts}")
+
+
+def downgrade():
+    op.drop_table("person_stat")
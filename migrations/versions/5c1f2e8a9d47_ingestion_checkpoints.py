@@ -0,0 +1,40 @@
+"""ingestion checkpoints
+
+Revision ID: 5c1f2e8a9d47
+Revises: b3b45615593e
+Create Date: 2026-10-19 10:12:41.318274
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5c1f2e8a9d47"
+down_revision = "b3b45615593e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ingestion_run",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("target_quantity", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("seed", sa.String(length=32), nullable=False),
+        sa.Column("page_size", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "ingestion_checkpoint",
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("page", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["run_id"], ["ingestion_run.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("run_id", "page"),
+    )
+
+
+def downgrade():
+    op.drop_table("ingestion_checkpoint")
+    op.drop_table("ingestion_run")
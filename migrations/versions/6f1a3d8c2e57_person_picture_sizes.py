@@ -0,0 +1,51 @@
+"""person picture sizes
+
+Revision ID: 6f1a3d8c2e57
+Revises: 4b8e2f6c9d13
+Create Date: 2026-10-19 16:05:12.418306
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6f1a3d8c2e57"
+down_revision = "4b8e2f6c9d13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "person", sa.Column("pic_medium_link", sa.String(length=500), nullable=True)
+    )
+    op.add_column(
+        "person", sa.Column("pic_thumbnail_link", sa.String(length=500), nullable=True)
+    )
+    # Smaller sizes of Randomuser.me portraits are at known paths next to the large ones
+    op.execute(
+        "UPDATE person SET "
+        "pic_medium_link = replace(pic_link, '/api/portraits/', '/api/portraits/med/'), "
+        "pic_thumbnail_link = replace(pic_link, '/api/portraits/', '/api/portraits/thumb/') "
+        "WHERE pic_link LIKE '%://randomuser.me/api/portraits/%' "
+        "AND pic_link NOT LIKE '%/api/portraits/med/%' "
+        "AND pic_link NOT LIKE '%/api/portraits/thumb/%'"
+    )
+
+
+def downgrade():
+    # SQLite recreates the table without expression-based indexes, so it is dropped
+    # and created again around the batch
+    op.drop_index("ix_person_email_normalized", table_name="person")
+    with op.batch_alter_table("person") as batch_op:
+        batch_op.drop_column("pic_thumbnail_link")
+        batch_op.drop_column("pic_medium_link")
+    op.create_index(
+        "ix_person_email_normalized",
+        "person",
+        [sa.text("lower(trim(email))")],
+        unique=True,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+        sqlite_where=sa.text("deleted_at IS NULL"),
+    )
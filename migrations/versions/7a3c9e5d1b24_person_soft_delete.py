@@ -0,0 +1,54 @@
+"""person soft delete
+
+Revision ID: 7a3c9e5d1b24
+Revises: 2d8f6a1b7c35
+Create Date: 2026-10-19 13:05:11.482906
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7a3c9e5d1b24"
+down_revision = "2d8f6a1b7c35"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("person", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    # Emails of deleted entries can be taken by new ones
+    op.drop_index("ix_person_email_normalized", table_name="person")
+    op.create_index(
+        "ix_person_email_normalized",
+        "person",
+        [sa.text("lower(trim(email))")],
+        unique=True,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+        sqlite_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_person_deleted_at",
+        "person",
+        ["deleted_at"],
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+        sqlite_where=sa.text("deleted_at IS NOT NULL"),
+    )
+
+
+def downgrade():
+    # Deleted entries would show up again, and their emails may be taken
+    op.execute("DELETE FROM person WHERE deleted_at IS NOT NULL")
+    op.drop_index("ix_person_deleted_at", table_name="person")
+    # SQLite recreates the table without expression-based indexes, so it is dropped
+    # and created again around the batch
+    op.drop_index("ix_person_email_normalized", table_name="person")
+    with op.batch_alter_table("person") as batch_op:
+        batch_op.drop_column("deleted_at")
+    op.create_index(
+        "ix_person_email_normalized",
+        "person",
+        [sa.text("lower(trim(email))")],
+        unique=True,
+    )
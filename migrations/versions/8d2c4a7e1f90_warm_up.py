@@ -0,0 +1,30 @@
+"""warm up
+
+Revision ID: 8d2c4a7e1f90
+Revises: 6f1a3d8c2e57
+Create Date: 2026-10-19 18:05:12.418730
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8d2c4a7e1f90"
+down_revision = "6f1a3d8c2e57"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "warm_up",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("duration", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    op.drop_table("warm_up")
@@ -0,0 +1,34 @@
+"""unique normalized email
+
+Revision ID: 9e4b7d3c2a61
+Revises: 5c1f2e8a9d47
+Create Date: 2026-10-19 11:03:27.604912
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9e4b7d3c2a61"
+down_revision = "5c1f2e8a9d47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Entries sharing an email with an older one are dropped, so the index can be created
+    op.execute(
+        "DELETE FROM person WHERE id NOT IN "
+        "(SELECT MIN(id) FROM person GROUP BY lower(trim(email)))"
+    )
+    op.create_index(
+        "ix_person_email_normalized",
+        "person",
+        [sa.text("lower(trim(email))")],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_person_email_normalized", table_name="person")
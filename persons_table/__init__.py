@@ -1,13 +1,19 @@
 from flask import Flask
 from flask_bootstrap import Bootstrap
-from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
 
+from persons_table.compression import ResponseCompressor
 from persons_table.config import Config
+from persons_table.database import PooledSQLAlchemy
+from persons_table.outbound import HTTPClient
+from persons_table.profiling import RequestProfiler
+from persons_table.replicas import ReplicaRouter
 
 bootstrap = Bootstrap()
-db = SQLAlchemy()
-migrate = Migrate()
+db = PooledSQLAlchemy()
+replica_router = ReplicaRouter(db)
+profiler = RequestProfiler()
+compressor = ResponseCompressor()
+http_client = HTTPClient()
 
 
 def create_app(config_class=Config):
@@ -17,14 +23,44 @@ def create_app(config_class=Config):
     :rtype: class 'flask.app.Flask'
     """
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
 
     bootstrap.init_app(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    replica_router.init_app(app)
+    if app.config["MIGRATE_ENABLED"]:
+        # Loading Alembic is only needed for 'flask db' commands
+        from flask_migrate import Migrate
 
+        Migrate(app, db)
+    profiler.init_app(app)
+    compressor.init_app(app)
+    http_client.init_app(app)
+
+    from persons_table.api.routes import api
+    from persons_table.assets.build import build_assets_command
+    from persons_table.assets.routes import assets
+    from persons_table.health.routes import health
+    from persons_table.maintenance import purge_deleted_command, rebuild_stats_command
     from persons_table.persons.routes import persons
+    from persons_table.thumbnails.routes import thumbnails
+    from persons_table.warmup import warm_up_command
 
     app.register_blueprint(persons)
+    app.register_blueprint(health)
+    app.register_blueprint(api, url_prefix="/api")
+    app.register_blueprint(thumbnails)
+    app.register_blueprint(assets)
+    app.cli.add_command(warm_up_command)
+    app.cli.add_command(purge_deleted_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(build_assets_command)
+
+    if app.config["ASYNC_VIEWS_ENABLED"]:
+        from persons_table.aio import async_runner
+        from persons_table.persons.async_routes import persons_async
+
+        async_runner.init_app(app)
+        app.register_blueprint(persons_async, url_prefix="/async")
 
     return app
@@ -0,0 +1,363 @@
+import asyncio
+import atexit
+import threading
+
+from flask_sqlalchemy import Pagination
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from persons_table import db
+from persons_table.config import INGEST_TOP_UP_ATTEMPTS, RANDOMUSER_API_URL
+from persons_table.database import (
+    column_in,
+    engine_options_for,
+    insert_ignoring_conflicts,
+    returning_executions,
+)
+from persons_table.models import (
+    STAT_COLUMNS,
+    ConcurrentUpdateError,
+    DuplicateEmailError,
+    Person,
+    change_stats,
+    make_API_parameters,
+    serialize_API_rows,
+)
+
+# Async drivers used instead of the sync ones from 'SQLALCHEMY_DATABASE_URI'
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+# Bigger numbers of entries are collected from API with concurrent requests of this size
+API_CHUNK_SIZE = 1000
+
+person_table = Person.__table__
+# Soft-deleted entries are hidden from reads, see 'DatabaseHandler.delete_where'
+is_live = person_table.c.deleted_at.is_(None)
+
+
+class AsyncRunner:
+    """This is a class to run coroutines in one event loop shared by all requests of a process.
+    The loop runs in a daemon thread and keeps a pooled async HTTP client and async database
+    engines, so connections are reused between requests and outbound waits of concurrent
+    requests are multiplexed in a single thread.
+    """
+
+    def __init__(self, app=None):
+        self.http_client = None
+        self._http_client_options = {}
+        self._engines = {}
+        self._loop = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Reads settings of the async HTTP client from the app passed in"""
+        app.config.setdefault("ASYNC_HTTP_MAX_CONNECTIONS", 100)
+        app.config.setdefault("ASYNC_HTTP_MAX_KEEPALIVE", 20)
+        app.config.setdefault("ASYNC_HTTP_TIMEOUT", 10.0)
+        self._http_client_options = {
+            "max_connections": app.config["ASYNC_HTTP_MAX_CONNECTIONS"],
+            "max_keepalive_connections": app.config["ASYNC_HTTP_MAX_KEEPALIVE"],
+            "timeout": app.config["ASYNC_HTTP_TIMEOUT"],
+        }
+        app.extensions["async_runner"] = self
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="async-runner", daemon=True
+                ).start()
+                atexit.register(self.stop)
+        return self._loop
+
+    def run(self, coroutine):
+        """Schedules a coroutine in the shared loop, so it can be awaited from any other loop.
+
+        :param coroutine: coroutine to run
+        :type coroutine: coroutine
+
+        :return: future with the coroutine result
+        :rtype: class 'asyncio.Future'
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+        return asyncio.wrap_future(future)
+
+    def get_http_client(self):
+        """Returns the pooled async HTTP client, must be called from the shared loop"""
+        if self.http_client is None:
+            import httpx
+
+            options = dict(self._http_client_options)
+            timeout = options.pop("timeout")
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(**options), timeout=timeout
+            )
+        return self.http_client
+
+    def get_engine(self, app):
+        """Returns an async engine for the database of the app passed in.
+
+        :param app: app instance
+        :type app: class 'flask.app.Flask'
+
+        :return: async engine
+        :rtype: class 'sqlalchemy.ext.asyncio.AsyncEngine'
+        """
+        sa_url = db.get_engine(app).url
+        backend = sa_url.get_backend_name()
+        async_url = sa_url.set(drivername=ASYNC_DRIVERS.get(backend, sa_url.drivername))
+        with self._lock:
+            if async_url not in self._engines:
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                self._engines[async_url] = create_async_engine(
+                    async_url,
+                    **engine_options_for(
+                        async_url, app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+                    ),
+                )
+        return self._engines[async_url]
+
+    async def _close(self):
+        if self.http_client is not None:
+            await self.http_client.aclose()
+        for engine in self._engines.values():
+            await engine.dispose()
+
+    def stop(self):
+        """Closes HTTP connections and database engines and stops the loop"""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self.http_client = None
+        self._engines = {}
+
+
+async_runner = AsyncRunner()
+
+
+async def async_get_API_response(quantity, seed=None, page=None):
+    """Collects data from API Randomuser.me with the pooled async HTTP client.
+
+    :param quantity: requested number of entries in data to collect
+    :type quantity: int
+    :param seed: seed to get the same data in repeated requests, defaults to None
+    :type seed: str, optional
+    :param page: page of data generated with the seed, defaults to None
+    :type page: int, optional
+
+    :return: collected data
+    :rtype: dict
+    """
+    response = await async_runner.get_http_client().get(
+        RANDOMUSER_API_URL, params=make_API_parameters(quantity, seed, page)
+    )
+    return response.json()
+
+
+async def async_collect_API_results(quantity):
+    """Collects a number of entries from API with concurrent requests of 'API_CHUNK_SIZE' entries.
+
+    :param quantity: requested number of entries in data to collect
+    :type quantity: int
+
+    :return: collected people data
+    :rtype: list[dict, ...]
+    """
+    chunk_sizes = [
+        min(API_CHUNK_SIZE, quantity - offset)
+        for offset in range(0, quantity, API_CHUNK_SIZE)
+    ]
+    responses = await asyncio.gather(
+        *(async_get_API_response(chunk_size) for chunk_size in chunk_sizes)
+    )
+    return [
+        person_data for response in responses for person_data in response["results"]
+    ]
+
+
+async def async_check_if_image(link):
+    """Returns True if link passed in leads to an image file, False otherwise.
+    Only headers of a response are read.
+
+    :param link: any URL
+    :type link: str
+
+    :return: True if link passed in leads to an image file, False otherwise
+    :rtype: bool
+    """
+    async with async_runner.get_http_client().stream("GET", link) as response:
+        return response.headers.get("content-type", "").startswith("image")
+
+
+class AsyncDatabaseHandler:
+    """This is a class to work with the database through an async engine.
+    Mirrors 'DatabaseHandler' methods used by async views. Can be used without instances.
+    """
+
+    @staticmethod
+    async def count_entries(engine):
+        """Counts a number of entries in the Person table of database
+
+        :param engine: async engine
+        :type engine: class 'sqlalchemy.ext.asyncio.AsyncEngine'
+        :return: a number of entries in the Person table of database
+        :rtype: int
+        """
+        async with engine.connect() as connection:
+            return await connection.scalar(
+                select(func.count()).select_from(person_table).where(is_live)
+            )
+
+    @staticmethod
+    async def paginate(engine, page, per_page):
+        """Returns a page of all the entries ordered by id.
+
+        :param engine: async engine
+        :type engine: class 'sqlalchemy.ext.asyncio.AsyncEngine'
+        :param page: a page number
+        :type page: int
+        :param per_page: number of entries on a page
+        :type per_page: int
+        :return: page of entries, None if the page number is out of range
+        :rtype: class 'flask_sqlalchemy.Pagination'
+        """
+        async with engine.connect() as connection:
+            total = await connection.scalar(
+                select(func.count()).select_from(person_table).where(is_live)
+            )
+            result = await connection.execute(
+                select(person_table)
+                .where(is_live)
+                .order_by(person_table.c.id)
+                .offset((page - 1) * per_page)
+                .limit(per_page)
+            )
+            items = result.all()
+        if not items and page != 1:
+            return None
+        return Pagination(None, page, per_page, total, items)
+
+    @staticmethod
+    async def get_person_data(engine, person_id):
+        """Returns a person data with an id passed in, None if there is no such person.
+
+        :param engine: async engine
+        :type engine: class 'sqlalchemy.ext.asyncio.AsyncEngine'
+        :param person_id: id of a person in the Person table in the database
+        :type person_id: int
+        :return: all the person data in the database
+        :rtype: class 'sqlalchemy.engine.Row'
+        """
+        async with engine.connect() as connection:
+            result = await connection.execute(
+                select(person_table).where(person_table.c.id == person_id, is_live)
+            )
+            return result.first()
+
+    @staticmethod
+    async def rerecord_data(engine, quantity_requested):
+        """Deletes entries over the quantity requested or collects lacking ones
+        from API with concurrent requests. Entries with emails already in the database
+        are dropped and topped up like in 'DatabaseHandler.rerecord_data'.
+
+        :param engine: async engine
+        :type engine: class 'sqlalchemy.ext.asyncio.AsyncEngine'
+        :param quantity_requested: a number of records needed in the database
+        :type quantity_requested: int
+        """
+        current_quantity = await AsyncDatabaseHandler.count_entries(engine)
+        if quantity_requested < current_quantity:
+            async with engine.begin() as connection:
+                first_id_to_delete = await connection.scalar(
+                    select(person_table.c.id)
+                    .where(is_live)
+                    .order_by(person_table.c.id)
+                    .offset(quantity_requested)
+                    .limit(1)
+                )
+                to_delete = person_table.c.id >= first_id_to_delete
+                await connection.execute(change_stats(to_delete, -1))
+                await connection.execute(delete(person_table).where(to_delete, is_live))
+        elif quantity_requested > current_quantity:
+            insert = insert_ignoring_conflicts(person_table, engine.dialect.name)
+            for _ in range(1 + INGEST_TOP_UP_ATTEMPTS):
+                API_results = await async_collect_API_results(
+                    quantity_requested - current_quantity
+                )
+                rows = serialize_API_rows(API_results)
+                async with engine.begin() as connection:
+                    inserted = await AsyncDatabaseHandler._insert_rows(
+                        connection, insert, rows
+                    )
+                    await connection.execute(change_stats(inserted, 1))
+                current_quantity = await AsyncDatabaseHandler.count_entries(engine)
+                if current_quantity >= quantity_requested:
+                    break
+
+    @staticmethod
+    async def _insert_rows(connection, insert, rows):
+        # Returns a condition matching only the rows inserted, like 'insert_rows' does
+        dialect = connection.dialect
+        if dialect.full_returning:
+            inserted_ids = []
+            for statement, parameters in returning_executions(
+                insert, person_table.c.id, rows, dialect
+            ):
+                result = await connection.execute(statement, parameters)
+                inserted_ids.extend(result.scalars())
+            return column_in(person_table.c.id, inserted_ids, dialect.name)
+        result = await connection.execute(insert, rows)
+        last_id = await connection.scalar(select(func.max(person_table.c.id)))
+        return person_table.c.id > (last_id or 0) - result.rowcount
+
+    @staticmethod
+    async def save_person_data(engine, form_data, person_id=None, version=None):
+        """Creates a new entry or updates columns passed in of the one with an id passed in.
+        If a version is passed in, the entry is only updated if nobody changed it since.
+        Raises 'ConcurrentUpdateError' otherwise.
+        Raises 'DuplicateEmailError' if the email is taken by another entry.
+
+        :param engine: async engine
+        :type engine: class 'sqlalchemy.ext.asyncio.AsyncEngine'
+        :param form_data: column values from a form
+        :type form_data: dict
+        :param person_id: id of a person to update, defaults to None
+        :type person_id: int, optional
+        :param version: version of the person data the form was filled from, defaults to None
+        :type version: int, optional
+        """
+        if person_id is not None and not form_data:
+            return
+        try:
+            async with engine.begin() as connection:
+                if person_id is None:
+                    result = await connection.execute(person_table.insert(), form_data)
+                    await connection.execute(
+                        change_stats(
+                            person_table.c.id == result.inserted_primary_key[0], 1
+                        )
+                    )
+                    return
+                statement = (
+                    person_table.update()
+                    .where(person_table.c.id == person_id, is_live)
+                    .values(version=person_table.c.version + 1, **form_data)
+                )
+                if version is not None:
+                    statement = statement.where(person_table.c.version == version)
+                to_update = person_table.c.id == person_id
+                changes_stats = not set(form_data).isdisjoint(STAT_COLUMNS)
+                if changes_stats:
+                    await connection.execute(change_stats(to_update, -1))
+                result = await connection.execute(statement)
+                if not result.rowcount:
+                    raise ConcurrentUpdateError()
+                if changes_stats:
+                    await connection.execute(change_stats(to_update, 1))
+        except IntegrityError as error:
+            raise DuplicateEmailError() from error
@@ -0,0 +1,157 @@
+from email_validator import EmailNotValidError, validate_email
+from flask import Blueprint, jsonify, request, url_for
+
+from persons_table.config import API_MAX_SLICE_SIZE, API_SLICE_MAX_AGE, API_SLICE_SIZE
+from persons_table.models import (
+    PERSON_COLUMNS,
+    DatabaseHandler,
+    DuplicateEmailError,
+    Person,
+)
+from persons_table.replicas import replica_reads
+from persons_table.thumbnails.routes import picture_srcset, thumbnail_url
+
+api = Blueprint("api", __name__)
+
+
+def is_id(value):
+    """Returns True if a value from a JSON body is an integer id"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_person_data(value):
+    """Returns True if a value from a JSON body is a dict with an id of a person
+    and non-empty strings for columns of the Person table only
+    """
+    return (
+        isinstance(value, dict)
+        and is_id(value.get("id"))
+        and all(
+            column in PERSON_COLUMNS and isinstance(column_value, str) and column_value
+            for column, column_value in value.items()
+            if column != "id"
+        )
+    )
+
+
+def person_data_error(person_data):
+    """Returns a message why values of a person data from a JSON body can not be saved,
+    None if they fit columns of the Person table and the email is valid like in the form.
+
+    :param person_data: a person data passing 'is_person_data'
+    :type person_data: dict
+
+    :return: error message
+    :rtype: str
+    """
+    for column, column_value in person_data.items():
+        if column == "id":
+            continue
+        max_length = Person.__table__.columns[column].type.length
+        if max_length is not None and len(column_value) > max_length:
+            return f"'{column}' must not be longer than {max_length} characters"
+
+    if "email" in person_data:
+        # The same check as the one of 'Email' validator of the form
+        try:
+            validate_email(person_data["email"], check_deliverability=False)
+        except EmailNotValidError:
+            return "'email' must be a valid email address"
+    return None
+
+
+def person_row(person_data):
+    """Returns a person data as shown in a row of the table, with URLs of
+    a thumbnail of the picture and of the personal page.
+
+    :param person_data: a person data
+    :type person_data: class 'Person(db.Model)'
+
+    :return: values of the row
+    :rtype: dict
+    """
+    return {
+        "id": person_data.id,
+        "first_name": person_data.first_name,
+        "last_name": person_data.last_name,
+        "gender": person_data.gender,
+        "cell": person_data.cell,
+        "email": person_data.email,
+        "location": person_data.location,
+        "picture": thumbnail_url(
+            person_data.pic_thumbnail_link or person_data.pic_link, 48
+        ),
+        "srcset": picture_srcset(person_data),
+        "url": url_for("persons.personal_page", person_id=person_data.id),
+    }
+
+
+@api.route("/persons")
+@replica_reads
+def people_slice():
+    """Answers with a slice of entries ordered by id '{"persons": [...], "next": 42}'.
+    Entries follow an id passed in as 'after' or, without one, skip 'offset' entries.
+    'next' is the 'after' of the next slice, null after the last one.
+    Slices can be reused by browsers for 'API_SLICE_MAX_AGE' seconds and revalidated
+    with ETags after that.
+    """
+    after = request.args.get("after", type=int)
+    offset = request.args.get("offset", 0, type=int)
+    limit = request.args.get("limit", API_SLICE_SIZE, type=int)
+    if offset < 0 or not 0 < limit <= API_MAX_SLICE_SIZE:
+        return (
+            jsonify(
+                error="'offset' must not be negative and 'limit' must be "
+                f"from 1 to {API_MAX_SLICE_SIZE}"
+            ),
+            400,
+        )
+
+    people_data = DatabaseHandler.get_people_slice(limit, after, offset)
+    response = jsonify(
+        persons=[person_row(person_data) for person_data in people_data],
+        next=people_data[-1].id if len(people_data) == limit else None,
+    )
+    response.cache_control.max_age = API_SLICE_MAX_AGE
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@api.route("/persons/bulk-delete", methods=["POST"])
+def bulk_delete():
+    """Deletes people with ids from a JSON body '{"ids": [1, 2, ...]}'.
+    Answers with a number of deleted entries, ids of missing people are ignored.
+    """
+    person_ids = (request.get_json(silent=True) or {}).get("ids")
+    if not isinstance(person_ids, list) or not all(map(is_id, person_ids)):
+        return jsonify(error="'ids' must be a list of integers"), 400
+
+    return jsonify(deleted=DatabaseHandler.delete_people(person_ids))
+
+
+@api.route("/persons/bulk", methods=["PATCH"])
+def bulk_update():
+    """Updates people data from a JSON body '{"persons": [{"id": 1, "email": ...}, ...]}'.
+    Only columns passed in are changed. Answers with a number of updated entries,
+    ids of missing people are ignored. Values too long for their columns or invalid
+    emails are answered with 400 and the id of the person.
+    """
+    people_data = (request.get_json(silent=True) or {}).get("persons")
+    if not isinstance(people_data, list) or not all(map(is_person_data, people_data)):
+        return (
+            jsonify(
+                error="'persons' must be a list of objects with an integer 'id' "
+                f"and strings for any of {', '.join(PERSON_COLUMNS)}"
+            ),
+            400,
+        )
+    for person_data in people_data:
+        error = person_data_error(person_data)
+        if error is not None:
+            return jsonify(error=error, id=person_data["id"]), 400
+
+    try:
+        updated = DatabaseHandler.update_people(people_data)
+    except DuplicateEmailError as error:
+        return jsonify(error=str(error)), 409
+    return jsonify(updated=updated)
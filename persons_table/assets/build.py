@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from persons_table.compression import (
+    COMPRESSIBLE_MIMETYPES,
+    brotli_module,
+    supported_encodings,
+)
+
+# Manifest of built assets: fingerprinted names of static files and encodings they are
+# precompressed with
+MANIFEST_NAME = "manifest.json"
+# Suffixes of precompressed variants of a file
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def fingerprinted_name(filename, content):
+    """Returns a file name with a hash of the file content before the extension,
+    so a changed file gets a new name and can be cached by browsers forever.
+
+    :param filename: path of a file relative to the static folder
+    :type filename: str
+    :param content: content of the file
+    :type content: bytes
+
+    :return: fingerprinted path
+    :rtype: str
+    """
+    root, extension = os.path.splitext(filename)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+
+
+def compress(content, encoding):
+    """Returns content compressed with the best ratio, time does not matter at build time"""
+    if encoding == "br":
+        return brotli_module().compress(content, quality=11)
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def write_file(path, content):
+    """Writes a file atomically, so a running app never sends a part of it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(file_descriptor, "wb") as temporary_file:
+        temporary_file.write(content)
+    # Temporary files are only readable by their owner, a proxy may serve built assets
+    os.chmod(temporary_path, 0o644)
+    os.replace(temporary_path, path)
+
+
+def build_assets(static_folder, build_dir):
+    """Copies static files to a directory under fingerprinted names, with variants
+    precompressed with every supported encoding next to them. A variant is only kept
+    if it is smaller than the file. Files of previous builds are kept, so pages
+    rendered before a deploy still get their assets.
+
+    :param static_folder: folder with static files of the app
+    :type static_folder: str
+    :param build_dir: directory to write built assets and the manifest to
+    :type build_dir: str
+
+    :return: manifest with fingerprinted names of files by their paths in the static folder
+        and encodings by fingerprinted names
+    :rtype: dict
+    """
+    manifest = {"files": {}, "encodings": {}}
+    for directory, _, file_names in os.walk(static_folder):
+        for file_name in sorted(file_names):
+            path = os.path.join(directory, file_name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, "/")
+            with open(path, "rb") as static_file:
+                content = static_file.read()
+            fingerprinted = fingerprinted_name(filename, content)
+            write_file(os.path.join(build_dir, fingerprinted), content)
+
+            encodings = []
+            if mimetypes.guess_type(filename)[0] in COMPRESSIBLE_MIMETYPES:
+                for encoding in supported_encodings():
+                    compressed = compress(content, encoding)
+                    if len(compressed) < len(content):
+                        write_file(
+                            os.path.join(
+                                build_dir, fingerprinted + ENCODING_SUFFIXES[encoding]
+                            ),
+                            compressed,
+                        )
+                        encodings.append(encoding)
+            manifest["files"][filename] = fingerprinted
+            manifest["encodings"][fingerprinted] = encodings
+
+    write_file(
+        os.path.join(build_dir, MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode(),
+    )
+    return manifest
+
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Copy static files under fingerprinted names with precompressed variants."""
+    build_dir = current_app.config["ASSETS_BUILD_DIR"]
+    manifest = build_assets(current_app.static_folder, build_dir)
+    click.echo(f"Built {len(manifest['files'])} assets in {build_dir}")
@@ -0,0 +1,70 @@
+import json
+import mimetypes
+import os
+
+from flask import Blueprint, abort, current_app, request, send_from_directory, url_for
+
+from persons_table.assets.build import ENCODING_SUFFIXES, MANIFEST_NAME
+
+assets = Blueprint("assets", __name__)
+
+
+@assets.record_once
+def load_manifest(state):
+    """Loads a manifest of built assets for the app the blueprint is registered in.
+    Without one, static files are linked as they are.
+    """
+    config = state.app.config
+    config.setdefault("ASSETS_BUILD_DIR", "assets")
+    config.setdefault("ASSETS_MAX_AGE", 365 * 24 * 3600)
+    try:
+        with open(os.path.join(config["ASSETS_BUILD_DIR"], MANIFEST_NAME)) as manifest:
+            state.app.extensions["asset_manifest"] = json.load(manifest)
+    except FileNotFoundError:
+        state.app.extensions["asset_manifest"] = {"files": {}, "encodings": {}}
+
+
+@assets.app_template_global()
+def asset_url(filename):
+    """Returns a URL of a fingerprinted copy of a static file if assets are built,
+    of the file in the static folder otherwise.
+
+    :param filename: path of a file relative to the static folder
+    :type filename: str
+
+    :return: URL of the file
+    :rtype: str
+    """
+    fingerprinted = current_app.extensions["asset_manifest"]["files"].get(filename)
+    if fingerprinted is None:
+        return url_for("static", filename=filename)
+    return url_for("assets.asset", filename=fingerprinted)
+
+
+@assets.route("/assets/<path:filename>")
+def asset(filename):
+    """Sends a fingerprinted copy of a static file, precompressed with the encoding
+    a client prefers. Browsers keep it for 'ASSETS_MAX_AGE' seconds without asking again,
+    as a changed file gets a new name.
+
+    :param filename: fingerprinted path of a file
+    :type filename: str
+    """
+    encodings = current_app.extensions["asset_manifest"]["encodings"].get(filename)
+    if encodings is None:
+        abort(404)
+
+    config = current_app.config
+    encoding = request.accept_encodings.best_match(encodings)
+    response = send_from_directory(
+        os.path.abspath(config["ASSETS_BUILD_DIR"]),
+        filename + ENCODING_SUFFIXES.get(encoding, ""),
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        max_age=config["ASSETS_MAX_AGE"],
+    )
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,154 @@
+import zlib
+from functools import lru_cache
+
+from flask import current_app, request
+
+# Types of responses worth compressing, images and archives are compressed already
+COMPRESSIBLE_MIMETYPES = frozenset(
+    (
+        "text/html",
+        "text/css",
+        "text/csv",
+        "text/plain",
+        "text/javascript",
+        "application/javascript",
+        "application/json",
+        "image/svg+xml",
+        "image/vnd.microsoft.icon",
+        "image/x-icon",
+    )
+)
+
+
+@lru_cache(maxsize=None)
+def brotli_module():
+    """Returns the 'brotli' module, None if it is not installed.
+    Responses are only compressed with gzip then.
+    """
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def supported_encodings():
+    """Returns content codings responses can be compressed with, in order of preference"""
+    return ("br", "gzip") if brotli_module() else ("gzip",)
+
+
+class StreamEncoder:
+    """This is a class to compress a body in parts with gzip or brotli.
+    Every part can be flushed, so clients of streamed responses can decompress
+    what is sent so far without waiting for the end of the body.
+
+    :param encoding: content coding, 'br' or 'gzip'
+    :type encoding: str
+    :param gzip_level: gzip compression level from 1 to 9
+    :type gzip_level: int
+    :param brotli_quality: brotli compression quality from 0 to 11
+    :type brotli_quality: int
+    """
+
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        if encoding == "br":
+            compressor = brotli_module().Compressor(quality=brotli_quality)
+            self._compress = compressor.process
+            self._flush = compressor.flush
+            self._finish = compressor.finish
+        else:
+            # 31 makes zlib write a gzip header and trailer
+            compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def compress(self, data, flush=False):
+        """Returns compressed data of a part, flushed if 'flush' is True"""
+        compressed = self._compress(data)
+        return compressed + self._flush() if flush else compressed
+
+    def finish(self):
+        """Returns the end of the compressed body"""
+        return self._finish()
+
+    def compress_stream(self, chunks):
+        """Compresses parts of a streamed body as they are produced.
+
+        :param chunks: parts of the body
+        :type chunks: iterable of bytes
+
+        :return: generator of compressed parts
+        :rtype: generator
+        """
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                compressed = self.compress(chunk, flush=True)
+                if compressed:
+                    yield compressed
+            yield self.finish()
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+
+class ResponseCompressor:
+    """This is a class to compress responses with brotli or gzip, whichever a client
+    prefers, brotli is only used if it is installed. Only text responses of at least
+    'COMPRESSION_MIN_SIZE' bytes are compressed, smaller ones would hardly shrink.
+    Streamed responses are compressed part by part as they are sent. Files sent by
+    views are left alone, precompressed static assets are served by 'persons_table.assets'.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Registers a hook compressing responses of the app passed in"""
+        app.config.setdefault("COMPRESSION_ENABLED", True)
+        app.config.setdefault("COMPRESSION_MIN_SIZE", 500)
+        app.config.setdefault("COMPRESSION_GZIP_LEVEL", 4)
+        app.config.setdefault("COMPRESSION_BROTLI_QUALITY", 4)
+        if app.config["COMPRESSION_ENABLED"]:
+            app.after_request(self._compress)
+
+    @staticmethod
+    def _compress(response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        config = current_app.config
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(supported_encodings())
+        if encoding is None:
+            return response
+        if not response.is_streamed and (
+            response.calculate_content_length() < config["COMPRESSION_MIN_SIZE"]
+        ):
+            return response
+
+        encoder = StreamEncoder(
+            encoding,
+            config["COMPRESSION_GZIP_LEVEL"],
+            config["COMPRESSION_BROTLI_QUALITY"],
+        )
+        if response.is_streamed:
+            response.response = encoder.compress_stream(response.response)
+            response.headers.pop("Content-Length", None)
+        else:
+            response.set_data(encoder.compress(response.get_data()) + encoder.finish())
+        response.headers["Content-Encoding"] = encoding
+        # Compressed bodies differ from uncompressed ones byte by byte
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
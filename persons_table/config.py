@@ -6,12 +6,134 @@ POSTGRES_DB_NAME = os.environ.get("POSTGRES_DB_NAME")  # Change to your settings
 POSTGRES_HOST = os.environ.get("POSTGRES_HOST")  # Change to your settings
 POSTGRES_PORT = os.environ.get("POSTGRES_PORT")  # Change to your settings
 ENTRIES_PER_PAGE = 300
+# Number of threads serving requests in every worker process, see gunicorn.conf.py
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", 4))
+# Point to a local stand-in (benchmarks/randomuser_stub.py) to work without internet access
+RANDOMUSER_API_URL = os.environ.get("RANDOMUSER_API_URL", "https://randomuser.me/api/")
+# Raw API responses are cached on disk when the directory is set. In offline mode
+# requests missing in the cache fail instead of calling the API
+API_CACHE_DIR = os.environ.get("API_CACHE_DIR")
+API_CACHE_MAX_BYTES = int(os.environ.get("API_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+API_CACHE_OFFLINE = os.environ.get("API_CACHE_OFFLINE") == "1"
+# Number of entries parsed from API responses and inserted into the database at once
+INGEST_CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", 1000))
+# Number of processes fetching and serializing API chunks in parallel when the table grows,
+# 0 keeps everything in the serving process
+SERIALIZE_PROCESSES = int(os.environ.get("SERIALIZE_PROCESSES", 0))
+# Otherwise pages are fetched by a number of threads and queued to be serialized and
+# inserted, at most a number of pages waits in each queue before fetching is paused
+INGEST_FETCH_THREADS = int(os.environ.get("INGEST_FETCH_THREADS", 2))
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", 4))
+# Growing the table commits every page with a checkpoint, so a failed reseed
+# is resumed by the next one instead of being started over
+INGEST_CHECKPOINTS = os.environ.get("INGEST_CHECKPOINTS") == "1"
+# Entries with emails already in the database are dropped on insert, lacking ones
+# are collected again up to a number of times
+INGEST_TOP_UP_ATTEMPTS = int(os.environ.get("INGEST_TOP_UP_ATTEMPTS", 3))
+# Pages of a reseed are requested with a seed made of this one and the number of entries
+# the table grows from, so identical reseeds are replayed from 'API_CACHE_DIR'.
+# Defaults to "persons-table" if 'API_CACHE_DIR' is set, otherwise reseeds get random
+# seeds unless it is set. Lacking entries are always collected again with random seeds
+INGEST_SEED = os.environ.get("INGEST_SEED")
+# Batch endpoints of the API change up to this number of entries with one statement
+BULK_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", 1000))
+# Deleted entries are only marked with a time of deletion and hidden from reads,
+# they are removed for good later in batches with 'flask purge-deleted'
+SOFT_DELETE = os.environ.get("SOFT_DELETE") == "1"
+# The scrolling table reads entries from the JSON API in slices of this size, at most
+# 'API_MAX_SLICE_SIZE' entries are returned at once. Browsers may reuse a slice
+# for a number of seconds
+API_SLICE_SIZE = int(os.environ.get("API_SLICE_SIZE", 100))
+API_MAX_SLICE_SIZE = 1000
+API_SLICE_MAX_AGE = int(os.environ.get("API_SLICE_MAX_AGE", 10))
 
 
 class Config:
     SECRET_KEY = "any-string-to-keep-in secret"  # Change to your settings
-    SQLALCHEMY_DATABASE_URI = (
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        "DATABASE_URL",
         f"postgresql://{POSTGRES_USERNAME}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:"
-        f"{POSTGRES_PORT}/{POSTGRES_DB_NAME}"
+        f"{POSTGRES_PORT}/{POSTGRES_DB_NAME}",
     )  # Change to your settings
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Read-only views read from replicas in the comma separated list, see
+    # persons_table/replicas.py. A replica is picked for every request in turn or by
+    # the smallest number of connections in use. Clients read from the primary database
+    # for a number of seconds after they change something
+    SQLALCHEMY_REPLICA_URIS = [
+        uri for uri in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if uri
+    ]
+    REPLICA_CHOICE = os.environ.get("REPLICA_CHOICE", "round-robin")
+    REPLICA_STICKY_SECONDS = float(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+    # Serving processes do not run migrations, see gunicorn.conf.py
+    MIGRATE_ENABLED = os.environ.get("MIGRATE_ENABLED", "1") == "1"
+    # Every worker process has its own pool: one connection per thread
+    # and a few extra ones for bursts, so the database gets up to
+    # GUNICORN_WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections. Requests waiting
+    # longer than 'DB_POOL_TIMEOUT' seconds for a connection are answered with 503.
+    # Connections are checked before use, so requests do not fail after the database
+    # restarts, and replaced after 'DB_POOL_RECYCLE' seconds. PostgreSQL cancels
+    # statements running longer than 'DB_STATEMENT_TIMEOUT' milliseconds, 0 disables it
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", WORKER_THREADS)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", WORKER_THREADS // 2)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") == "1",
+        "statement_timeout": int(os.environ.get("DB_STATEMENT_TIMEOUT", 30000)),
+    }
+
+    # Async variant of the persons views under /async, see persons_table/aio.py
+    ASYNC_VIEWS_ENABLED = os.environ.get("ASYNC_VIEWS_ENABLED") == "1"
+    ASYNC_HTTP_MAX_CONNECTIONS = int(os.environ.get("ASYNC_HTTP_MAX_CONNECTIONS", 100))
+    ASYNC_HTTP_MAX_KEEPALIVE = int(os.environ.get("ASYNC_HTTP_MAX_KEEPALIVE", 20))
+    ASYNC_HTTP_TIMEOUT = float(os.environ.get("ASYNC_HTTP_TIMEOUT", 10.0))
+
+    # Outbound HTTP connections, see persons_table/outbound.py
+    HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", 10))
+    HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", WORKER_THREADS))
+    HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 3))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.3))
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))
+    HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 10.0))
+
+    # Local proxy keeping thumbnails of pictures, see persons_table/thumbnails/routes.py
+    THUMBNAILS_ENABLED = os.environ.get("THUMBNAILS_ENABLED", "1") == "1"
+    THUMBNAIL_CACHE_DIR = os.environ.get("THUMBNAIL_CACHE_DIR", "thumbnails")
+    THUMBNAIL_CACHE_MAX_BYTES = int(
+        os.environ.get("THUMBNAIL_CACHE_MAX_BYTES", 200 * 1024 * 1024)
+    )
+    # Pictures larger than this number of bytes are not downloaded to make thumbnails
+    THUMBNAIL_MAX_SOURCE_BYTES = int(
+        os.environ.get("THUMBNAIL_MAX_SOURCE_BYTES", 10 * 1024 * 1024)
+    )
+    # Size of a square thumbnails are scaled down to fit, in pixels
+    THUMBNAIL_SIZE = int(os.environ.get("THUMBNAIL_SIZE", 150))
+    # Browsers keep thumbnails for a number of seconds without asking again
+    THUMBNAIL_MAX_AGE = int(os.environ.get("THUMBNAIL_MAX_AGE", 365 * 24 * 3600))
+
+    # Compression of responses, see persons_table/compression.py. Smaller responses
+    # are sent as they are. Gzip level 4 compresses the index page twice as fast as 6,
+    # to a 5% bigger size
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1") == "1"
+    COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 500))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 4))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4))
+    # Fingerprinted and precompressed static files built with 'flask build-assets',
+    # see persons_table/assets/build.py. Browsers keep them for a number of seconds
+    ASSETS_BUILD_DIR = os.environ.get("ASSETS_BUILD_DIR", "assets")
+    ASSETS_MAX_AGE = int(os.environ.get("ASSETS_MAX_AGE", 365 * 24 * 3600))
+
+    # Number of entries to fill an empty table with on warm-up, see persons_table/warmup.py
+    WARM_UP_QUANTITY = int(os.environ.get("WARM_UP_QUANTITY", 1000))
+    # Seconds after which a warm-up claimed by a process that never finished it
+    # is claimed again by another one, it must be longer than a warm-up takes
+    WARM_UP_TIMEOUT = int(os.environ.get("WARM_UP_TIMEOUT", 1800))
+
+    # Statistical profiling of requests, see persons_table/profiling.py
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED") == "1"
+    PROFILING_DIR = os.environ.get("PROFILING_DIR", "profiles")
+    PROFILING_INTERVAL = float(os.environ.get("PROFILING_INTERVAL", 0.005))
+    PROFILING_REQUEST_RATE = float(os.environ.get("PROFILING_REQUEST_RATE", 0.0))
+    PROFILING_MAX_PER_MINUTE = int(os.environ.get("PROFILING_MAX_PER_MINUTE", 6))
+    PROFILING_TOKEN_MAX_AGE = int(os.environ.get("PROFILING_TOKEN_MAX_AGE", 3600))
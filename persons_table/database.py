@@ -0,0 +1,251 @@
+import threading
+import weakref
+
+from flask import has_request_context
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import any_, event, literal, orm, select, true
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import CompoundSelect, Select
+
+# Options of QueuePool, that SQLite engines (NullPool/StaticPool) do not accept
+POOL_SIZING_OPTIONS = ("pool_size", "max_overflow", "pool_timeout")
+# Option of 'SQLALCHEMY_ENGINE_OPTIONS' that is not an option of 'create_engine':
+# milliseconds a statement may run for, PostgreSQL drivers set it on every connection
+STATEMENT_TIMEOUT_OPTION = "statement_timeout"
+# Largest number of parameters asyncpg sends to PostgreSQL with one statement
+MAX_STATEMENT_PARAMETERS = 32767
+
+
+def engine_options_for(sa_url, engine_options):
+    """Returns engine options applicable to a database URL passed in.
+    Pool sizing options are dropped for SQLite. A statement timeout is passed to
+    PostgreSQL drivers in connection arguments and dropped for other databases.
+
+    :param sa_url: database URL
+    :type sa_url: class 'sqlalchemy.engine.URL'
+    :param engine_options: options for 'create_engine' and 'statement_timeout'
+    :type engine_options: dict
+
+    :return: options for 'create_engine'
+    :rtype: dict
+    """
+    options = dict(engine_options)
+    statement_timeout = options.pop(STATEMENT_TIMEOUT_OPTION, None)
+    if sa_url.drivername.startswith("sqlite"):
+        for option in POOL_SIZING_OPTIONS:
+            options.pop(option, None)
+    elif statement_timeout and sa_url.get_backend_name() == "postgresql":
+        connect_args = dict(options.get("connect_args", {}))
+        if sa_url.get_driver_name() == "asyncpg":
+            server_settings = dict(connect_args.get("server_settings", {}))
+            server_settings["statement_timeout"] = str(statement_timeout)
+            connect_args["server_settings"] = server_settings
+        else:
+            connect_args["options"] = (
+                f"{connect_args.get('options', '')} "
+                f"-c statement_timeout={statement_timeout}"
+            ).strip()
+        options["connect_args"] = connect_args
+    return options
+
+
+def insert_ignoring_conflicts(table, dialect_name):
+    """Returns an INSERT statement for a table that skips rows violating unique constraints
+    with 'ON CONFLICT DO NOTHING', so duplicates are dropped by the database at bulk speed.
+    Other databases than PostgreSQL and SQLite get a plain INSERT.
+
+    :param table: table to insert into
+    :type table: class 'sqlalchemy.Table'
+    :param dialect_name: name of the database dialect, e.g. 'postgresql'
+    :type dialect_name: str
+
+    :return: INSERT statement
+    :rtype: class 'sqlalchemy.sql.expression.Insert'
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return table.insert()
+    return insert(table).on_conflict_do_nothing()
+
+
+def insert_adding_from_select(table, key_columns, column, counts):
+    """Returns an INSERT ... SELECT statement for a table that adds a selected value to
+    a column of an existing row with the same key instead of inserting a new row,
+    so counters are changed with one statement. PostgreSQL and SQLite share
+    the 'ON CONFLICT' syntax. It is rendered after the SELECT, as statements
+    of dialect-specific inserts are compiled again on every execution by SQLAlchemy 1.4.
+
+    :param table: table to insert into
+    :type table: class 'sqlalchemy.Table'
+    :param key_columns: names of columns of a unique key
+    :type key_columns: list[str, ...]
+    :param column: name of a column to add to
+    :type column: str
+    :param counts: statement selecting values of key columns and of the column, in order
+    :type counts: class 'sqlalchemy.sql.expression.SelectBase'
+
+    :return: INSERT statement
+    :rtype: class 'sqlalchemy.sql.expression.Insert'
+    """
+    # SQLite needs a WHERE clause before 'ON CONFLICT' to parse it
+    upsert = (
+        select(counts.subquery())
+        .where(true())
+        .suffix_with(
+            f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET "
+            f"{column} = {table.name}.{column} + excluded.{column}"
+        )
+    )
+    return table.insert().from_select([*key_columns, column], upsert)
+
+
+def column_in(column, values, dialect_name):
+    """Returns a condition for a column to have one of values passed in.
+    PostgreSQL gets 'column = ANY(:values)' with a single array parameter,
+    other databases get 'column IN (...)'.
+
+    :param column: column to check
+    :type column: class 'sqlalchemy.Column'
+    :param values: values to look for
+    :type values: list
+    :param dialect_name: name of the database dialect, e.g. 'postgresql'
+    :type dialect_name: str
+
+    :return: condition for a WHERE clause
+    :rtype: class 'sqlalchemy.sql.expression.BinaryExpression'
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import ARRAY
+
+        return column == any_(literal(list(values), ARRAY(column.type)))
+    return column.in_(values)
+
+
+def returning_executions(insert, column, rows, dialect):
+    """Returns executions of an INSERT statement returning a column of the rows it inserts,
+    as pairs of a statement and its parameters. Drivers returning rows of executemany,
+    like psycopg2, get one execution with all the rows. Others, like asyncpg, get
+    multi-row VALUES statements with up to 'MAX_STATEMENT_PARAMETERS' parameters.
+    Only for databases with 'dialect.full_returning', SQLite in SQLAlchemy 1.4 has not.
+
+    :param insert: INSERT statement
+    :type insert: class 'sqlalchemy.sql.expression.Insert'
+    :param column: column to return
+    :type column: class 'sqlalchemy.Column'
+    :param rows: list of rows as dicts of column values
+    :type rows: list[dict, ...]
+    :param dialect: dialect of the database
+    :type dialect: class 'sqlalchemy.engine.Dialect'
+
+    :return: statements with their parameters
+    :rtype: list[tuple, ...]
+    """
+    insert = insert.returning(column)
+    if dialect.insert_executemany_returning:
+        return [(insert, rows)]
+    batch_size = max(1, MAX_STATEMENT_PARAMETERS // len(rows[0]))
+    return [
+        (insert.values(rows[start : start + batch_size]), {})
+        for start in range(0, len(rows), batch_size)
+    ]
+
+
+class PoolStats:
+    """This is a class to count events of the connection pool of an engine:
+    new connections, checkouts and connections invalidated after errors or failed
+    pre-pings. Numbers of connections in use are read from the pool itself.
+
+    :param engine: engine with the pool
+    :type engine: class 'sqlalchemy.engine.Engine'
+    """
+
+    def __init__(self, engine):
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "connect", lambda *args: self._count("connects"))
+        event.listen(engine, "checkout", lambda *args: self._count("checkouts"))
+        event.listen(engine, "invalidate", lambda *args: self._count("invalidations"))
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self, pool):
+        """Returns the stats with the state of the pool passed in.
+
+        :param pool: pool of the engine
+        :type pool: class 'sqlalchemy.pool.Pool'
+
+        :return: stats of the pool
+        :rtype: dict
+        """
+        stats = {
+            "pool": type(pool).__name__,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "invalidations": self.invalidations,
+        }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+                timeout=pool.timeout(),
+            )
+        return stats
+
+
+class RoutingSession(SignallingSession):
+    """This is a class of session that asks a replica router of the app, if it has one,
+    for an engine to run a statement with in requests. SELECT statements may be
+    sent to read replicas, see 'persons_table.replicas.ReplicaRouter'.
+    class: 'flask_sqlalchemy.SignallingSession'
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        router = self.app.extensions.get("replica_router")
+        if router is not None and has_request_context():
+            is_write = not isinstance(clause, (Select, CompoundSelect))
+            engine = router.engine_for(self.app, is_write)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause)
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+    """This is a class of SQLAlchemy extension that applies pool sizing options
+    from 'SQLALCHEMY_ENGINE_OPTIONS' only to databases with connection pools,
+    so the same config can be used with SQLite in tests and benchmarks.
+    Sessions may read from replicas, see 'RoutingSession'. Events of pools of all
+    the engines created are counted, see 'get_pool_stats'.
+    class: 'flask_sqlalchemy.SQLAlchemy'
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool_stats = weakref.WeakKeyDictionary()
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_options_for(sa_url, engine_opts))
+        self._pool_stats[engine] = PoolStats(engine)
+        return engine
+
+    def get_pool_stats(self, engine):
+        """Returns stats of the connection pool of an engine created by the extension.
+
+        :param engine: engine of the primary database or a replica
+        :type engine: class 'sqlalchemy.engine.Engine'
+
+        :return: stats of the pool, see 'PoolStats.as_dict'
+        :rtype: dict
+        """
+        return self._pool_stats[engine].as_dict(engine.pool)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
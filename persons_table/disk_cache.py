@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+
+class DiskCache:
+    """This is a class to keep content-addressed files in a directory with a size cap.
+    Files are evicted in least recently used order: reading a file updates its
+    modification time. Writes are atomic, so the directory can be shared by processes.
+
+    :param directory: directory to keep files in
+    :type directory: str
+    :param max_bytes: maximum total size of files
+    :type max_bytes: int
+    :param suffix: file name suffix, defaults to ''
+    :type suffix: str, optional
+    """
+
+    def __init__(self, directory, max_bytes, suffix=""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(*parts):
+        """Returns a cache key for values passed in.
+
+        :return: hex digest of values serialized as JSON
+        :rtype: str
+        """
+        serialized = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def path_for(self, key):
+        """Returns a path of a file for a key, files are spread over 256 subdirectories"""
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def touch(self, key):
+        """Marks a file for a key as recently used.
+
+        :param key: cache key
+        :type key: str
+
+        :return: path of the file, None if there is no file for the key
+        :rtype: str
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get(self, key):
+        """Returns contents of a file for a key and marks it as recently used.
+
+        :param key: cache key
+        :type key: str
+
+        :return: file contents, None if there is no file for the key
+        :rtype: bytes
+        """
+        path = self.touch(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as cached_file:
+                return cached_file.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, data):
+        """Stores data for a key and evicts least recently used files if the size cap is exceeded.
+
+        :param key: cache key
+        :type key: str
+        :param data: data to store
+        :type data: bytes
+        """
+        self.write(key, lambda cache_file: cache_file.write(data))
+
+    def write(self, key, write_to):
+        """Stores a file for a key written by a function passed in, so big data
+        can be written in parts. Evicts least recently used files if the size cap is exceeded.
+
+        :param key: cache key
+        :type key: str
+        :param write_to: function writing data to a binary file object passed in
+        :type write_to: function
+        """
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(file_descriptor, "wb") as temporary_file:
+                write_to(temporary_file)
+            size = os.path.getsize(temporary_path)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, _, size in self._files())
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        for directory, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _evict(self):
+        files = sorted(self._files(), key=lambda file: file[1])
+        self._size = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+
+class APIResponseCache(DiskCache):
+    """This is a class to keep raw responses of API Randomuser.me on disk, gzip compressed.
+    Responses are keyed by the API URL and request parameters, seed included.
+    class: 'DiskCache'
+    """
+
+    def __init__(self, directory, max_bytes):
+        super().__init__(directory, max_bytes, suffix=".json.gz")
+
+    def get_response(self, url, parameters):
+        """Returns a cached response body for a request.
+
+        :param url: API URL
+        :type url: str
+        :param parameters: request parameters
+        :type parameters: dict
+
+        :return: response body, None if the request is not cached
+        :rtype: bytes
+        """
+        compressed = self.get(self.key_for(url, parameters))
+        return None if compressed is None else gzip.decompress(compressed)
+
+    def set_response(self, url, parameters, content):
+        """Stores a response body for a request.
+
+        :param url: API URL
+        :type url: str
+        :param parameters: request parameters
+        :type parameters: dict
+        :param content: response body
+        :type content: bytes
+        """
+        self.set(self.key_for(url, parameters), gzip.compress(content, mtime=0))
+
+    def open_response(self, url, parameters):
+        """Opens a cached response body for a request to be read in parts.
+
+        :param url: API URL
+        :type url: str
+        :param parameters: request parameters
+        :type parameters: dict
+
+        :return: binary file object, None if the request is not cached
+        :rtype: class 'gzip.GzipFile'
+        """
+        path = self.touch(self.key_for(url, parameters))
+        if path is None:
+            return None
+        try:
+            return gzip.open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+    def set_response_stream(self, url, parameters, stream):
+        """Stores a response body read in parts from a stream.
+
+        :param url: API URL
+        :type url: str
+        :param parameters: request parameters
+        :type parameters: dict
+        :param stream: binary file object with a response body
+        :type stream: file object
+        """
+
+        def write_compressed(cache_file):
+            with gzip.GzipFile(fileobj=cache_file, mode="wb", mtime=0) as gzip_file:
+                shutil.copyfileobj(stream, gzip_file)
+
+        self.write(self.key_for(url, parameters), write_compressed)
@@ -0,0 +1,57 @@
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from persons_table import db
+from persons_table.warmup import warm_up_state
+
+health = Blueprint("health", __name__)
+
+
+@health.route("/ready")
+def ready():
+    """Answers 200 when the app is warmed up and ready to serve requests, 503 otherwise.
+    Reports number of seconds it took the process to become ready.
+    """
+    if not warm_up_state.is_ready():
+        return jsonify(ready=False, error=warm_up_state.error), 503
+
+    return jsonify(ready=True, time_to_ready=warm_up_state.time_to_ready)
+
+
+@health.route("/health")
+def health_check():
+    """Answers 200 when the database answers a query, 503 otherwise.
+    Reports stats of connection pools of the primary database and of replicas
+    of this worker process, see 'persons_table.database.PoolStats'.
+    """
+    engine = db.get_engine(current_app)
+    try:
+        with engine.connect() as connection:
+            connection.execute(select(1))
+        error = None
+    except SQLAlchemyError as database_error:
+        error = type(database_error).__name__
+
+    router = current_app.extensions.get("replica_router")
+    replicas = router.get_engines(current_app) if router is not None else []
+    return (
+        jsonify(
+            database=error is None,
+            error=error,
+            pools={
+                "primary": db.get_pool_stats(engine),
+                "replicas": [db.get_pool_stats(replica) for replica in replicas],
+            },
+        ),
+        200 if error is None else 503,
+    )
+
+
+@health.app_errorhandler(PoolTimeoutError)
+def pool_exhausted(error):
+    """Answers 503 when no database connection got free in 'pool_timeout' seconds,
+    so clients retry later instead of waiting in a queue of requests.
+    """
+    return "The service is busy, please try again", 503, {"Retry-After": "1"}
@@ -0,0 +1,244 @@
+import queue
+import threading
+import time
+
+# Put on a queue by a stage when it has nothing more to pass on
+DONE = object()
+# Seconds between checks whether the pipeline is stopped while waiting on a queue
+POLL_INTERVAL = 0.1
+
+
+class PipelineStopped(Exception):
+    """Raised in stages waiting on a queue when another stage has failed"""
+
+
+class StageStats:
+    """This is a class to count work done by one stage of the ingestion pipeline.
+    Time waiting for input and for room in the output queue is not counted as busy,
+    so throughput shows how fast a stage is on its own.
+
+    :param name: name of the stage
+    :type name: str
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.pages = 0
+        self.entries = 0
+        self.busy_seconds = 0.0
+        self.starved_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, entries, busy_seconds):
+        """Counts a page of entries processed in a number of seconds"""
+        with self._lock:
+            self.pages += 1
+            self.entries += entries
+            self.busy_seconds += busy_seconds
+
+    def add_waiting(self, starved_seconds=0.0, blocked_seconds=0.0):
+        """Counts seconds spent waiting for input and for room in the output queue"""
+        with self._lock:
+            self.starved_seconds += starved_seconds
+            self.blocked_seconds += blocked_seconds
+
+    def as_dict(self):
+        """Returns the stats with throughput in entries per busy second.
+
+        :return: stats of the stage
+        :rtype: dict
+        """
+        return {
+            "pages": self.pages,
+            "entries": self.entries,
+            "busy_seconds": self.busy_seconds,
+            "starved_seconds": self.starved_seconds,
+            "blocked_seconds": self.blocked_seconds,
+            "throughput": (
+                self.entries / self.busy_seconds if self.busy_seconds else None
+            ),
+        }
+
+
+class DepthTrackingQueue(queue.Queue):
+    """This is a class of a bounded queue that samples its depth on every put.
+    class: 'queue.Queue'
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.max_depth = 0
+        self.puts = 0
+        self.total_depth = 0
+
+    def _put(self, item):
+        super()._put(item)
+        self.puts += 1
+        self.total_depth += self._qsize()
+        self.max_depth = max(self.max_depth, self._qsize())
+
+    def as_dict(self):
+        """Returns the size limit and depth of the queue seen by puts.
+
+        :return: stats of the queue
+        :rtype: dict
+        """
+        return {
+            "maxsize": self.maxsize,
+            "max_depth": self.max_depth,
+            "mean_depth": self.total_depth / self.puts if self.puts else 0,
+        }
+
+
+class IngestionPipeline:
+    """This is a class to overlap network, CPU and database work of ingestion.
+    Fetch threads pass responses to a serialize thread through a bounded queue, and the
+    serialize thread passes rows to the insert stage running in the calling thread
+    (so it uses the session of the caller) through another one. When the insert stage
+    falls behind, the queues fill up and fetching stops until there is room again.
+
+    :param fetch: function returning a response for a task, called with items of the task
+    :type fetch: function
+    :param serialize: function returning a list of rows for a response
+    :type serialize: function
+    :param insert: function inserting a list of rows, called with the rows and their task
+    :type insert: function
+    :param fetch_threads: number of threads fetching responses
+    :type fetch_threads: int
+    :param queue_size: maximum number of pages waiting in each queue
+    :type queue_size: int
+    """
+
+    def __init__(self, fetch, serialize, insert, fetch_threads, queue_size):
+        self.fetch = fetch
+        self.serialize = serialize
+        self.insert = insert
+        self.fetch_threads = fetch_threads
+        self.queue_size = queue_size
+        self.stats = {}
+
+    def run(self, tasks):
+        """Fetches, serializes and inserts pages for all the tasks.
+        Re-raises the first error of any stage after all the stages are stopped.
+
+        :param tasks: tuples of arguments of 'fetch', the first one being a number of entries
+        :type tasks: list[tuple, ...]
+
+        :return: stats of stages and queues, see 'StageStats' and 'DepthTrackingQueue'
+        :rtype: dict
+        """
+        self._stopped = threading.Event()
+        self._errors = []
+        self._tasks = queue.SimpleQueue()
+        for task in tasks:
+            self._tasks.put(task)
+        self._fetchers_left = self.fetch_threads
+        self._fetchers_lock = threading.Lock()
+        responses = DepthTrackingQueue(self.queue_size)
+        rows = DepthTrackingQueue(self.queue_size)
+        stages = {name: StageStats(name) for name in ("fetch", "serialize", "insert")}
+
+        started_at = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=self._run_stage,
+                args=(self._fetch_stage, stages["fetch"], responses),
+                name=f"ingest-fetch-{number}",
+                daemon=True,
+            )
+            for number in range(self.fetch_threads)
+        ]
+        threads.append(
+            threading.Thread(
+                target=self._run_stage,
+                args=(self._serialize_stage, stages["serialize"], responses, rows),
+                name="ingest-serialize",
+                daemon=True,
+            )
+        )
+        for thread in threads:
+            thread.start()
+        try:
+            self._run_stage(self._insert_stage, stages["insert"], rows)
+        finally:
+            self._stopped.set()
+            for thread in threads:
+                thread.join()
+
+        self.stats = {name: stage.as_dict() for name, stage in stages.items()}
+        self.stats["responses_queue"] = responses.as_dict()
+        self.stats["rows_queue"] = rows.as_dict()
+        self.stats["elapsed_seconds"] = time.perf_counter() - started_at
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
+
+    def _run_stage(self, stage, *args):
+        try:
+            stage(*args)
+        except PipelineStopped:
+            pass
+        except Exception as error:
+            self._errors.append(error)
+            self._stopped.set()
+
+    def _get(self, input_queue, stats):
+        started_at = time.perf_counter()
+        while True:
+            try:
+                item = input_queue.get(timeout=POLL_INTERVAL)
+                stats.add_waiting(starved_seconds=time.perf_counter() - started_at)
+                return item
+            except queue.Empty:
+                if self._stopped.is_set():
+                    raise PipelineStopped
+
+    def _put(self, output_queue, item, stats):
+        started_at = time.perf_counter()
+        while True:
+            try:
+                output_queue.put(item, timeout=POLL_INTERVAL)
+                stats.add_waiting(blocked_seconds=time.perf_counter() - started_at)
+                return
+            except queue.Full:
+                if self._stopped.is_set():
+                    raise PipelineStopped
+
+    def _fetch_stage(self, stats, responses):
+        try:
+            while not self._stopped.is_set():
+                try:
+                    task = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                started_at = time.perf_counter()
+                response = self.fetch(*task)
+                stats.add(task[0], time.perf_counter() - started_at)
+                self._put(responses, (task, response), stats)
+        finally:
+            with self._fetchers_lock:
+                self._fetchers_left -= 1
+                last_fetcher = not self._fetchers_left
+        if last_fetcher:
+            self._put(responses, DONE, stats)
+
+    def _serialize_stage(self, stats, responses, rows):
+        item = self._get(responses, stats)
+        while item is not DONE:
+            task, response = item
+            started_at = time.perf_counter()
+            page_rows = self.serialize(response)
+            stats.add(len(page_rows), time.perf_counter() - started_at)
+            self._put(rows, (task, page_rows), stats)
+            item = self._get(responses, stats)
+        self._put(rows, DONE, stats)
+
+    def _insert_stage(self, stats, rows):
+        item = self._get(rows, stats)
+        while item is not DONE:
+            task, page_rows = item
+            started_at = time.perf_counter()
+            self.insert(page_rows, task)
+            stats.add(len(page_rows), time.perf_counter() - started_at)
+            item = self._get(rows, stats)
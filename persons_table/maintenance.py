@@ -0,0 +1,28 @@
+import click
+from flask.cli import with_appcontext
+
+from persons_table.config import BULK_BATCH_SIZE
+from persons_table.models import DatabaseHandler
+
+
+@click.command("purge-deleted")
+@click.option(
+    "--batch-size",
+    type=int,
+    default=BULK_BATCH_SIZE,
+    show_default=True,
+    help="Number of entries removed with one statement",
+)
+@with_appcontext
+def purge_deleted_command(batch_size):
+    """Remove soft-deleted entries from the Person table for good."""
+    purged = DatabaseHandler.purge_deleted_people(batch_size)
+    click.echo(f"Purged {purged} deleted entries")
+
+
+@click.command("rebuild-stats")
+@with_appcontext
+def rebuild_stats_command():
+    """Count all the entries of the Person table in stats again."""
+    DatabaseHandler.rebuild_stats()
+    click.echo("Stats are rebuilt")
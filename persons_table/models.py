@@ -1,8 +1,40 @@
+import json
+import secrets
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from random import random
 
-import requests
+from flask import current_app
+from sqlalchemy import case, delete, literal, literal_column, select, union_all, update
+from sqlalchemy.exc import IntegrityError
 
-from persons_table import db
+from persons_table import db, http_client
+from persons_table.config import (
+    API_CACHE_DIR,
+    API_CACHE_MAX_BYTES,
+    API_CACHE_OFFLINE,
+    BULK_BATCH_SIZE,
+    INGEST_CHECKPOINTS,
+    INGEST_CHUNK_SIZE,
+    INGEST_FETCH_THREADS,
+    INGEST_QUEUE_SIZE,
+    INGEST_SEED,
+    INGEST_TOP_UP_ATTEMPTS,
+    RANDOMUSER_API_URL,
+    SERIALIZE_PROCESSES,
+    SOFT_DELETE,
+)
+from persons_table.database import (
+    column_in,
+    insert_adding_from_select,
+    insert_ignoring_conflicts,
+    returning_executions,
+)
+from persons_table.disk_cache import APIResponseCache
+from persons_table.ingest import IngestionPipeline
 
 
 class Person(db.Model):
@@ -21,8 +53,19 @@ class Person(db.Model):
     :type email: str
     :param location: location of a person in the database
     :type location: str
-    :param pic_link: link to a picture file of a person in the database
+    :param pic_link: link to a picture file of a person in the database, in the largest size
     :type pic_link: str
+    :param pic_medium_link: link to a medium size of the picture, if there is one
+    :type pic_medium_link: str, optional
+    :param pic_thumbnail_link: link to a thumbnail size of the picture, if there is one
+    :type pic_thumbnail_link: str, optional
+    :param version: number of a version of a person data, incremented on every update
+    :type version: int, optional
+    :param deleted_at: time of deletion of a soft-deleted entry, None for other entries
+    :type deleted_at: class 'datetime.datetime', optional
+
+    Emails are unique regardless of case and surrounding spaces among entries
+    that are not deleted.
     """
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -33,28 +76,590 @@ class Person(db.Model):
     email = db.Column(db.String(50), nullable=False)
     location = db.Column(db.String(200), nullable=False)
     pic_link = db.Column(db.String(500), nullable=False)
+    pic_medium_link = db.Column(db.String(500), nullable=True)
+    pic_thumbnail_link = db.Column(db.String(500), nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    deleted_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index(
+            "ix_person_email_normalized",
+            db.func.lower(db.func.trim(email)),
+            unique=True,
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        # Only soft-deleted entries are indexed, so the index stays small
+        # and purging them does not scan the table
+        db.Index(
+            "ix_person_deleted_at",
+            deleted_at,
+            postgresql_where=deleted_at.isnot(None),
+            sqlite_where=deleted_at.isnot(None),
+        ),
+    )
+
+
+class DuplicateEmailError(ValueError):
+    """Raised when an entry gets an email of another entry in the Person table"""
+
+    def __init__(self, message="Entry with this email already exists"):
+        super().__init__(message)
+
+
+class ConcurrentUpdateError(Exception):
+    """Raised when an entry was changed by someone else since its data was read"""
+
+    def __init__(
+        self,
+        message="This entry was changed by someone else since the form was opened, "
+        "reload the page to see the changes",
+    ):
+        super().__init__(message)
+
+
+class IngestionRun(db.Model):
+    """This is a class to represent a checkpointed reseed that is not finished yet
+    :class: 'SQLAlchemy.Model'
+
+    :param id: id and primary key of a reseed
+    :type id: int, optional
+    :param target_quantity: number of entries requested in the Person table
+    :type target_quantity: int
+    :param quantity: number of entries to collect from API
+    :type quantity: int
+    :param seed: seed of pages requested from API
+    :type seed: str
+    :param page_size: number of entries in a page requested from API
+    :type page_size: int
+    """
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    target_quantity = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    seed = db.Column(db.String(32), nullable=False)
+    page_size = db.Column(db.Integer, nullable=False)
+
+
+class IngestionCheckpoint(db.Model):
+    """This is a class to represent a page of a reseed inserted into the Person table
+    :class: 'SQLAlchemy.Model'
+
+    :param run_id: id of a reseed
+    :type run_id: int
+    :param page: number of a page requested from API
+    :type page: int
+    """
+
+    run_id = db.Column(
+        db.Integer,
+        db.ForeignKey("ingestion_run.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    page = db.Column(db.Integer, primary_key=True)
+
+
+class WarmUp(db.Model):
+    """This is a class to represent the warm-up filling an empty Person table, it has
+    one row at most. A process claims the warm-up before filling the table, so processes
+    started together never fill it twice, see 'persons_table.warmup.warm_up'.
+    :class: 'SQLAlchemy.Model'
+
+    :param id: id and primary key, always 1
+    :type id: int
+    :param started_at: UTC time the warm-up was claimed at, None if it is not claimed
+    :type started_at: class 'datetime.datetime', optional
+    :param duration: number of seconds the warm-up took, None until it is finished
+    :type duration: float, optional
+    """
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    duration = db.Column(db.Float, nullable=True)
+
+
+class PersonStat(db.Model):
+    """This is a class to represent a number of entries of the Person table sharing
+    a value of a dimension, e.g. a gender or a country. Numbers are changed together
+    with every change of the Person table, so they are read without scanning it.
+    :class: 'SQLAlchemy.Model'
+
+    :param dimension: name of a dimension, one of 'STAT_DIMENSIONS'
+    :type dimension: str
+    :param value: value of the dimension
+    :type value: str
+    :param entries: number of entries that are not deleted with the value
+    :type entries: int
+    """
+
+    dimension = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(200), primary_key=True)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+
+
+def last_part(column, separator):
+    """Returns an SQL expression for a part of a string after the last separator
+    without surrounding spaces, the whole string if there is no separator.
+    Trimming all the characters but separators from the right leaves the string
+    up to the last separator, so it works the same in PostgreSQL and SQLite.
+
+    :param column: string column
+    :type column: class 'sqlalchemy.Column'
+    :param separator: one character separator
+    :type separator: str
+
+    :return: SQL expression
+    :rtype: class 'sqlalchemy.sql.functions.Function'
+    """
+    prefix = db.func.rtrim(column, db.func.replace(column, separator, ""))
+    return db.func.trim(db.func.substr(column, db.func.length(prefix) + 1))
+
+
+# Dimensions of the stats page, locations are stored as "city, country"
+STAT_DIMENSIONS = {
+    "gender": Person.gender,
+    "country": last_part(Person.location, ","),
+    "email_domain": db.func.lower(last_part(Person.email, "@")),
+}
+# Columns of the Person table the dimensions depend on
+STAT_COLUMNS = ("gender", "location", "email")
 
 
 # --------- Creating a class to handle the database ---------------- #
 
 
-def get_API_response(quantity):
-    """Collects data from API Randomuser.me.
+def make_API_parameters(quantity, seed=None, page=None):
+    """Makes query parameters for a request to API Randomuser.me.
 
     :param quantity: requested number of entries in data to collect
     :type quantity: int
+    :param seed: seed to get the same data in repeated requests, defaults to None
+    :type seed: str, optional
+    :param page: page of data generated with the seed, defaults to None
+    :type page: int, optional
 
-    :return: collected data
+    :return: query parameters
     :rtype: dict
     """
-
-    url = "https://randomuser.me/api/"
     parameters = {
         "inc": "gender, name, cell, email, location, picture",
         "results": quantity,
     }
-    response = requests.get(url, params=parameters)
-    return response.json()
+    if seed is not None:
+        parameters["seed"] = seed
+    if page is not None:
+        parameters["page"] = page
+    return parameters
+
+
+api_response_cache = (
+    APIResponseCache(API_CACHE_DIR, API_CACHE_MAX_BYTES) if API_CACHE_DIR else None
+)
+
+
+def fetch_API_content(quantity, seed=None, page=None):
+    """Collects a raw response body from API Randomuser.me.
+    Responses are replayed from the on-disk cache if it is configured.
+
+    :param quantity: requested number of entries in data to collect
+    :type quantity: int
+    :param seed: seed to get the same data in repeated requests, defaults to None
+    :type seed: str, optional
+    :param page: page of data generated with the seed, defaults to None
+    :type page: int, optional
+
+    :return: response body with data in JSON
+    :rtype: bytes
+    """
+
+    parameters = make_API_parameters(quantity, seed, page)
+    if api_response_cache is not None:
+        content = api_response_cache.get_response(RANDOMUSER_API_URL, parameters)
+        if content is not None:
+            return content
+        if API_CACHE_OFFLINE:
+            raise ConnectionError(f"No cached API response for {parameters}")
+
+    response = http_client.get(RANDOMUSER_API_URL, params=parameters)
+    if api_response_cache is not None and response.ok:
+        api_response_cache.set_response(
+            RANDOMUSER_API_URL, parameters, response.content
+        )
+    return response.content
+
+
+def get_API_response(quantity, seed=None, page=None):
+    """Collects data from API Randomuser.me.
+    Responses are replayed from the on-disk cache if it is configured.
+
+    :param quantity: requested number of entries in data to collect
+    :type quantity: int
+    :param seed: seed to get the same data in repeated requests, defaults to None
+    :type seed: str, optional
+    :param page: page of data generated with the seed, defaults to None
+    :type page: int, optional
+
+    :return: collected data
+    :rtype: dict
+    """
+
+    return json.loads(fetch_API_content(quantity, seed, page))
+
+
+def open_API_response(quantity, seed=None, page=None):
+    """Collects a raw response body from API Randomuser.me into a file to be parsed in parts.
+    Responses are replayed from the on-disk cache if it is configured, otherwise the body
+    is streamed into a temporary file, so it is never kept in memory as a whole.
+
+    :param quantity: requested number of entries in data to collect
+    :type quantity: int
+    :param seed: seed to get the same data in repeated requests, defaults to None
+    :type seed: str, optional
+    :param page: page of data generated with the seed, defaults to None
+    :type page: int, optional
+
+    :return: binary file object with response body in JSON
+    :rtype: file object
+    """
+
+    parameters = make_API_parameters(quantity, seed, page)
+    if api_response_cache is not None:
+        response_file = api_response_cache.open_response(RANDOMUSER_API_URL, parameters)
+        if response_file is not None:
+            return response_file
+        if API_CACHE_OFFLINE:
+            raise ConnectionError(f"No cached API response for {parameters}")
+
+    with http_client.get(
+        RANDOMUSER_API_URL, params=parameters, stream=True
+    ) as response:
+        response.raw.decode_content = True
+        if api_response_cache is not None and response.ok:
+            api_response_cache.set_response_stream(
+                RANDOMUSER_API_URL, parameters, response.raw
+            )
+            return api_response_cache.open_response(RANDOMUSER_API_URL, parameters)
+        # The body is read here and not by the parser, so fetching threads
+        # keep waiting for the network while other pages are parsed
+        response_file = tempfile.TemporaryFile()
+        shutil.copyfileobj(response.raw, response_file)
+    response_file.seek(0)
+    return response_file
+
+
+def iter_API_results(quantity, seed=None, page=None):
+    """Collects data from API Randomuser.me parsing the response body incrementally.
+    People data is yielded one by one as it is read from the network (or from the on-disk
+    cache if it is configured), so the whole response is never kept in memory.
+
+    :param quantity: requested number of entries in data to collect
+    :type quantity: int
+    :param seed: seed to get the same data in repeated requests, defaults to None
+    :type seed: str, optional
+    :param page: page of data generated with the seed, defaults to None
+    :type page: int, optional
+
+    :return: generator of people data as in 'results' of API response
+    :rtype: generator of dict
+    """
+    # Imported on first use, so processes that never call the API start faster
+    import ijson
+
+    parameters = make_API_parameters(quantity, seed, page)
+    if api_response_cache is None:
+        with http_client.get(
+            RANDOMUSER_API_URL, params=parameters, stream=True
+        ) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield from ijson.items(response.raw, "results.item")
+        return
+
+    response_file = api_response_cache.open_response(RANDOMUSER_API_URL, parameters)
+    if response_file is None:
+        if API_CACHE_OFFLINE:
+            raise ConnectionError(f"No cached API response for {parameters}")
+        with http_client.get(
+            RANDOMUSER_API_URL, params=parameters, stream=True
+        ) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            api_response_cache.set_response_stream(
+                RANDOMUSER_API_URL, parameters, response.raw
+            )
+        response_file = api_response_cache.open_response(RANDOMUSER_API_URL, parameters)
+    with response_file:
+        yield from ijson.items(response_file, "results.item")
+
+
+def iter_chunks(iterable, chunk_size):
+    """Splits an iterable into lists of 'chunk_size' items, the last one may be shorter.
+
+    :param iterable: any iterable
+    :type iterable: iterable
+    :param chunk_size: number of items in a chunk
+    :type chunk_size: int
+
+    :return: generator of chunks
+    :rtype: generator of list
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def reseed_seed(current_quantity):
+    """Returns a seed of a reseed growing the table from a number of entries.
+    If the API response cache is configured or 'INGEST_SEED' is set, identical reseeds
+    get the same seed, so their pages are replayed from the cache. Growing the table
+    further gets another one, so pages the table was filled with before are not
+    requested again. Otherwise every reseed collects new random people.
+
+    :param current_quantity: number of entries in the table before the reseed
+    :type current_quantity: int
+
+    :return: seed made of 'INGEST_SEED' and the number of entries,
+        None if a random one is to be used
+    :rtype: str
+    """
+    if INGEST_SEED is None and api_response_cache is None:
+        return None
+    return f"{INGEST_SEED or 'persons-table'}-{current_quantity}"
+
+
+def make_ingestion_tasks(quantity, seed=None, page_size=None):
+    """Splits a number of entries to collect into pages.
+    Pages are requested with one seed, so they never repeat each other.
+
+    :param quantity: requested number of entries in data to collect
+    :type quantity: int
+    :param seed: seed to get the same data in repeated requests, defaults to a random one
+    :type seed: str, optional
+    :param page_size: number of entries in a page, defaults to 'INGEST_CHUNK_SIZE'
+    :type page_size: int, optional
+
+    :return: (quantity, seed, page) arguments of requests for every page
+    :rtype: list[tuple, ...]
+    """
+    if seed is None:
+        seed = secrets.token_hex(8)
+    page_size = page_size or INGEST_CHUNK_SIZE
+    return [
+        (min(page_size, quantity - offset), seed, page)
+        for page, offset in enumerate(range(0, quantity, page_size), start=1)
+    ]
+
+
+def parse_API_rows(response_file):
+    """Converts a raw response body from API to a list of rows of the Person table.
+    The body is parsed incrementally, so only rows of the page are kept in memory.
+
+    :param response_file: binary file object with response body in JSON
+    :type response_file: file object
+
+    :return: list of rows as dicts of column values
+    :rtype: list[dict, ...]
+    """
+    # Imported on first use, so processes that never call the API start faster
+    import ijson
+
+    with response_file:
+        rows = serialize_API_rows(ijson.items(response_file, "results.item"))
+        if not rows:
+            # Responses without people data are short messages of API errors
+            response_file.seek(0)
+            API_response = json.load(response_file)
+            if "results" not in API_response:
+                raise ConnectionError(f"API error: {API_response.get('error')}")
+    return rows
+
+
+def serialize_API_rows(API_data):
+    """Converts collected data from API to a list of rows of the Person table.
+
+    :param API_data: collected data from API
+    :type API_data: dict
+
+    :return: list of rows as dicts of column values
+    :rtype: list[dict, ...]
+    """
+
+    return [
+        {
+            "gender": person_data["gender"],
+            "first_name": person_data["name"]["first"],
+            "last_name": person_data["name"]["last"],
+            "cell": person_data["cell"],
+            "email": person_data["email"],
+            "location": f"{person_data['location']['city']}, {person_data['location']['country']}",
+            "pic_link": person_data["picture"]["large"],
+            "pic_medium_link": person_data["picture"].get("medium"),
+            "pic_thumbnail_link": person_data["picture"].get("thumbnail"),
+        }
+        for person_data in API_data
+    ]
+
+
+# Columns filled from API data, in order of columns returned by 'serialize_API_columns'
+PERSON_COLUMNS = (
+    "gender",
+    "first_name",
+    "last_name",
+    "cell",
+    "email",
+    "location",
+    "pic_link",
+    "pic_medium_link",
+    "pic_thumbnail_link",
+)
+# Columns with links to sizes of a picture and widths of the sizes in pixels,
+# from the smallest one. Sizes of pictures of API Randomuser.me are square
+PICTURE_SIZES = (("pic_thumbnail_link", 48), ("pic_medium_link", 72), ("pic_link", 128))
+
+
+def with_picture_sizes_reset(person_data):
+    """Returns column values of the Person table where a new link to a picture
+    without links to its other sizes drops links to sizes of the old picture.
+
+    :param person_data: column values to set
+    :type person_data: dict
+
+    :return: column values to set
+    :rtype: dict
+    """
+    if "pic_link" not in person_data:
+        return person_data
+    person_data = dict(person_data)
+    for column, _ in PICTURE_SIZES:
+        person_data.setdefault(column, None)
+    return person_data
+
+
+def serialize_API_columns(API_data):
+    """Converts collected data from API to columns of the Person table.
+    Columns are much cheaper to pass between processes than rows as dicts.
+
+    :param API_data: collected data from API
+    :type API_data: dict
+
+    :return: lists of column values in order of 'PERSON_COLUMNS'
+    :rtype: tuple[list, ...]
+    """
+    rows = serialize_API_rows(API_data)
+    return tuple([row[column] for row in rows] for column in PERSON_COLUMNS)
+
+
+def rows_from_columns(columns):
+    """Converts columns returned by 'serialize_API_columns' back to rows.
+
+    :param columns: lists of column values in order of 'PERSON_COLUMNS'
+    :type columns: tuple[list, ...]
+
+    :return: list of rows as dicts of column values
+    :rtype: list[dict, ...]
+    """
+    return [dict(zip(PERSON_COLUMNS, values)) for values in zip(*columns)]
+
+
+def collect_API_columns(quantity, seed=None, page=None):
+    """Collects a page of data from API and converts it to columns of the Person table.
+    Runs in worker processes of 'collect_API_columns_in_parallel'.
+
+    :param quantity: requested number of entries in data to collect
+    :type quantity: int
+    :param seed: seed to get the same data in repeated requests, defaults to None
+    :type seed: str, optional
+    :param page: page of data generated with the seed, defaults to None
+    :type page: int, optional
+
+    :return: lists of column values in order of 'PERSON_COLUMNS'
+    :rtype: tuple[list, ...]
+    """
+    return serialize_API_columns(iter_API_results(quantity, seed, page))
+
+
+def collect_API_columns_in_parallel(tasks, processes):
+    """Collects pages of data from API, fetched, parsed and converted to columns
+    by a pool of worker processes.
+
+    :param tasks: (quantity, seed, page) arguments of requests for every page
+    :type tasks: list[tuple, ...]
+    :param processes: number of worker processes
+    :type processes: int
+
+    :return: generator of columns of pages in order of tasks
+    :rtype: generator of tuple[list, ...]
+    """
+    if not tasks:
+        return
+    cache_settings = (
+        (api_response_cache.directory, api_response_cache.max_bytes)
+        if api_response_cache is not None
+        else None
+    )
+    with ProcessPoolExecutor(
+        processes,
+        initializer=init_API_worker,
+        initargs=(RANDOMUSER_API_URL, cache_settings, API_CACHE_OFFLINE),
+    ) as executor:
+        yield from executor.map(collect_API_columns, *zip(*tasks))
+
+
+def init_API_worker(API_url, cache_settings, offline):
+    """Prepares a worker process collecting pages from API. Settings of the serving
+    process are passed in rather than inherited, so workers are the same with any
+    start method of processes ('fork', 'spawn' or 'forkserver').
+
+    :param API_url: URL of API Randomuser.me
+    :type API_url: str
+    :param cache_settings: directory and size cap of the API response cache, None if it is off
+    :type cache_settings: tuple, optional
+    :param offline: whether requests missing in the cache fail instead of calling the API
+    :type offline: bool
+    """
+    global RANDOMUSER_API_URL, API_CACHE_OFFLINE, api_response_cache
+    # Forked workers must not share pooled connections of the serving process
+    http_client.discard()
+    RANDOMUSER_API_URL = API_url
+    API_CACHE_OFFLINE = offline
+    api_response_cache = APIResponseCache(*cache_settings) if cache_settings else None
+
+
+def ingest_pages(tasks, processes, insert_page):
+    """Collects pages of data from API and passes rows of every page to a function inserting them.
+    Pages are collected by a pool of worker processes, or by the ingestion pipeline
+    in this process if the number of processes is 0.
+
+    :param tasks: (quantity, seed, page) arguments of requests for every page
+    :type tasks: list[tuple, ...]
+    :param processes: number of worker processes
+    :type processes: int
+    :param insert_page: function called with rows and a task of every page
+    :type insert_page: function
+
+    :return: stats of the ingestion pipeline, None if pages were collected by processes
+    :rtype: dict
+    """
+    if processes:
+        # Workers only fetch and serialize, this process is the single writer
+        for task, columns in zip(
+            tasks, collect_API_columns_in_parallel(tasks, processes)
+        ):
+            insert_page(rows_from_columns(columns), task)
+        return None
+
+    pipeline = IngestionPipeline(
+        open_API_response,
+        parse_API_rows,
+        insert_page,
+        INGEST_FETCH_THREADS,
+        INGEST_QUEUE_SIZE,
+    )
+    stats = pipeline.run(tasks)
+    current_app.logger.info("Ingestion pipeline stats: %s", stats)
+    return stats
 
 
 def serialize_API_data(API_data):
@@ -67,33 +672,125 @@ def serialize_API_data(API_data):
     :rtype: list[Person(db.Model), ...]
     """
 
-    input_for_db = []
-
-    for person_data in API_data:
-        person_object = Person(
-            gender=person_data["gender"],
-            first_name=person_data["name"]["first"],
-            last_name=person_data["name"]["last"],
-            cell=person_data["cell"],
-            email=person_data["email"],
-            location=f"{person_data['location']['city']}, {person_data['location']['country']}",
-            pic_link=person_data["picture"]["large"],
-        )
-        input_for_db.append(person_object)
-
-    return input_for_db
+    return [Person(**row) for row in serialize_API_rows(API_data)]
 
 
 def bulk_insert_into_db(input_for_db):
-    """Conducts bulk insert into the database
+    """Conducts bulk insert into the database.
+    People with emails already in the database are skipped.
 
     :param input_for_db: list of Person objects
     :type input_for_db:list[Person(db.Model), ...]
     """
-    db.session.bulk_save_objects(input_for_db)
+    insert_rows(
+        [
+            {column: getattr(person, column) for column in PERSON_COLUMNS}
+            for person in input_for_db
+        ]
+    )
     db.session.commit()
 
 
+def insert_rows(rows):
+    """Inserts rows into the Person table with one executemany statement.
+    Rows with emails already in the database are skipped by the database.
+    Changes are not committed.
+
+    :param rows: list of rows as dicts of column values
+    :type rows: list[dict, ...]
+    """
+    if not rows:
+        return
+    dialect = db.engine.dialect
+    insert = insert_ignoring_conflicts(Person.__table__, dialect.name)
+    # Only rows inserted here are added to stats, not skipped ones or rows
+    # of other transactions, which count their own rows
+    if dialect.full_returning:
+        inserted_ids = [
+            person_id
+            for statement, parameters in returning_executions(
+                insert, Person.id, rows, dialect
+            )
+            for person_id in db.session.execute(statement, parameters).scalars()
+        ]
+        inserted = column_in(Person.id, inserted_ids, dialect.name)
+    else:
+        inserted_count = db.session.execute(insert, rows).rowcount
+        # The transaction holds the write lock of SQLite now, so the rows
+        # it has just inserted are the last ones
+        last_id = db.session.query(db.func.max(Person.id)).scalar() or 0
+        inserted = Person.id > last_id - inserted_count
+    db.session.execute(change_stats(inserted, 1))
+
+
+def change_stats(condition, sign):
+    """Returns a statement adding entries of the Person table matching a condition
+    to stats, or subtracting them with a negative sign. Entries are counted by
+    the database with one INSERT ... SELECT, without being read.
+
+    :param condition: condition for a WHERE clause
+    :type condition: class 'sqlalchemy.sql.expression.ColumnElement'
+    :param sign: 1 to add entries, -1 to subtract them
+    :type sign: int
+
+    :return: INSERT statement
+    :rtype: class 'sqlalchemy.sql.expression.Insert'
+    """
+    counts = union_all(
+        *(
+            select(literal(dimension), value, db.func.count() * sign).where(
+                condition, Person.deleted_at.is_(None)
+            )
+            # Grouped by position, PostgreSQL does not match expressions with parameters
+            .group_by(literal_column("2"))
+            for dimension, value in STAT_DIMENSIONS.items()
+        )
+    )
+    return insert_adding_from_select(
+        PersonStat.__table__, ["dimension", "value"], "entries", counts
+    )
+
+
+@contextmanager
+def stats_changed_by(condition, columns=STAT_COLUMNS):
+    """Subtracts entries of the Person table matching a condition from stats before
+    the block and adds them back after it, if any of columns passed in are changed
+    in the block, so stats follow the change. Changes are not committed.
+
+    :param condition: condition for a WHERE clause matching entries changed in the block
+    :type condition: class 'sqlalchemy.sql.expression.ColumnElement'
+    :param columns: names of changed columns, defaults to 'STAT_COLUMNS'
+    :type columns: iterable[str, ...], optional
+    """
+    if set(columns).isdisjoint(STAT_COLUMNS):
+        yield
+        return
+    db.session.execute(change_stats(condition, -1))
+    yield
+    db.session.execute(change_stats(condition, 1))
+
+
+@contextmanager
+def unique_emails():
+    """Rolls the session back and raises 'DuplicateEmailError' if statements
+    run within give an entry an email already taken by another one.
+    """
+    try:
+        yield
+    except IntegrityError as error:
+        db.session.rollback()
+        raise DuplicateEmailError() from error
+
+
+def live_people():
+    """Returns a query of entries of the Person table that are not soft-deleted.
+
+    :return: SQLAlchemy.Session.Query object with entries that are not deleted
+    :rtype: SQLAlchemy.Session.Query object
+    """
+    return db.session.query(Person).filter(Person.deleted_at.is_(None))
+
+
 class DatabaseHandler:
     """This is a class to wrap all working with database functionality.
     Can be used without instances."""
@@ -104,38 +801,155 @@ class DatabaseHandler:
         db.create_all()
 
     @staticmethod
-    def rerecord_data(quantity_requested):
+    def rerecord_data(
+        quantity_requested,
+        processes=SERIALIZE_PROCESSES,
+        seed=None,
+        checkpointed=INGEST_CHECKPOINTS,
+    ):
         """Delete all the data in the Person table and inserts a new data.
         All the data is collected with help of randomuser.me API.
         Parameter 'quantity' determines the number of entries of a new data.
 
         :param quantity_requested: a number of records needed in a new dataset in the database
         :type quantity_requested: int
+        :param processes: number of processes collecting data from API in parallel,
+            data is collected in this process if 0, defaults to 'SERIALIZE_PROCESSES'
+        :type processes: int, optional
+        :param seed: seed to get the same data in repeated requests,
+            defaults to one made by 'reseed_seed' or a random one
+        :type seed: str, optional
+        :param checkpointed: whether to commit every page with a checkpoint,
+            see 'rerecord_data_checkpointed', defaults to 'INGEST_CHECKPOINTS'
+        :type checkpointed: bool, optional
+
+        :return: stats of stages of the ingestion pipeline if entries were collected
+            in this process, see 'IngestionPipeline.run'
+        :rtype: dict
         """
+        if checkpointed:
+            return DatabaseHandler.rerecord_data_checkpointed(
+                quantity_requested, processes, seed
+            )
 
-        current_quantity = db.session.query(Person).count()
+        current_quantity = DatabaseHandler.count_entries()
         if quantity_requested < current_quantity:
             entry_start_delete_from = (
-                db.session.query(Person)
-                .order_by(Person.id)
-                .offset(quantity_requested)
-                .first()
+                live_people().order_by(Person.id).offset(quantity_requested).first()
+            )
+            DatabaseHandler.delete_where(
+                Person.id >= entry_start_delete_from.id, soft=False
             )
-            db.session.query(Person).filter(
-                Person.id >= entry_start_delete_from.id
-            ).delete()
             db.session.commit()
         elif quantity_requested > current_quantity:
-            API_data_to_insert = get_API_response(
-                quantity_requested - current_quantity
-            )["results"]
-            input_for_db = serialize_API_data(API_data_to_insert)
-            bulk_insert_into_db(input_for_db)
+            if seed is None:
+                seed = reseed_seed(current_quantity)
+            # Entries with emails already in the database are dropped on insert,
+            # so lacking ones are collected again with new random seeds
+            for attempt in range(1 + INGEST_TOP_UP_ATTEMPTS):
+                stats = ingest_pages(
+                    make_ingestion_tasks(
+                        quantity_requested - current_quantity,
+                        seed if not attempt else None,
+                    ),
+                    processes,
+                    lambda rows, task: insert_rows(rows),
+                )
+                db.session.commit()
+                current_quantity = DatabaseHandler.count_entries()
+                if current_quantity >= quantity_requested:
+                    break
+            return stats
+
+    @staticmethod
+    def rerecord_data_checkpointed(
+        quantity_requested, processes=SERIALIZE_PROCESSES, seed=None
+    ):
+        """Same as 'rerecord_data', but every page collected from API is committed together
+        with a checkpoint. If a previous call for the same quantity failed midway, it is
+        resumed with the same seed and pages already inserted are not collected again.
+        Checkpoints are deleted when all the pages are inserted, then entries dropped
+        as duplicates are topped up without checkpoints.
+
+        :param quantity_requested: a number of records needed in a new dataset in the database
+        :type quantity_requested: int
+        :param processes: number of processes collecting data from API in parallel,
+            data is collected in this process if 0, defaults to 'SERIALIZE_PROCESSES'
+        :type processes: int, optional
+        :param seed: seed to get the same data in repeated requests,
+            defaults to one made by 'reseed_seed' or a random one
+        :type seed: str, optional
+
+        :return: stats of stages of the ingestion pipeline if entries were collected
+            in this process, see 'IngestionPipeline.run'
+        :rtype: dict
+        """
+        run = db.session.query(IngestionRun).first()
+        if run is not None and run.target_quantity != quantity_requested:
+            DatabaseHandler.delete_ingestion_run(run.id)
+            run = None
+
+        if run is None:
+            current_quantity = DatabaseHandler.count_entries()
+            if quantity_requested <= current_quantity:
+                return DatabaseHandler.rerecord_data(
+                    quantity_requested, processes, seed, checkpointed=False
+                )
+            run = IngestionRun(
+                target_quantity=quantity_requested,
+                quantity=quantity_requested - current_quantity,
+                seed=seed or reseed_seed(current_quantity) or secrets.token_hex(8),
+                page_size=INGEST_CHUNK_SIZE,
+            )
+            db.session.add(run)
+            db.session.commit()
+
+        run_id = run.id
+        completed_pages = {
+            page
+            for page, in db.session.query(IngestionCheckpoint.page).filter_by(
+                run_id=run_id
+            )
+        }
+        tasks = [
+            task
+            for task in make_ingestion_tasks(run.quantity, run.seed, run.page_size)
+            if task[2] not in completed_pages
+        ]
+
+        def insert_page(rows, task):
+            insert_rows(rows)
+            db.session.execute(
+                IngestionCheckpoint.__table__.insert(),
+                {"run_id": run_id, "page": task[2]},
+            )
+            db.session.commit()
+
+        stats = ingest_pages(tasks, processes, insert_page)
+        DatabaseHandler.delete_ingestion_run(run_id)
+        if DatabaseHandler.count_entries() < quantity_requested:
+            # Some entries were dropped as duplicates, a few are topped up without checkpoints
+            DatabaseHandler.rerecord_data(
+                quantity_requested, processes, checkpointed=False
+            )
+        return stats
+
+    @staticmethod
+    def delete_ingestion_run(run_id):
+        """Deletes a checkpointed reseed with all its checkpoints.
+
+        :param run_id: id of a reseed in the IngestionRun table
+        :type run_id: int
+        """
+        db.session.query(IngestionCheckpoint).filter_by(run_id=run_id).delete()
+        db.session.query(IngestionRun).filter_by(id=run_id).delete()
+        db.session.commit()
 
     @staticmethod
     def create_new_record(edit_form):
         """
         Creates new entry in the Person table of the database.
+        Raises 'DuplicateEmailError' if the email is taken by another entry.
 
         :param edit_form: object of a 'EditForm' class, has a data passed in in it
         :type edit_form: class 'EditForm(FlaskForm)'
@@ -151,6 +965,9 @@ class DatabaseHandler:
         )
 
         db.session.add(new_person)
+        with unique_emails():
+            db.session.flush()
+        db.session.execute(change_stats(Person.id == new_person.id, 1))
         db.session.commit()
 
     @staticmethod
@@ -160,49 +977,232 @@ class DatabaseHandler:
         :return: SQLAlchemy.Session.Query object with all the data in a database ordered by it's id
         :rtype: SQLAlchemy.Session.Query object
         """
-        return db.session.query(Person).order_by(Person.id)
+        return live_people().order_by(Person.id)
+
+    @staticmethod
+    def get_people_slice(limit, after=None, offset=0):
+        """Returns a number of entries ordered by id, following an id passed in or,
+        without one, skipping a number of entries. Following a known id uses the
+        primary key index, so reading the next slice costs the same anywhere in the table.
+
+        :param limit: maximum number of entries to return
+        :type limit: int
+        :param after: id of the last entry of the previous slice, defaults to None
+        :type after: int, optional
+        :param offset: number of entries to skip if there is no id, defaults to 0
+        :type offset: int, optional
+        :return: entries of the slice
+        :rtype: list[class 'Person(db.Model)', ...]
+        """
+        query = DatabaseHandler.all_records_query()
+        if after is not None:
+            query = query.filter(Person.id > after)
+        elif offset:
+            query = query.offset(offset)
+        return query.limit(limit).all()
 
     @staticmethod
     def get_person_data(person_id):
-        """Returns a person data with an id passed in.
+        """Returns a person data with an id passed in, None if there is no such person.
 
         :param person_id: id of a person in the Person table in the database
         :type person_id: int
         :return: all the person data in the database
         :rtype: class 'Person(db.Model)'
         """
-        person_data = Person.query.get(person_id)
-        return person_data
+        return live_people().filter(Person.id == person_id).first()
 
     @staticmethod
     def update_personal_data(person_id, edit_form):
-        """Updates a person data in the database.
+        """Updates a person data in the database with a single UPDATE of columns changed
+        in the form, without reading the entry. If the form has a version of the entry,
+        it is only updated if nobody changed it since. Raises 'ConcurrentUpdateError' otherwise.
+        Raises 'DuplicateEmailError' if the email is taken by another entry.
 
         :param person_id: id of a person in the Person table in the database
         :type person_id: int
         :param edit_form: object of a 'EditForm' class, has a data passed in in it
         :type edit_form: class 'EditForm(FlaskForm)'
         """
-        person_data = Person.query.get(person_id)
-        person_data.first_name = edit_form.first_name.data
-        person_data.last_name = edit_form.last_name.data
-        person_data.gender = edit_form.gender.data
-        person_data.cell = edit_form.cell.data
-        person_data.email = edit_form.email.data
-        person_data.location = edit_form.location.data
-        person_data.pic_link = edit_form.pic_link.data
+        changed_data = edit_form.changed_person_data()
+        if not changed_data:
+            return
+
+        statement = (
+            update(Person)
+            .where(Person.id == person_id, Person.deleted_at.is_(None))
+            .values(version=Person.version + 1, **changed_data)
+        )
+        if edit_form.version.data is not None:
+            statement = statement.where(Person.version == edit_form.version.data)
+        with unique_emails(), stats_changed_by(Person.id == person_id, changed_data):
+            result = db.session.execute(statement)
+        if not result.rowcount:
+            db.session.rollback()
+            raise ConcurrentUpdateError()
         db.session.commit()
 
     @staticmethod
-    def delete_person(person_id):
-        """Deletes a person data from the Person tables from the database.
+    def delete_where(condition, soft=SOFT_DELETE):
+        """Deletes entries that are not deleted yet matching a condition and subtracts
+        them from stats. Soft deletion only sets a time of deletion. Changes are not committed.
+
+        :param condition: condition for a WHERE clause
+        :type condition: class 'sqlalchemy.sql.expression.ColumnElement'
+        :param soft: whether to mark entries as deleted instead of deleting them,
+            defaults to 'SOFT_DELETE'
+        :type soft: bool, optional
+
+        :return: number of deleted entries
+        :rtype: int
+        """
+        if soft:
+            statement = update(Person).values(deleted_at=db.func.now())
+        else:
+            statement = delete(Person)
+        db.session.execute(change_stats(condition, -1))
+        result = db.session.execute(
+            statement.where(condition, Person.deleted_at.is_(None))
+        )
+        return result.rowcount
+
+    @staticmethod
+    def delete_person(person_id, soft=SOFT_DELETE):
+        """Deletes a person data from the Person tables from the database
+        with a single statement, without reading the entry.
 
         :param person_id: id of a person in the Person table in the database
         :type person_id: int
+        :param soft: whether to mark the entry as deleted instead of deleting it,
+            defaults to 'SOFT_DELETE'
+        :type soft: bool, optional
+
+        :return: True if the entry was deleted, False if there is no such entry
+        :rtype: bool
+        """
+        deleted = DatabaseHandler.delete_where(Person.id == person_id, soft)
+        db.session.commit()
+        return bool(deleted)
+
+    @staticmethod
+    def delete_people(person_ids, soft=SOFT_DELETE):
+        """Deletes people with ids passed in with one statement per batch of 'BULK_BATCH_SIZE' ids.
+
+        :param person_ids: ids of people in the Person table in the database
+        :type person_ids: list[int, ...]
+        :param soft: whether to mark entries as deleted instead of deleting them,
+            defaults to 'SOFT_DELETE'
+        :type soft: bool, optional
+
+        :return: number of deleted entries
+        :rtype: int
         """
-        person_data_to_delete = Person.query.get(person_id)
-        db.session.delete(person_data_to_delete)
+        dialect_name = db.engine.dialect.name
+        deleted = 0
+        for batch in iter_chunks(person_ids, BULK_BATCH_SIZE):
+            deleted += DatabaseHandler.delete_where(
+                column_in(Person.id, batch, dialect_name), soft
+            )
         db.session.commit()
+        return deleted
+
+    @staticmethod
+    def purge_deleted_people(batch_size=BULK_BATCH_SIZE):
+        """Removes soft-deleted entries for good, committing every batch of entries,
+        so the table is not locked for long.
+
+        :param batch_size: number of entries removed with one statement,
+            defaults to 'BULK_BATCH_SIZE'
+        :type batch_size: int, optional
+
+        :return: number of removed entries
+        :rtype: int
+        """
+        dialect_name = db.engine.dialect.name
+        purged = 0
+        while True:
+            person_ids = [
+                person_id
+                for person_id, in db.session.query(Person.id)
+                .filter(Person.deleted_at.isnot(None))
+                .limit(batch_size)
+            ]
+            if not person_ids:
+                return purged
+            result = db.session.execute(
+                delete(Person).where(column_in(Person.id, person_ids, dialect_name))
+            )
+            db.session.commit()
+            purged += result.rowcount
+
+    @staticmethod
+    def update_people(people_data):
+        """Updates people data with one statement per batch of 'BULK_BATCH_SIZE' people.
+        Every column is set with 'CASE id WHEN ... END', so each person can get
+        its own values and only columns passed in are changed.
+        Raises 'DuplicateEmailError' if an email is taken by another entry.
+
+        :param people_data: dicts with an id of a person and column values to set
+        :type people_data: list[dict, ...]
+
+        :return: number of updated entries
+        :rtype: int
+        """
+        dialect_name = db.engine.dialect.name
+        updated = 0
+        with unique_emails():
+            for batch in iter_chunks(people_data, BULK_BATCH_SIZE):
+                batch = [with_picture_sizes_reset(person_data) for person_data in batch]
+                values = {}
+                for column in PERSON_COLUMNS:
+                    new_values = {
+                        person_data["id"]: person_data[column]
+                        for person_data in batch
+                        if column in person_data
+                    }
+                    if new_values:
+                        values[column] = case(
+                            new_values, value=Person.id, else_=getattr(Person, column)
+                        )
+                if not values:
+                    continue
+                changed_columns = list(values)
+                values["version"] = Person.version + 1
+                person_ids = [person_data["id"] for person_data in batch]
+                in_batch = column_in(Person.id, person_ids, dialect_name)
+                with stats_changed_by(in_batch, changed_columns):
+                    result = db.session.execute(
+                        update(Person)
+                        .where(in_batch, Person.deleted_at.is_(None))
+                        .values(values)
+                    )
+                updated += result.rowcount
+            db.session.commit()
+        return updated
+
+    @staticmethod
+    def rebuild_stats():
+        """Counts all the entries of the Person table in stats again"""
+        db.session.execute(delete(PersonStat))
+        db.session.execute(change_stats(Person.id.isnot(None), 1))
+        db.session.commit()
+
+    @staticmethod
+    def get_stats():
+        """Returns numbers of entries by values of every dimension of stats,
+        from the most common value.
+
+        :return: lists of values and numbers of entries by dimension names
+        :rtype: dict[str, list[tuple[str, int], ...]]
+        """
+        stats = {dimension: [] for dimension in STAT_DIMENSIONS}
+        for stat in (
+            db.session.query(PersonStat)
+            .filter(PersonStat.entries > 0)
+            .order_by(PersonStat.entries.desc(), PersonStat.value)
+        ):
+            stats.setdefault(stat.dimension, []).append((stat.value, stat.entries))
+        return stats
 
     @staticmethod
     def count_entries():
@@ -211,7 +1211,18 @@ class DatabaseHandler:
         :return: a number of entries in the Person table of database
         :rtype: int
         """
-        return db.session.query(Person).count()
+        return live_people().count()
+
+    @staticmethod
+    def get_random_person_data():
+        """Picks one random entry from all the entries existing in the database.
+
+        :return: a random Person object, None if the table is empty
+        :rtype: class 'Person(db.Model)'
+        """
+        query = live_people()
+        rowCount = int(query.count())
+        return query.offset(int(rowCount * random())).first()
 
     @staticmethod
     def generate_random_person_id():
@@ -220,8 +1231,4 @@ class DatabaseHandler:
         :return: a random id number from existing entries in the database
         :rtype: int
         """
-        query = db.session.query(Person)
-        rowCount = int(query.count())
-        randomRow = query.offset(int(rowCount * random())).first()
-        random_id = randomRow.id
-        return random_id
+        return DatabaseHandler.get_random_person_data().id
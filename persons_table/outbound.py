@@ -0,0 +1,97 @@
+import atexit
+import threading
+
+# Responses worth retrying: the server may answer properly next time
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class HTTPClient:
+    """This is a class of an outbound HTTP client shared by all the calls of a process.
+    Keeps alive up to 'HTTP_POOL_MAXSIZE' connections per host for 'HTTP_POOL_CONNECTIONS' hosts,
+    retries idempotent requests on connection errors, timeouts and 5xx responses
+    with exponential backoff and applies default timeouts.
+    The session is created on first use, so forked workers never share connections.
+    """
+
+    def __init__(self, app=None):
+        self.settings = {
+            "HTTP_POOL_CONNECTIONS": 10,
+            "HTTP_POOL_MAXSIZE": 10,
+            "HTTP_RETRIES": 3,
+            "HTTP_BACKOFF_FACTOR": 0.3,
+            "HTTP_CONNECT_TIMEOUT": 3.05,
+            "HTTP_READ_TIMEOUT": 10.0,
+        }
+        self._session = None
+        self._lock = threading.Lock()
+        # Once per client, however many apps it is registered in
+        atexit.register(self.close)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Reads settings from the app passed in"""
+        for setting, default in self.settings.items():
+            self.settings[setting] = app.config.setdefault(setting, default)
+        app.extensions["http_client"] = self
+
+    @property
+    def session(self):
+        """Pooled 'requests.Session', created on first use"""
+        with self._lock:
+            if self._session is None:
+                self._session = self._make_session()
+            return self._session
+
+    def _make_session(self):
+        # Imported on first use, so processes that never call other hosts start faster
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.settings["HTTP_RETRIES"],
+            backoff_factor=self.settings["HTTP_BACKOFF_FACTOR"],
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.settings["HTTP_POOL_CONNECTIONS"],
+            pool_maxsize=self.settings["HTTP_POOL_MAXSIZE"],
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get(self, url, **kwargs):
+        """Sends a GET request through the pooled session with default timeouts.
+        Takes the same arguments as 'requests.get'.
+
+        :param url: URL to request
+        :type url: str
+
+        :return: response
+        :rtype: class 'requests.Response'
+        """
+        kwargs.setdefault(
+            "timeout",
+            (self.settings["HTTP_CONNECT_TIMEOUT"], self.settings["HTTP_READ_TIMEOUT"]),
+        )
+        return self.session.get(url, **kwargs)
+
+    def discard(self):
+        """Forgets pooled connections without closing them.
+        To be called in forked processes, so they never use connections of the parent.
+        """
+        self._lock = threading.Lock()
+        self._session = None
+
+    def close(self):
+        """Closes all pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
@@ -0,0 +1,147 @@
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    redirect,
+    render_template,
+    url_for,
+)
+
+from persons_table.aio import AsyncDatabaseHandler, async_check_if_image, async_runner
+from persons_table.models import (
+    PERSON_COLUMNS,
+    ConcurrentUpdateError,
+    DuplicateEmailError,
+)
+from persons_table.persons.forms import AsyncEditForm, QuantityForm
+
+from ..config import ENTRIES_PER_PAGE
+
+persons_async = Blueprint("persons_async", __name__)
+
+
+def person_form_data(form):
+    """Returns column values of the Person table submitted in a form"""
+    return {column: form[column].data for column in PERSON_COLUMNS if column in form}
+
+
+async def run(handler_method, *args):
+    """Runs an 'AsyncDatabaseHandler' method with the app's async engine in the shared loop"""
+    engine = async_runner.get_engine(current_app)
+    return await async_runner.run(handler_method(engine, *args))
+
+
+async def validate_person_form(form):
+    """Validates a form and checks if its photo link leads to an image.
+
+    :param form: submitted form
+    :type form: class 'AsyncEditForm'
+    :return: True if the form is valid, False otherwise
+    :rtype: bool
+    """
+    if not form.validate_on_submit():
+        return False
+    if not await async_runner.run(async_check_if_image(form.pic_link.data)):
+        form.pic_link.errors.append("Link does not lead to an image")
+        return False
+    return True
+
+
+@persons_async.route("/", methods=["GET", "POST"])
+@persons_async.route("/index", methods=["GET", "POST"])
+@persons_async.route("/index/<int:page>", methods=["GET", "POST"])
+async def index(page=1):
+    """Renders the index page of the app. Lacking entries are collected
+    from API with concurrent requests.
+
+    :param page: a page number, defaults to 1
+    :type page: int, optional
+    """
+    quantity_form = QuantityForm()
+    if quantity_form.validate_on_submit():
+        await run(AsyncDatabaseHandler.rerecord_data, int(quantity_form.quantity.data))
+        return redirect(url_for("persons_async.index"))
+
+    people_data_paginated = await run(
+        AsyncDatabaseHandler.paginate, page, ENTRIES_PER_PAGE
+    )
+    if people_data_paginated is None:
+        abort(404)
+
+    return render_template(
+        "index.html",
+        quantity_form=quantity_form,
+        people_data=people_data_paginated,
+        current_quantity=people_data_paginated.total,
+        views="persons_async",
+    )
+
+
+@persons_async.route("/new_person", methods=["GET", "POST"])
+async def new_entry():
+    """Renders the 'new_entry' page of an app, that provides means to users to create an entry manually."""
+    new_data_form = AsyncEditForm()
+    if await validate_person_form(new_data_form):
+        try:
+            await run(
+                AsyncDatabaseHandler.save_person_data, person_form_data(new_data_form)
+            )
+        except DuplicateEmailError as error:
+            new_data_form.email.errors.append(str(error))
+        else:
+            flash("New entry is successfully added")
+            return redirect(url_for("persons_async.index"))
+
+    return render_template("new_entry.html", new_data_form=new_data_form)
+
+
+@persons_async.route("/person/<int:person_id>")
+async def personal_page(person_id):
+    """Renders a personal page of any user with id passed in.
+
+    :param person_id: an id of an existing entry in the database
+    :type person_id: int
+    """
+    person_data = await run(AsyncDatabaseHandler.get_person_data, person_id)
+    if person_data is None:
+        abort(404)
+
+    return render_template(
+        "personal_page.html", person_data=person_data, views="persons_async"
+    )
+
+
+@persons_async.route("/edit-person/<int:person_id>", methods=["GET", "POST"])
+async def edit_personal_page(person_id):
+    """Renders a page with means to edit a person's data with id passed in.
+
+    :param person_id: an id of an existing entry in the database
+    :type person_id: int
+    """
+    person_data = await run(AsyncDatabaseHandler.get_person_data, person_id)
+    if person_data is None:
+        abort(404)
+    edit_form = AsyncEditForm(
+        **{column: getattr(person_data, column) for column in PERSON_COLUMNS},
+        version=person_data.version,
+    )
+
+    if await validate_person_form(edit_form):
+        try:
+            await run(
+                AsyncDatabaseHandler.save_person_data,
+                edit_form.changed_person_data(),
+                person_id,
+                edit_form.version.data,
+            )
+        except DuplicateEmailError as error:
+            edit_form.email.errors.append(str(error))
+        except ConcurrentUpdateError as error:
+            edit_form.version.errors.append(str(error))
+            return render_template("new_entry.html", new_data_form=edit_form), 409
+        else:
+            flash("Data is successfully updated")
+            return redirect(url_for("persons_async.index"))
+
+    return render_template("new_entry.html", new_data_form=edit_form)
@@ -1,9 +1,11 @@
-import requests
 from flask_wtf import FlaskForm
-from wtforms import DecimalField, StringField, SubmitField
+from wtforms import DecimalField, HiddenField, StringField, SubmitField
 from wtforms.fields.html5 import EmailField
 from wtforms.validators import URL, Email, InputRequired, NumberRange, ValidationError
 
+from persons_table import http_client
+from persons_table.models import PERSON_COLUMNS, with_picture_sizes_reset
+
 
 # ---------- Quantity Form ---------------- #
 class QuantityForm(FlaskForm):
@@ -38,8 +40,9 @@ def check_if_image(link):
     :return:True if link passed in leads to an image file, False otherwise
     :rtype: bool
     """
-    response = requests.get(link)
-    headers = response.headers
+    # Only headers are needed, the body is never downloaded
+    with http_client.get(link, stream=True) as response:
+        headers = response.headers
     if headers.get("content-type").startswith("image"):
         return True
     else:
@@ -52,10 +55,25 @@ def image_validator(form, field):
         raise ValidationError("Link does not lead to an image")
 
 
+class VersionField(HiddenField):
+    """This is a class of a hidden field keeping a version of an entry the form was filled from.
+    Data is None if no version is submitted.
+    class: 'HiddenField'
+    """
+
+    def process_formdata(self, valuelist):
+        if valuelist and valuelist[0]:
+            try:
+                self.data = int(valuelist[0])
+            except ValueError:
+                raise ValueError("Version of the entry is not a number")
+
+
 class EditForm(FlaskForm):
     """This is a class to generate a form to provide options
     to create new entry to the dataset or edit an existing one.
     All the fields have 'InputRequired' validator and EmailField has also an Email validator.
+    Hidden 'version' field keeps a version of an edited entry to detect concurrent edits.
     class: 'FlaskForm'
     """
 
@@ -68,4 +86,29 @@ class EditForm(FlaskForm):
     pic_link = StringField(
         "Link to a photo_file", validators=[InputRequired(), URL(), image_validator]
     )
+    version = VersionField()
     submit = SubmitField(label="Save Data")
+
+    def changed_person_data(self):
+        """Returns column values of the Person table that differ from the data
+        the form was filled with. A new link to a picture drops links to its other sizes.
+
+        :return: changed column values
+        :rtype: dict
+        """
+        return with_picture_sizes_reset(
+            {
+                column: self[column].data
+                for column in PERSON_COLUMNS
+                if column in self and self[column].data != self[column].object_data
+            }
+        )
+
+
+class AsyncEditForm(EditForm):
+    """This is a class of 'EditForm' for async views. Link to a photo is checked
+    to lead to an image by the view itself with an async HTTP client.
+    class: 'EditForm'
+    """
+
+    pic_link = StringField("Link to a photo_file", validators=[InputRequired(), URL()])
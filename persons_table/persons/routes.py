@@ -1,10 +1,15 @@
 from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
 
 from persons_table import db
-from persons_table.models import DatabaseHandler, Person
+from persons_table.models import (
+    ConcurrentUpdateError,
+    DatabaseHandler,
+    DuplicateEmailError,
+)
 from persons_table.persons.forms import EditForm, QuantityForm
+from persons_table.replicas import replica_reads
 
-from ..config import ENTRIES_PER_PAGE
+from ..config import API_SLICE_SIZE, ENTRIES_PER_PAGE
 
 persons = Blueprint("persons", __name__)
 
@@ -12,6 +17,7 @@ persons = Blueprint("persons", __name__)
 @persons.route("/", methods=["GET", "POST"])
 @persons.route("/index", methods=["GET", "POST"])
 @persons.route("/index/<int:page>", methods=["GET", "POST"])
+@replica_reads
 def index(page=1):
     """Renders the index page of the app.
 
@@ -35,26 +41,46 @@ def index(page=1):
     )
 
 
+@persons.route("/scroll")
+@replica_reads
+def scrolling_index():
+    """Renders all the entries in one scrolling table. Only rows in view are rendered
+    by the browser, and they are loaded in slices from the JSON API as they scroll in.
+    """
+    return render_template(
+        "scrolling_index.html",
+        current_quantity=DatabaseHandler.count_entries(),
+        slice_size=API_SLICE_SIZE,
+    )
+
+
 @persons.route("/new_person", methods=["GET", "POST"])
 def new_entry():
     """Renders the 'new_entry' page of an app, that provides means to users to create an entry manually."""
     new_data_form = EditForm()
     if new_data_form.validate_on_submit():
-        DatabaseHandler.create_new_record(new_data_form)
-        flash("New entry is successfully added")
-        return redirect(url_for("persons.index"))
+        try:
+            DatabaseHandler.create_new_record(new_data_form)
+        except DuplicateEmailError as error:
+            new_data_form.email.errors.append(str(error))
+        else:
+            flash("New entry is successfully added")
+            return redirect(url_for("persons.index"))
 
     return render_template("new_entry.html", new_data_form=new_data_form)
 
 
 @persons.route("/person/<int:person_id>")
+@replica_reads
 def personal_page(person_id):
     """Renders a personal page of any user with id passed in.
 
     :param person_id: an id of an existing entry in the database
     :type person_id: int
     """
-    person_data = Person.query.get(person_id)
+    person_data = DatabaseHandler.get_person_data(person_id)
+    if person_data is None:
+        abort(404)
 
     return render_template("personal_page.html", person_data=person_data)
 
@@ -67,6 +93,8 @@ def edit_personal_page(person_id):
     :type person_id: int
     """
     person_data = DatabaseHandler.get_person_data(person_id)
+    if person_data is None:
+        abort(404)
     edit_form = EditForm(
         first_name=person_data.first_name,
         last_name=person_data.last_name,
@@ -75,25 +103,43 @@ def edit_personal_page(person_id):
         email=person_data.email,
         location=person_data.location,
         pic_link=person_data.pic_link,
+        version=person_data.version,
     )
 
     if edit_form.validate_on_submit():
-        DatabaseHandler.update_personal_data(person_id, edit_form)
-        flash("Data is successfully updated")
-        return redirect(url_for("persons.index"))
+        try:
+            DatabaseHandler.update_personal_data(person_id, edit_form)
+        except DuplicateEmailError as error:
+            edit_form.email.errors.append(str(error))
+        except ConcurrentUpdateError as error:
+            edit_form.version.errors.append(str(error))
+            return render_template("new_entry.html", new_data_form=edit_form), 409
+        else:
+            flash("Data is successfully updated")
+            return redirect(url_for("persons.index"))
 
     return render_template("new_entry.html", new_data_form=edit_form)
 
 
 @persons.route("/random")
+@replica_reads
 def random_person_page():
-    """Renders a personal page for a random person from the database."""
-    return redirect(
-        url_for(
-            "persons.personal_page",
-            person_id=DatabaseHandler.generate_random_person_id(),
-        )
-    )
+    """Renders a personal page for a random person from the database.
+    The page is rendered here rather than redirected to, so the person is read from
+    the same replica it was picked from and a lagging one can not answer with 404.
+    """
+    person_data = DatabaseHandler.get_random_person_data()
+    if person_data is None:
+        abort(404)
+
+    return render_template("personal_page.html", person_data=person_data)
+
+
+@persons.route("/stats")
+@replica_reads
+def stats():
+    """Renders numbers of entries by gender, country and email domain."""
+    return render_template("stats.html", stats=DatabaseHandler.get_stats())
 
 
 @persons.route("/delete-person/<int:person_id>")
@@ -103,7 +149,8 @@ def delete_person_data(person_id):
     :param person_id: an id of an existing entry in the database
     :type person_id: int
     """
-    DatabaseHandler.delete_person(person_id)
+    if not DatabaseHandler.delete_person(person_id):
+        abort(404)
     flash("Data entry is successfully deleted")
 
     return redirect(url_for("persons.index"))
@@ -0,0 +1,229 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from random import random
+
+from flask import current_app, g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+PROFILING_HEADER = "X-Profile-Token"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class StackSampler:
+    """This is a class to sample the call stack of one thread at a fixed interval
+    from a background thread. Samples are stored as collapsed stacks
+    (frames joined with ';', outermost first) with their hit counts.
+
+    :param thread_id: identifier of a thread to be sampled
+    :type thread_id: int
+    :param interval: number of seconds between two samples
+    :type interval: float
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self.started_at = None
+        self.duration = 0.0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Starts sampling in a background thread"""
+        self.started_at = time.monotonic()
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling and waits for the background thread to finish"""
+        self._stop_event.set()
+        self._thread.join()
+        self.duration = time.monotonic() - self.started_at
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def to_collapsed(self):
+        """Returns samples in collapsed stacks format readable by flamegraph.pl and speedscope.
+
+        :return: one 'frame;frame;frame count' line per unique stack
+        :rtype: str
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+
+    def to_speedscope(self, name):
+        """Returns samples as a speedscope 'sampled' profile.
+
+        :param name: name of a profile shown in speedscope
+        :type name: str
+
+        :return: speedscope file contents
+        :rtype: dict
+        """
+        frames = []
+        frame_indexes = {}
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            sample = []
+            for frame_name in stack.split(";"):
+                if frame_name not in frame_indexes:
+                    frame_indexes[frame_name] = len(frames)
+                    frames.append({"name": frame_name})
+                sample.append(frame_indexes[frame_name])
+            samples.append(sample)
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+
+class RateLimiter:
+    """This is a class to limit a number of events in a sliding one-minute window.
+    Can be shared between threads.
+
+    :param max_per_minute: maximum number of events allowed per minute
+    :type max_per_minute: int
+    """
+
+    def __init__(self, max_per_minute):
+        self.max_per_minute = max_per_minute
+        self._events = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Registers an event if the limit is not reached yet.
+
+        :return: True if an event is allowed, False otherwise
+        :rtype: bool
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._events = [event for event in self._events if now - event < 60]
+            if len(self._events) >= self.max_per_minute:
+                return False
+            self._events.append(now)
+            return True
+
+
+class RequestProfiler:
+    """This is a class to profile requests with a statistical sampler.
+    A request is profiled when 'PROFILING_ENABLED' is set and either the request
+    carries a valid signed 'X-Profile-Token' header not older than
+    'PROFILING_TOKEN_MAX_AGE' seconds or it is randomly picked
+    with 'PROFILING_REQUEST_RATE' probability. Number of profiles written is
+    limited by 'PROFILING_MAX_PER_MINUTE', so profiling can be left enabled in production.
+    Collapsed stacks and speedscope JSON files are written to 'PROFILING_DIR'.
+    """
+
+    def __init__(self, app=None):
+        self.rate_limiter = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Registers request hooks in the app passed in"""
+        app.config.setdefault("PROFILING_ENABLED", False)
+        app.config.setdefault("PROFILING_DIR", "profiles")
+        app.config.setdefault("PROFILING_INTERVAL", 0.005)
+        app.config.setdefault("PROFILING_REQUEST_RATE", 0.0)
+        app.config.setdefault("PROFILING_MAX_PER_MINUTE", 6)
+        app.config.setdefault("PROFILING_TOKEN_MAX_AGE", 3600)
+        self.rate_limiter = RateLimiter(app.config["PROFILING_MAX_PER_MINUTE"])
+
+        app.before_request(self._start_sampling)
+        app.after_request(self._finish_sampling)
+        app.teardown_request(self._stop_sampling)
+
+    @staticmethod
+    def generate_token(app):
+        """Returns a value for 'X-Profile-Token' header signed with app's secret key.
+        It is accepted for 'PROFILING_TOKEN_MAX_AGE' seconds.
+
+        :param app: app instance
+        :type app: class 'flask.app.Flask'
+
+        :return: signed token
+        :rtype: str
+        """
+        serializer = URLSafeTimedSerializer(app.secret_key, salt="profiling")
+        return serializer.dumps("profile")
+
+    @staticmethod
+    def _has_valid_token():
+        token = request.headers.get(PROFILING_HEADER)
+        if not token:
+            return False
+        serializer = URLSafeTimedSerializer(current_app.secret_key, salt="profiling")
+        max_age = current_app.config["PROFILING_TOKEN_MAX_AGE"]
+        try:
+            return serializer.loads(token, max_age=max_age) == "profile"
+        # Expired tokens raise 'SignatureExpired', a subclass of 'BadSignature'
+        except BadSignature:
+            return False
+
+    def _should_profile(self):
+        config = current_app.config
+        if not config["PROFILING_ENABLED"]:
+            return False
+        if not (self._has_valid_token() or random() < config["PROFILING_REQUEST_RATE"]):
+            return False
+        return self.rate_limiter.acquire()
+
+    def _start_sampling(self):
+        if self._should_profile():
+            g.stack_sampler = StackSampler(
+                threading.get_ident(), current_app.config["PROFILING_INTERVAL"]
+            )
+            g.stack_sampler.start()
+
+    def _finish_sampling(self, response):
+        self._stop_sampling()
+        return response
+
+    @staticmethod
+    def _stop_sampling(exception=None):
+        sampler = g.pop("stack_sampler", None)
+        if sampler is None:
+            return
+        sampler.stop()
+
+        profile_name = f"{request.method} {request.path}"
+        file_stem = os.path.join(
+            current_app.config["PROFILING_DIR"],
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-"
+            f"{request.endpoint or 'unknown'}-{id(sampler)}",
+        )
+        os.makedirs(current_app.config["PROFILING_DIR"], exist_ok=True)
+        with open(f"{file_stem}.collapsed", "w") as collapsed_file:
+            collapsed_file.write(sampler.to_collapsed())
+        with open(f"{file_stem}.speedscope.json", "w") as speedscope_file:
+            json.dump(sampler.to_speedscope(profile_name), speedscope_file)
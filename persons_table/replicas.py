@@ -0,0 +1,147 @@
+import threading
+import time
+from functools import wraps
+from itertools import count
+
+from flask import current_app, g, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Ways to pick a replica for a request
+REPLICA_CHOICES = ("round-robin", "least-connections")
+
+
+def replica_reads(view):
+    """Marks a view as read-only, so its GET requests read from replicas
+    when replicas are configured. Other methods always use the primary database.
+
+    :param view: view function
+    :type view: function
+
+    :return: decorated view function
+    :rtype: function
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            g.replica_reads = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """This is a class to spread reads of views marked with 'replica_reads' over
+    read replicas from 'SQLALCHEMY_REPLICA_URIS'. Every request reads from one replica,
+    picked in turn or by the smallest number of connections in use ('REPLICA_CHOICE').
+    A request writing to the primary database reads from it afterwards, and so do requests
+    of the same client for 'REPLICA_STICKY_SECONDS', so users see their own changes
+    while replicas catch up. Sessions ask the router for binds, see 'RoutingSession'.
+
+    :param db: SQLAlchemy extension creating engines
+    :type db: class 'flask_sqlalchemy.SQLAlchemy'
+    """
+
+    def __init__(self, db, app=None):
+        self.db = db
+        self._engines = {}
+        self._connections_in_use = {}
+        self._turns = count()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Registers the router in the app passed in if it has replicas"""
+        app.config.setdefault("SQLALCHEMY_REPLICA_URIS", [])
+        app.config.setdefault("REPLICA_CHOICE", "round-robin")
+        app.config.setdefault("REPLICA_STICKY_SECONDS", 5.0)
+        if app.config["REPLICA_CHOICE"] not in REPLICA_CHOICES:
+            raise ValueError(
+                f"'REPLICA_CHOICE' must be one of {', '.join(REPLICA_CHOICES)}"
+            )
+        if not app.config["SQLALCHEMY_REPLICA_URIS"]:
+            return
+        app.extensions["replica_router"] = self
+        app.after_request(self._stick_to_primary)
+
+    def get_engines(self, app):
+        """Returns engines of the replicas of the app passed in, they are created once.
+
+        :param app: app instance
+        :type app: class 'flask.app.Flask'
+
+        :return: engines of the replicas
+        :rtype: list[class 'sqlalchemy.engine.Engine', ...]
+        """
+        uris = tuple(app.config["SQLALCHEMY_REPLICA_URIS"])
+        with self._lock:
+            if (app, uris) not in self._engines:
+                self._engines[app, uris] = [
+                    self._create_engine(app, uri) for uri in uris
+                ]
+            return self._engines[app, uris]
+
+    def _create_engine(self, app, uri):
+        # The same driver defaults and pool options as the primary database gets
+        sa_url, options = self.db.apply_driver_hacks(
+            app, make_url(uri), dict(app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+        )
+        engine = self.db.create_engine(sa_url, options)
+        self._connections_in_use[engine] = 0
+        event.listen(engine, "checkout", lambda *args: self._count_in_use(engine, 1))
+        event.listen(engine, "checkin", lambda *args: self._count_in_use(engine, -1))
+        return engine
+
+    def _count_in_use(self, engine, change):
+        with self._lock:
+            self._connections_in_use[engine] += change
+
+    def choose_engine(self, app):
+        """Picks a replica for a request.
+
+        :param app: app instance
+        :type app: class 'flask.app.Flask'
+
+        :return: engine of the replica
+        :rtype: class 'sqlalchemy.engine.Engine'
+        """
+        engines = self.get_engines(app)
+        turn = next(self._turns) % len(engines)
+        if app.config["REPLICA_CHOICE"] == "round-robin":
+            return engines[turn]
+        # Replicas with equal numbers of connections take turns
+        in_turn = engines[turn:] + engines[:turn]
+        return min(in_turn, key=self._connections_in_use.__getitem__)
+
+    def engine_for(self, app, is_write):
+        """Returns an engine for a statement of the current request,
+        None if it goes to the primary database.
+
+        :param app: app instance
+        :type app: class 'flask.app.Flask'
+        :param is_write: True if the statement may change data
+        :type is_write: bool
+
+        :return: engine of a replica, None for the primary database
+        :rtype: class 'sqlalchemy.engine.Engine'
+        """
+        if is_write:
+            g.wrote_to_primary = True
+            return None
+        if not g.get("replica_reads") or g.get("wrote_to_primary"):
+            return None
+        if session.get("primary_until", 0) > time.time():
+            return None
+        if "replica_engine" not in g:
+            g.replica_engine = self.choose_engine(app)
+        return g.replica_engine
+
+    @staticmethod
+    def _stick_to_primary(response):
+        if g.get("wrote_to_primary"):
+            session["primary_until"] = (
+                time.time() + current_app.config["REPLICA_STICKY_SECONDS"]
+            )
+        return response
@@ -0,0 +1,154 @@
+// Renders only rows of the scrolling table that are in view. Rows are loaded in slices
+// from the JSON API: a slice following a loaded one is read by the id of its last row,
+// other slices by their offset, e.g. when the scrollbar is dragged far away.
+(function () {
+  "use strict";
+
+  // Height of a row in pixels, the same as in styles.css
+  var ROW_HEIGHT = 56;
+  // Browsers limit heights of elements, taller tables are scrolled proportionally
+  var MAX_HEIGHT = 10000000;
+  // Rows rendered above and below the view, so fast scrolling does not show blanks
+  var OVERSCAN = 10;
+  // Slices kept in memory, least recently used ones are dropped
+  var MAX_SLICES = 50;
+  // Slices are only requested when scrolling pauses for a number of milliseconds
+  var LOAD_DELAY = 50;
+
+  var viewport = document.getElementById("scrolling-viewport");
+  var spacer = viewport.querySelector(".scrolling-spacer");
+  var rowsBox = viewport.querySelector(".scrolling-rows");
+  var total = Number(viewport.dataset.total);
+  var sliceSize = Number(viewport.dataset.sliceSize);
+  var sliceUrl = viewport.dataset.sliceUrl;
+
+  // Slice numbers to rows, in order of use
+  var slices = new Map();
+  var loading = new Set();
+  var loadTimer = null;
+  var frameRequested = false;
+  var renderedKey = null;
+  var version = 0;
+  var height = Math.min(total * ROW_HEIGHT, MAX_HEIGHT);
+  spacer.style.height = height + "px";
+
+  function escapeHTML(value) {
+    return String(value).replace(/[&<>"']/g, function (character) {
+      return "&#" + character.charCodeAt(0) + ";";
+    });
+  }
+
+  function useSlice(number) {
+    var rows = slices.get(number);
+    if (rows !== undefined) {
+      slices.delete(number);
+      slices.set(number, rows);
+    }
+    return rows;
+  }
+
+  function loadSlice(number) {
+    if (slices.has(number) || loading.has(number)) {
+      return;
+    }
+    loading.add(number);
+    var previous = slices.get(number - 1);
+    var position = previous && previous.length === sliceSize
+      ? "after=" + previous[previous.length - 1].id
+      : "offset=" + number * sliceSize;
+    fetch(sliceUrl + "?limit=" + sliceSize + "&" + position)
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error("Slice " + number + " answered " + response.status);
+        }
+        return response.json();
+      })
+      .then(function (data) {
+        slices.set(number, data.persons);
+        while (slices.size > MAX_SLICES) {
+          slices.delete(slices.keys().next().value);
+        }
+        version += 1;
+        requestRender();
+      })
+      .catch(function (error) {
+        console.error(error);
+      })
+      .finally(function () {
+        loading.delete(number);
+      });
+  }
+
+  function visibleRange() {
+    var scrollable = height - viewport.clientHeight;
+    var fullScrollable = total * ROW_HEIGHT - viewport.clientHeight;
+    var first = scrollable > 0
+      ? viewport.scrollTop * fullScrollable / scrollable / ROW_HEIGHT
+      : 0;
+    var start = Math.max(0, Math.floor(first) - OVERSCAN);
+    var end = Math.min(total, Math.ceil(first + viewport.clientHeight / ROW_HEIGHT) + OVERSCAN);
+    return {first: first, start: start, end: end};
+  }
+
+  function rowHTML(index, person) {
+    if (person === undefined) {
+      return '<div class="scrolling-row" role="row"><span>' + (index + 1) + "</span></div>";
+    }
+    return '<div class="scrolling-row" role="row">'
+      + "<span>" + (index + 1) + "</span>"
+      + "<span>" + escapeHTML(person.first_name) + "</span>"
+      + "<span>" + escapeHTML(person.last_name) + "</span>"
+      + "<span>" + escapeHTML(person.gender) + "</span>"
+      + "<span>" + escapeHTML(person.cell) + "</span>"
+      + "<span>" + escapeHTML(person.email) + "</span>"
+      + "<span>" + escapeHTML(person.location) + "</span>"
+      + '<span><img class="avatar" src="' + escapeHTML(person.picture)
+      + '" srcset="' + escapeHTML(person.srcset)
+      + '" sizes="48px" width="48" height="48" alt=""></span>'
+      + '<span><a href="' + escapeHTML(person.url) + '">Personal Page</a></span>'
+      + "</div>";
+  }
+
+  function render() {
+    frameRequested = false;
+    var range = visibleRange();
+    rowsBox.style.transform = "translateY("
+      + (viewport.scrollTop - (range.first - range.start) * ROW_HEIGHT) + "px)";
+    var key = range.start + ":" + range.end + ":" + version;
+    if (key === renderedKey) {
+      return;
+    }
+    renderedKey = key;
+    var html = [];
+    var missing = false;
+    for (var index = range.start; index < range.end; index++) {
+      var rows = useSlice(Math.floor(index / sliceSize));
+      missing = missing || rows === undefined;
+      html.push(rowHTML(index, rows && rows[index % sliceSize]));
+    }
+    rowsBox.innerHTML = html.join("");
+    if (missing) {
+      clearTimeout(loadTimer);
+      loadTimer = setTimeout(loadVisibleSlices, LOAD_DELAY);
+    }
+  }
+
+  function loadVisibleSlices() {
+    var range = visibleRange();
+    var last = Math.floor((range.end - 1) / sliceSize);
+    for (var number = Math.floor(range.start / sliceSize); number <= last; number++) {
+      loadSlice(number);
+    }
+  }
+
+  function requestRender() {
+    if (!frameRequested) {
+      frameRequested = true;
+      window.requestAnimationFrame(render);
+    }
+  }
+
+  viewport.addEventListener("scroll", requestRender, {passive: true});
+  window.addEventListener("resize", requestRender);
+  requestRender();
+})();
@@ -0,0 +1,239 @@
+import io
+import re
+from functools import lru_cache
+
+from flask import Blueprint, abort, current_app, request, url_for
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from persons_table import http_client
+from persons_table.disk_cache import DiskCache
+from persons_table.models import PICTURE_SIZES
+
+thumbnails = Blueprint("thumbnails", __name__)
+
+# Portraits of API Randomuser.me come in sizes picked by a path segment
+RANDOMUSER_PORTRAIT = re.compile(
+    r"^(?P<base>https?://randomuser\.me/api/portraits/)"
+    r"(?:(?:thumb|med)/)?(?P<path>(?:men|women|lego)/\d+\.(?:jpg|png))$"
+)
+# Sizes of the portraits in pixels and path segments to request them
+RANDOMUSER_PORTRAIT_SIZES = ((48, "thumb/"), (72, "med/"), (128, ""))
+# Pictures are downloaded in parts of this number of bytes
+PICTURE_CHUNK_SIZE = 64 * 1024
+# Signed URLs of this number of pictures are kept, so pages are rendered without signing
+SIGNED_URLS_CACHED = 10000
+
+
+@thumbnails.record_once
+def create_cache(state):
+    """Creates a cache of thumbnails for the app the blueprint is registered in.
+    Settings come from 'Config'.
+    """
+    config = state.app.config
+    state.app.extensions["thumbnail_cache"] = DiskCache(
+        config["THUMBNAIL_CACHE_DIR"], config["THUMBNAIL_CACHE_MAX_BYTES"], ".jpg"
+    )
+
+
+def url_serializer():
+    """Returns a serializer signing links to pictures with app's secret key"""
+    return URLSafeSerializer(current_app.secret_key, salt="thumbnail")
+
+
+@thumbnails.app_template_global()
+def thumbnail_url(link, size=None):
+    """Returns a URL of a thumbnail of a picture served by the app.
+    Links are signed, so the app does not fetch pages it has never linked to.
+    Returns the link itself if thumbnails are disabled.
+
+    :param link: link to a picture
+    :type link: str
+    :param size: size of the thumbnail in pixels, defaults to 'THUMBNAIL_SIZE'
+    :type size: int, optional
+
+    :return: URL of the thumbnail
+    :rtype: str
+    """
+    return thumbnail_urls([(link, size)])[0]
+
+
+def thumbnail_urls(links_and_sizes):
+    """Returns URLs of thumbnails of a number of pictures, like 'thumbnail_url' does.
+    The app and the request are looked up once for all the pictures.
+
+    :param links_and_sizes: links to pictures with sizes of thumbnails or None
+    :type links_and_sizes: list[tuple, ...]
+
+    :return: URLs of the thumbnails
+    :rtype: list[str, ...]
+    """
+    app = current_app._get_current_object()
+    if not app.config["THUMBNAILS_ENABLED"]:
+        return [link for link, _ in links_and_sizes]
+    script_root = request.script_root
+    default_size = app.config["THUMBNAIL_SIZE"]
+    return [
+        signed_thumbnail_url(script_root, app.secret_key, link, size or default_size)
+        for link, size in links_and_sizes
+    ]
+
+
+@lru_cache(maxsize=SIGNED_URLS_CACHED)
+def signed_thumbnail_url(script_root, secret_key, link, size):
+    """Returns a URL of a thumbnail with a link and a size signed with a secret key.
+    Arguments the URL depends on are passed in to be cached with it.
+
+    :param script_root: root path of the app in the current request
+    :type script_root: str
+    :param secret_key: app's secret key
+    :type secret_key: str
+    :param link: link to a picture
+    :type link: str
+    :param size: size of the thumbnail in pixels
+    :type size: int
+
+    :return: URL of the thumbnail
+    :rtype: str
+    """
+    return url_for("thumbnails.thumbnail", token=url_serializer().dumps([link, size]))
+
+
+@thumbnails.app_template_global()
+def picture_srcset(person_data):
+    """Returns a 'srcset' attribute value with all the sizes of a person's picture,
+    so browsers download the smallest one that is sharp on their screens.
+
+    :param person_data: person data with links to sizes of the picture
+    :type person_data: class 'Person(db.Model)'
+
+    :return: comma separated URLs with widths
+    :rtype: str
+    """
+    sizes = [
+        (link, width)
+        for link, width in (
+            (getattr(person_data, column), width) for column, width in PICTURE_SIZES
+        )
+        if link
+    ]
+    return ", ".join(
+        f"{url} {width}w" for url, (_, width) in zip(thumbnail_urls(sizes), sizes)
+    )
+
+
+def source_for(link, size):
+    """Returns a link to the smallest version of a picture at least of a size passed in.
+    Portraits of API Randomuser.me are requested in the smallest size that fits,
+    other pictures are downloaded in their full size.
+
+    :param link: link to a picture
+    :type link: str
+    :param size: size of a thumbnail in pixels
+    :type size: int
+
+    :return: link to download
+    :rtype: str
+    """
+    match = RANDOMUSER_PORTRAIT.match(link)
+    if match is None:
+        return link
+    for portrait_size, segment in RANDOMUSER_PORTRAIT_SIZES:
+        if portrait_size >= size:
+            break
+    return match["base"] + segment + match["path"]
+
+
+def make_thumbnail(content, size):
+    """Scales a picture down to fit a square of a size passed in and encodes it as JPEG.
+
+    :param content: picture file contents
+    :type content: bytes
+    :param size: size of a thumbnail in pixels
+    :type size: int
+
+    :return: JPEG file contents
+    :rtype: bytes
+
+    :raises OSError: if the contents are not a picture or it is too large to be decoded
+    """
+    # Imported on first use, so processes that never resize pictures start faster
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(content)) as picture:
+            picture.thumbnail((size, size), Image.LANCZOS)
+            thumbnail = io.BytesIO()
+            picture.convert("RGB").save(thumbnail, "JPEG", quality=85, optimize=True)
+    except Image.DecompressionBombError as error:
+        raise OSError(error) from error
+    return thumbnail.getvalue()
+
+
+def read_picture(response, max_bytes):
+    """Reads a streamed response body with a picture in parts.
+    Stops as soon as the picture turns out to be larger than a number of bytes.
+
+    :param response: response with a streamed body
+    :type response: class 'requests.Response'
+    :param max_bytes: maximum size of the picture in bytes
+    :type max_bytes: int
+
+    :return: picture file contents, None if the picture is too large
+    :rtype: bytes
+    """
+    content_length = response.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        return None
+    content = bytearray()
+    for chunk in response.iter_content(PICTURE_CHUNK_SIZE):
+        content += chunk
+        if len(content) > max_bytes:
+            return None
+    return bytes(content)
+
+
+@thumbnails.route("/thumbnail/<token>")
+def thumbnail(token):
+    """Serves a thumbnail of a picture from a signed token made by 'thumbnail_url'.
+    A picture is downloaded and scaled down once, then its thumbnail is served
+    from a disk cache with least recently used ones evicted. Browsers are told
+    to keep thumbnails for 'THUMBNAIL_MAX_AGE' seconds. Pictures that cannot be
+    downloaded or decoded, or are larger than 'THUMBNAIL_MAX_SOURCE_BYTES',
+    are answered with 502.
+
+    :param token: signed link to a picture and size of the thumbnail
+    :type token: str
+    """
+    try:
+        link, size = url_serializer().loads(token)
+    except BadSignature:
+        abort(404)
+
+    config = current_app.config
+    cache = current_app.extensions["thumbnail_cache"]
+    source = source_for(link, size)
+    key = cache.key_for(source, size)
+    content = cache.get(key)
+    if content is None:
+        # Errors of 'requests' are subclasses of 'OSError' like errors of Pillow
+        try:
+            with http_client.get(source, stream=True) as picture:
+                content_type = picture.headers.get("content-type", "")
+                if picture.status_code != 200 or not content_type.startswith("image"):
+                    abort(502)
+                picture_content = read_picture(
+                    picture, config["THUMBNAIL_MAX_SOURCE_BYTES"]
+                )
+            if picture_content is None:
+                abort(502)
+            content = make_thumbnail(picture_content, size)
+        except OSError:
+            abort(502)
+        cache.set(key, content)
+
+    response = current_app.response_class(content, mimetype="image/jpeg")
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = config["THUMBNAIL_MAX_AGE"]
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
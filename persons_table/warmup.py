@@ -0,0 +1,210 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, or_, update
+from sqlalchemy.exc import DBAPIError
+
+from persons_table import db
+from persons_table.database import insert_ignoring_conflicts
+from persons_table.models import DatabaseHandler, Person, WarmUp
+
+# Seconds between checks of a warm-up claimed by another process
+CLAIM_POLL_SECONDS = 1.0
+
+
+class WarmUpState:
+    """This is a class to keep track of the app readiness in the current process.
+    The app is ready when a warm-up is finished by this or another process,
+    or the Person table has entries and no warm-up is running.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.time_to_ready = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def mark_ready(self, duration=None):
+        """Remembers the app is ready with the number of seconds the warm-up took,
+        None if the table was filled without a warm-up
+        """
+        with self._lock:
+            if not self.ready:
+                self.ready = True
+                self.time_to_ready = duration
+            self.error = None
+
+    def is_ready(self):
+        """Returns True if the app is ready. If the warm-up was done by another process,
+        checks the database and remembers the result.
+
+        :return: True if the app is ready, False otherwise
+        :rtype: bool
+        """
+        if self.ready:
+            return True
+        started_at, duration = warm_up_progress()
+        if duration is not None:
+            self.mark_ready(duration)
+        elif started_at is None and database_is_filled():
+            # Filled by a reseed or before warm-ups were recorded
+            self.mark_ready()
+        return self.ready
+
+
+warm_up_state = WarmUpState()
+
+
+def database_is_filled():
+    """Returns True if the Person table exists and has at least one entry"""
+    if not inspect(db.engine).has_table(Person.__tablename__):
+        return False
+    return db.session.query(Person.id).first() is not None
+
+
+def warm_up_progress():
+    """Returns the time the warm-up was claimed at and the number of seconds it took,
+    None for each of them if it was not claimed or is not finished.
+
+    :return: (started_at, duration)
+    :rtype: tuple
+    """
+    if not inspect(db.engine).has_table(WarmUp.__tablename__):
+        return None, None
+    progress = db.session.query(WarmUp.started_at, WarmUp.duration).first()
+    # Ends the transaction, so the next check sees changes of other processes
+    db.session.commit()
+    return tuple(progress) if progress is not None else (None, None)
+
+
+def create_tables():
+    """Creates missing tables. When processes warming up at once create the same table,
+    CREATE TABLE fails in all of them but one, so it is retried. Every retry
+    skips tables created meanwhile.
+    """
+    for _ in db.metadata.sorted_tables:
+        try:
+            DatabaseHandler.create_table()
+            return
+        except DBAPIError:
+            pass
+    DatabaseHandler.create_table()
+
+
+def claim_warm_up(timeout):
+    """Claims the warm-up for the current process with one UPDATE, so only one
+    of processes claiming it at once succeeds. A warm-up claimed more than
+    a number of seconds ago and not finished is claimed again.
+
+    :param timeout: number of seconds a claim expires after
+    :type timeout: int
+
+    :return: True if the warm-up is claimed, False if another process finished it
+        or is running it
+    :rtype: bool
+    """
+    db.session.execute(
+        insert_ignoring_conflicts(WarmUp.__table__, db.engine.dialect.name), {"id": 1}
+    )
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        update(WarmUp)
+        .where(
+            WarmUp.id == 1,
+            WarmUp.duration.is_(None),
+            or_(
+                WarmUp.started_at.is_(None),
+                WarmUp.started_at < now - timedelta(seconds=timeout),
+            ),
+        )
+        .values(started_at=now)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def finish_warm_up(duration):
+    """Records the warm-up claimed by the current process as finished, or releases
+    the claim if the duration is None, so another process can claim it at once.
+    """
+    values = {"duration": duration} if duration is not None else {"started_at": None}
+    db.session.execute(update(WarmUp).where(WarmUp.id == 1).values(**values))
+    db.session.commit()
+
+
+def warm_up(quantity):
+    """Creates the tables and fills the Person table with a number of entries if it is empty.
+    Can be run any number of times by any number of processes at once, existing data
+    is never changed. One process claims the warm-up, others wait until it is finished.
+    Must be called within an app context.
+
+    :param quantity: number of entries to fill an empty table with
+    :type quantity: int
+
+    :return: True if the warm-up was run by the current process, False if by another one
+    :rtype: bool
+    """
+    started_at = time.monotonic()
+    try:
+        create_tables()
+        while not claim_warm_up(current_app.config["WARM_UP_TIMEOUT"]):
+            _, duration = warm_up_progress()
+            if duration is not None:
+                warm_up_state.mark_ready(duration)
+                return False
+            time.sleep(CLAIM_POLL_SECONDS)
+
+        try:
+            if not DatabaseHandler.count_entries():
+                DatabaseHandler.rerecord_data(quantity)
+        except Exception:
+            db.session.rollback()
+            finish_warm_up(None)
+            raise
+        duration = time.monotonic() - started_at
+        finish_warm_up(duration)
+    except Exception as error:
+        warm_up_state.error = repr(error)
+        raise
+    finally:
+        db.session.remove()
+    warm_up_state.mark_ready(duration)
+    return True
+
+
+def start_warm_up_in_background(app):
+    """Runs the warm-up in a daemon thread, so the server can bind its port immediately.
+
+    :param app: app instance
+    :type app: class 'flask.app.Flask'
+    :return: thread running the warm-up
+    :rtype: class 'threading.Thread'
+    """
+
+    def run():
+        with app.app_context():
+            try:
+                warm_up(app.config["WARM_UP_QUANTITY"])
+            except Exception:
+                app.logger.exception("Warm-up failed")
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+@click.command("warm-up")
+@click.option(
+    "--quantity", type=int, help="Number of entries to fill an empty table with"
+)
+@with_appcontext
+def warm_up_command(quantity):
+    """Create the Person table and fill it if it is empty."""
+    if warm_up(quantity or current_app.config["WARM_UP_QUANTITY"]):
+        click.echo(f"Ready in {warm_up_state.time_to_ready:.2f}s")
+    else:
+        click.echo("Warmed up by another process")
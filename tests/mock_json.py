@@ -14473,7 +14473,7 @@ mock_json = {
                 "coordinates": {"latitude": "55.1189", "longitude": "101.8080"},
                 "timezone": {"offset": "-3:30", "description": "Newfoundland"},
             },
-            "email": "bhrh.rdyy@example.com",
+            "email": "bhrh.rdyy2@example.com",
             "cell": "0930-983-2299",
             "picture": {
                 "large": "https://randomuser.me/api/portraits/women/66.jpg",
@@ -17055,7 +17055,7 @@ mock_json = {
                     "description": "Eastern Australia, Guam, Vladivostok",
                 },
             },
-            "email": "syn.zraay@example.com",
+            "email": "syn.zraay2@example.com",
             "cell": "0988-369-6794",
             "picture": {
                 "large": "https://randomuser.me/api/portraits/men/59.jpg",
@@ -1,15 +1,66 @@
+import atexit
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
 import pytest
-import requests
+from PIL import Image
+from requests import HTTPError, Timeout
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+from flask import Response
 
-from persons_table import create_app
+from benchmarks.randomuser_stub import RandomUserStub
+from persons_table import (
+    aio,
+    create_app,
+    http_client,
+    models,
+    profiler,
+    replica_router,
+    warmup,
+)
+from persons_table.assets.build import build_assets
+from persons_table.config import API_SLICE_MAX_AGE, Config
+from persons_table.database import engine_options_for
+from persons_table.disk_cache import APIResponseCache, DiskCache
+from persons_table.health import routes as health_routes
+from persons_table.ingest import IngestionPipeline
 from persons_table.models import (
+    PERSON_COLUMNS,
     DatabaseHandler,
+    IngestionCheckpoint,
+    IngestionRun,
     Person,
+    WarmUp,
     bulk_insert_into_db,
     db,
     get_API_response,
+    insert_rows,
+    iter_API_results,
+    rows_from_columns,
+    serialize_API_columns,
     serialize_API_data,
+    serialize_API_rows,
 )
+from persons_table.outbound import HTTPClient
+from persons_table.persons import forms
+from persons_table.persons.forms import check_if_image
+from persons_table.profiling import PROFILING_HEADER, RateLimiter
+from persons_table.thumbnails.routes import thumbnail_url
 from tests.mock_json import mock_json
 
 # ---------- Testing working with API(response is mocked) and Database functionality----------- #
@@ -23,19 +74,62 @@ def app_and_client():
         yield app, client
 
 
+@pytest.fixture
+def empty_app_and_client(tmp_path):
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'empty.db'}"
+    with app.test_client() as client:
+        yield app, client
+
+
 class MockResponse:
-    """To help mocking requests.get.json("""
+    """To help mocking requests.get.json( and reading of a streamed response body"""
+
+    ok = True
+
+    def __init__(self):
+        self.content = json.dumps(mock_json).encode()
+        self.raw = io.BytesIO(self.content)
 
     @staticmethod
     def json():
         return mock_json
 
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class PictureResponse:
+    """To help mocking a streamed download of a picture"""
+
+    status_code = 200
+
+    def __init__(self, content, headers=None):
+        self.content = content
+        self.headers = {"content-type": "image/png", **(headers or {})}
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
 
 def test_serialization_functionality_with_mock(monkeypatch):
     def mock_get(*args, **kwargs):
         return MockResponse()
 
-    monkeypatch.setattr(requests, "get", mock_get)
+    monkeypatch.setattr(http_client, "get", mock_get)
 
     return_from_API_json = get_API_response(1000)
     result = serialize_API_data(return_from_API_json["results"])
@@ -48,7 +142,7 @@ def test_create_table_with_1000_entries(monkeypatch, app_and_client):
     def mock_get(*args, **kwargs):
         return MockResponse()
 
-    monkeypatch.setattr(requests, "get", mock_get)
+    monkeypatch.setattr(http_client, "get", mock_get)
 
     app = app_and_client[0]
     with app.app_context():
@@ -62,13 +156,20 @@ def test_bulk_insert_into_db(monkeypatch, app_and_client):
     def mock_get(*args, **kwargs):
         return MockResponse()
 
-    monkeypatch.setattr(requests, "get", mock_get)
+    monkeypatch.setattr(http_client, "get", mock_get)
 
     app = app_and_client[0]
     with app.app_context():
         return_from_API_json = get_API_response(1000)
         input_for_db = serialize_API_data(return_from_API_json["results"])
         bulk_insert_into_db(input_for_db)
+        # People with emails already in the database are skipped
+        assert DatabaseHandler.count_entries() == 1000
+
+        input_for_db = serialize_API_data(return_from_API_json["results"])
+        for person in input_for_db:
+            person.email = "copy." + person.email
+        bulk_insert_into_db(input_for_db)
         assert DatabaseHandler.count_entries() == 2000
 
 
@@ -168,6 +269,1102 @@ def test_delete_person_functionality(app_and_client):
     assert DatabaseHandler.count_entries() == 1995
 
 
+# ------------ Testing deduplication by email ---------------- #
+
+
+def test_duplicate_emails_are_skipped(monkeypatch, empty_app_and_client):
+    monkeypatch.setattr(forms, "check_if_image", lambda link: True)
+    app, client = empty_app_and_client
+    app.config["WTF_CSRF_ENABLED"] = False
+    rows = serialize_API_rows(mock_json["results"][:3])
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(rows + [dict(rows[0], email=f" {rows[0]['email'].upper()}")])
+        db.session.commit()
+        assert DatabaseHandler.count_entries() == 3
+
+    rv = client.post("/new_person", data=dict(rows[1], email=rows[0]["email"]))
+    assert rv.status_code == 200
+    assert b"Entry with this email already exists" in rv.data
+    rv = client.post("/edit-person/2", data=dict(rows[1], email=rows[2]["email"]))
+    assert b"Entry with this email already exists" in rv.data
+    with app.app_context():
+        assert DatabaseHandler.count_entries() == 3
+        assert DatabaseHandler.get_person_data(2).email == rows[1]["email"]
+
+
+def test_rerecord_data_tops_up_duplicates(monkeypatch, empty_app_and_client):
+    # Every response repeats some people collected before
+    offsets = iter([0, 70, 90])
+    monkeypatch.setattr(
+        models,
+        "open_API_response",
+        lambda quantity, seed=None, page=None: io.BytesIO(
+            json.dumps(
+                {"results": mock_json["results"][next(offsets) :][:quantity]}
+            ).encode()
+        ),
+    )
+    app, _ = empty_app_and_client
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(serialize_API_rows(mock_json["results"][:20]))
+        DatabaseHandler.rerecord_data(100)
+        assert DatabaseHandler.count_entries() == 100
+
+
+# ------------ Testing partial updates ---------------- #
+
+
+def test_partial_update_with_version(monkeypatch, empty_app_and_client):
+    monkeypatch.setattr(forms, "check_if_image", lambda link: True)
+    app, client = empty_app_and_client
+    app.config["WTF_CSRF_ENABLED"] = False
+    rows = serialize_API_rows(mock_json["results"][:1])
+    statements = []
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(rows)
+        db.session.commit()
+        event.listen(
+            db.engine,
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+
+    rv = client.get("/edit-person/1")
+    assert b'name="version" type="hidden" value="1"' in rv.data
+    rv = client.post("/edit-person/1", data=dict(rows[0], first_name="Anna", version=1))
+    assert rv.status_code == 302
+    updates = [sql for sql in statements if sql.startswith("UPDATE")]
+    assert len(updates) == 1
+    assert "first_name" in updates[0] and "email" not in updates[0]
+
+    rv = client.post("/edit-person/1", data=dict(rows[0], first_name="Bob", version=1))
+    assert rv.status_code == 409
+    assert b"changed by someone else" in rv.data
+    with app.app_context():
+        person_data = DatabaseHandler.get_person_data(1)
+        assert (person_data.first_name, person_data.version) == ("Anna", 2)
+    assert client.get("/edit-person/2").status_code == 404
+
+
+# ------------ Testing deletion ---------------- #
+
+
+def test_delete_person_without_reading_it(empty_app_and_client):
+    app, client = empty_app_and_client
+    statements = []
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(serialize_API_rows(mock_json["results"][:3]))
+        db.session.commit()
+        event.listen(
+            db.engine,
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+
+    assert client.get("/delete-person/1").status_code == 302
+    # Stats are changed with INSERT ... SELECT before the entry is deleted
+    assert [sql.split()[0] for sql in statements] == ["INSERT", "DELETE"]
+    assert client.get("/delete-person/1").status_code == 404
+    assert client.get("/person/1").status_code == 404
+
+
+def test_soft_delete(empty_app_and_client):
+    app, client = empty_app_and_client
+    rows = serialize_API_rows(mock_json["results"][:3])
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(rows)
+        db.session.commit()
+
+        assert DatabaseHandler.delete_person(1, soft=True)
+        assert not DatabaseHandler.delete_person(1, soft=True)
+        assert DatabaseHandler.delete_people([2, 3], soft=True) == 2
+        assert DatabaseHandler.count_entries() == 0
+        assert DatabaseHandler.get_person_data(1) is None
+        assert db.session.query(Person).count() == 3
+        # Emails of deleted entries can be taken again
+        insert_rows(rows[:1])
+        db.session.commit()
+        assert DatabaseHandler.count_entries() == 1
+
+        assert DatabaseHandler.purge_deleted_people(batch_size=2) == 3
+        assert db.session.query(Person).count() == 1
+    assert client.get("/person/1").status_code == 404
+    assert client.get("/person/4").status_code == 200
+
+
+# ------------ Testing stats ---------------- #
+
+
+def test_stats_follow_changes(monkeypatch, empty_app_and_client):
+    monkeypatch.setattr(forms, "check_if_image", lambda link: True)
+    app, client = empty_app_and_client
+    app.config["WTF_CSRF_ENABLED"] = False
+    rows = serialize_API_rows(mock_json["results"][:20])
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(rows)
+        # Duplicates are skipped and not counted
+        insert_rows(rows[:5])
+        db.session.commit()
+        DatabaseHandler.delete_person(1)
+        DatabaseHandler.delete_people([2, 3], soft=True)
+        DatabaseHandler.update_people(
+            [{"id": 4, "gender": "female", "email": "anna@example.org"}]
+        )
+        DatabaseHandler.rerecord_data(15)
+
+    client.post("/new_person", data=dict(rows[0], location="Amaurot, Utopia"))
+    client.post(
+        "/edit-person/5",
+        data=dict(rows[4], location="Anyder, Utopia", version=1),
+    )
+
+    with app.app_context():
+        stats = DatabaseHandler.get_stats()
+        DatabaseHandler.rebuild_stats()
+        assert stats == DatabaseHandler.get_stats()
+        assert sum(entries for _, entries in stats["gender"]) == 16
+        assert ("Utopia", 2) in stats["country"]
+        assert ("example.org", 1) in stats["email_domain"]
+
+    rv = client.get("/stats")
+    assert rv.status_code == 200
+    assert b"Utopia" in rv.data
+
+
+def test_stats_skip_rows_of_other_transactions(empty_app_and_client):
+    app, _ = empty_app_and_client
+    rows = serialize_API_rows(mock_json["results"][:11])
+    with app.app_context():
+        DatabaseHandler.create_table()
+        other_engine = create_engine(db.engine.url)
+        concurrent_rows = [rows.pop()]
+
+        def insert_concurrently(conn, cursor, statement, parameters, context, many):
+            # Another writer commits a row counted by itself right before the insert
+            if many and concurrent_rows:
+                with other_engine.begin() as connection:
+                    connection.execute(Person.__table__.insert(), concurrent_rows)
+                concurrent_rows.clear()
+
+        event.listen(db.engine, "before_cursor_execute", insert_concurrently)
+        insert_rows(rows)
+        db.session.commit()
+        event.remove(db.engine, "before_cursor_execute", insert_concurrently)
+        other_engine.dispose()
+
+        assert not concurrent_rows
+        assert DatabaseHandler.count_entries() == 11
+        stats = DatabaseHandler.get_stats()
+        assert sum(entries for _, entries in stats["gender"]) == 10
+
+
+# ------------ Testing thumbnails ---------------- #
+
+
+def test_thumbnail_proxy(monkeypatch, tmp_path):
+    class ThumbnailConfig(Config):
+        THUMBNAIL_CACHE_DIR = str(tmp_path)
+        THUMBNAIL_SIZE = 40
+
+    picture = io.BytesIO()
+    Image.new("RGB", (128, 96), "red").save(picture, "PNG")
+    requested = []
+    monkeypatch.setattr(
+        http_client,
+        "get",
+        lambda url, stream=False: requested.append(url)
+        or PictureResponse(picture.getvalue()),
+    )
+    app = create_app(ThumbnailConfig)
+    with app.test_request_context():
+        url = thumbnail_url("https://randomuser.me/api/portraits/women/7.jpg")
+
+    with app.test_client() as client:
+        rv = client.get(url)
+        assert rv.status_code == 200
+        assert rv.mimetype == "image/jpeg"
+        assert Image.open(io.BytesIO(rv.data)).size == (40, 30)
+        assert rv.cache_control.max_age == Config.THUMBNAIL_MAX_AGE
+        assert rv.cache_control.immutable
+        assert client.get(url).data == rv.data
+        rv = client.get(url, headers={"If-None-Match": rv.headers["ETag"]})
+        assert rv.status_code == 304
+        assert client.get("/thumbnail/forged").status_code == 404
+    # The smallest portrait that fits is downloaded once
+    assert requested == ["https://randomuser.me/api/portraits/thumb/women/7.jpg"]
+
+
+def test_thumbnail_proxy_errors(monkeypatch, tmp_path):
+    class ThumbnailConfig(Config):
+        THUMBNAIL_CACHE_DIR = str(tmp_path)
+
+    pictures = {"broken": b"not a picture"}
+
+    def mock_get(url, stream=False):
+        if "unreachable" in url:
+            raise Timeout("Read timed out")
+        return PictureResponse(pictures[url.rsplit("/", 1)[1][:-4]])
+
+    monkeypatch.setattr(http_client, "get", mock_get)
+    app = create_app(ThumbnailConfig)
+    with app.test_request_context():
+        unreachable_url = thumbnail_url("https://unreachable.example/1.png")
+        broken_url = thumbnail_url("https://example.com/broken.png")
+        huge_url = thumbnail_url("https://example.com/huge.png")
+
+    with app.test_client() as client:
+        assert client.get(unreachable_url).status_code == 502
+        assert client.get(broken_url).status_code == 502
+        huge_picture = io.BytesIO()
+        Image.new("RGB", (64, 64)).save(huge_picture, "PNG")
+        pictures["huge"] = huge_picture.getvalue()
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+        assert client.get(huge_url).status_code == 502
+    assert not list(tmp_path.iterdir())
+
+
+def test_thumbnail_proxy_oversized_picture(monkeypatch, tmp_path):
+    class ThumbnailConfig(Config):
+        THUMBNAIL_CACHE_DIR = str(tmp_path)
+        THUMBNAIL_MAX_SOURCE_BYTES = 1000
+
+    picture = io.BytesIO()
+    Image.new("RGB", (128, 128)).save(picture, "BMP")
+    responses = [
+        # Too large by the header, before any of the body is read
+        PictureResponse(b"", {"content-length": str(len(picture.getvalue()))}),
+        # Too large as it is read, without the header
+        PictureResponse(picture.getvalue()),
+    ]
+    monkeypatch.setattr(http_client, "get", lambda url, stream=False: responses.pop(0))
+    app = create_app(ThumbnailConfig)
+    with app.test_request_context():
+        url = thumbnail_url("https://example.com/big.bmp")
+
+    with app.test_client() as client:
+        assert client.get(url).status_code == 502
+        assert client.get(url).status_code == 502
+    assert not responses
+    assert not list(tmp_path.iterdir())
+
+
+def test_picture_sizes(empty_app_and_client):
+    app, client = empty_app_and_client
+    picture = mock_json["results"][0]["picture"]
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(serialize_API_rows(mock_json["results"][:2]))
+        db.session.commit()
+        person = DatabaseHandler.get_person_data(1)
+        assert person.pic_thumbnail_link == picture["thumbnail"]
+        assert person.pic_medium_link == picture["medium"]
+
+    page = client.get("/").get_data(as_text=True)
+    assert 'loading="lazy"' in page
+    assert page.count(" 48w, ") == 2 and page.count(" 128w") == 2
+
+    # Sizes of an old picture are not kept with a new one
+    rv = client.patch(
+        "/api/persons/bulk",
+        json={"persons": [{"id": 1, "pic_link": "https://example.com/me.png"}]},
+    )
+    assert rv.get_json() == {"updated": 1}
+    with app.app_context():
+        person = DatabaseHandler.get_person_data(1)
+        assert person.pic_thumbnail_link is None and person.pic_medium_link is None
+    assert client.get("/").get_data(as_text=True).count(" 128w") == 2
+
+
+# ------------ Testing batch API ---------------- #
+
+
+def test_bulk_delete_api(monkeypatch, empty_app_and_client):
+    app, client = empty_app_and_client
+    monkeypatch.setattr(models, "BULK_BATCH_SIZE", 2)
+    statements = []
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(serialize_API_rows(mock_json["results"][:10]))
+        db.session.commit()
+        event.listen(
+            db.engine,
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+
+    rv = client.post("/api/persons/bulk-delete", json={"ids": [1, 2, 3, 4, 5, 99]})
+    assert rv.get_json() == {"deleted": 5}
+    assert len([sql for sql in statements if sql.startswith("DELETE")]) == 3
+    assert client.post("/api/persons/bulk-delete", json={"ids": "1"}).status_code == 400
+    with app.app_context():
+        assert DatabaseHandler.count_entries() == 5
+
+
+def test_people_slices_api(empty_app_and_client):
+    app, client = empty_app_and_client
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(serialize_API_rows(mock_json["results"][:5]))
+        db.session.commit()
+        DatabaseHandler.delete_person(2, soft=True)
+
+    rv = client.get("/api/persons?limit=2")
+    assert [row["id"] for row in rv.get_json()["persons"]] == [1, 3]
+    assert rv.get_json()["next"] == 3
+    assert rv.get_json()["persons"][0]["url"] == "/person/1"
+    assert rv.cache_control.max_age == API_SLICE_MAX_AGE
+    assert client.get("/api/persons?limit=2&after=3").get_json() == {
+        "persons": client.get("/api/persons?limit=2&offset=2").get_json()["persons"],
+        "next": 5,
+    }
+    assert client.get("/api/persons?limit=2&after=5").get_json()["next"] is None
+    rv = client.get(
+        "/api/persons?limit=2", headers={"If-None-Match": rv.headers["ETag"]}
+    )
+    assert rv.status_code == 304
+    assert client.get("/api/persons?limit=0").status_code == 400
+    assert client.get("/api/persons?offset=-1").status_code == 400
+    page = client.get("/scroll").get_data(as_text=True)
+    assert 'data-total="4"' in page and "scrolling_table.js" in page
+
+
+def test_bulk_update_api(empty_app_and_client):
+    app, client = empty_app_and_client
+    rows = serialize_API_rows(mock_json["results"][:3])
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(rows)
+        db.session.commit()
+
+    rv = client.patch(
+        "/api/persons/bulk",
+        json={
+            "persons": [
+                {"id": 1, "first_name": "Anna", "email": "anna@example.com"},
+                {"id": 2, "first_name": "Bob"},
+                {"id": 99, "first_name": "Nobody"},
+            ]
+        },
+    )
+    assert rv.get_json() == {"updated": 2}
+    with app.app_context():
+        first, second, third = DatabaseHandler.all_records_query().all()
+        assert (first.first_name, first.email) == ("Anna", "anna@example.com")
+        assert (second.first_name, second.email) == ("Bob", rows[1]["email"])
+        assert third.first_name == rows[2]["first_name"]
+
+    rv = client.patch(
+        "/api/persons/bulk", json={"persons": [{"id": 2, "email": "ANNA@example.com"}]}
+    )
+    assert rv.status_code == 409
+    rv = client.patch("/api/persons/bulk", json={"persons": [{"id": 2, "age": "3"}]})
+    assert rv.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "person_data",
+    [{"email": "not-an-email"}, {"gender": "x" * 7}, {"first_name": "A" * 31}],
+)
+def test_bulk_update_api_rejects_invalid_values(person_data, empty_app_and_client):
+    app, client = empty_app_and_client
+    rows = serialize_API_rows(mock_json["results"][:2])
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(rows)
+        db.session.commit()
+
+    rv = client.patch(
+        "/api/persons/bulk",
+        json={"persons": [{"id": 1, "first_name": "Anna"}, dict(person_data, id=2)]},
+    )
+    assert rv.status_code == 400
+    assert rv.get_json()["id"] == 2
+    with app.app_context():
+        assert DatabaseHandler.get_person_data(1).first_name == rows[0]["first_name"]
+        assert DatabaseHandler.get_person_data(2).email == rows[1]["email"]
+
+
+# ------------ Testing ingestion pipeline ---------------- #
+
+
+def test_ingestion_pipeline_backpressure():
+    inserted = []
+
+    def slow_insert(rows, task):
+        time.sleep(0.02)
+        inserted.extend(rows)
+
+    pipeline = IngestionPipeline(
+        lambda quantity, page: list(range(page * 10, page * 10 + quantity)),
+        list,
+        slow_insert,
+        fetch_threads=2,
+        queue_size=1,
+    )
+    stats = pipeline.run([(10, page) for page in range(20)])
+    assert sorted(inserted) == list(range(200))
+    assert stats["insert"]["entries"] == stats["fetch"]["entries"] == 200
+    assert stats["responses_queue"]["max_depth"] == 1
+    assert stats["fetch"]["blocked_seconds"] > 0
+    assert stats["insert"]["throughput"] > 0
+
+
+def test_ingestion_pipeline_error():
+    def fetch(page):
+        if page == 3:
+            raise ConnectionError("API is down")
+        return [page]
+
+    pipeline = IngestionPipeline(fetch, list, lambda rows, task: None, 2, 1)
+    with pytest.raises(ConnectionError, match="API is down"):
+        pipeline.run([(page,) for page in range(10)])
+
+
+# ------------ Testing on-disk API response cache ---------------- #
+
+
+def test_API_response_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        models, "api_response_cache", APIResponseCache(str(tmp_path), 10**6)
+    )
+    with RandomUserStub() as stub:
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+
+        result = get_API_response(100, seed="abc")
+        assert get_API_response(100, seed="abc") == result
+        assert stub.requests_served == 1
+        get_API_response(100, seed="abc", page=2)
+        assert stub.requests_served == 2
+
+        monkeypatch.setattr(models, "API_CACHE_OFFLINE", True)
+        assert get_API_response(100, seed="abc") == result
+        with pytest.raises(ConnectionError):
+            get_API_response(100, seed="xyz")
+        assert stub.requests_served == 2
+
+
+def test_identical_reseeds_replayed_from_cache(
+    monkeypatch, tmp_path, empty_app_and_client
+):
+    monkeypatch.setattr(
+        models, "api_response_cache", APIResponseCache(str(tmp_path), 10**6)
+    )
+    app, _ = empty_app_and_client
+    with RandomUserStub() as stub, app.app_context():
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+        DatabaseHandler.create_table()
+        DatabaseHandler.rerecord_data(20)
+        emails = [person.email for person in DatabaseHandler.all_records_query()]
+        DatabaseHandler.rerecord_data(0)
+
+        monkeypatch.setattr(models, "API_CACHE_OFFLINE", True)
+        DatabaseHandler.rerecord_data(20)
+        assert [
+            person.email for person in DatabaseHandler.all_records_query()
+        ] == emails
+        assert stub.requests_served == 1
+
+
+def test_reseeds_random_without_cache(monkeypatch, empty_app_and_client):
+    monkeypatch.setattr(models, "api_response_cache", None)
+    monkeypatch.setattr(models, "INGEST_SEED", None)
+    assert models.reseed_seed(0) is None
+    app, _ = empty_app_and_client
+    with RandomUserStub() as stub, app.app_context():
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+        DatabaseHandler.create_table()
+        DatabaseHandler.rerecord_data(20)
+        emails = [person.email for person in DatabaseHandler.all_records_query()]
+        DatabaseHandler.rerecord_data(0)
+        DatabaseHandler.rerecord_data(20)
+        assert [
+            person.email for person in DatabaseHandler.all_records_query()
+        ] != emails
+
+    monkeypatch.setattr(models, "INGEST_SEED", "abc")
+    assert models.reseed_seed(0) == "abc-0"
+
+
+def test_streaming_API_results(monkeypatch, tmp_path):
+    with RandomUserStub() as stub:
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+        expected = get_API_response(2000, seed="abc")["results"]
+        assert list(iter_API_results(2000, seed="abc")) == expected
+
+        monkeypatch.setattr(
+            models, "api_response_cache", APIResponseCache(str(tmp_path), 10**7)
+        )
+        assert list(iter_API_results(2000, seed="abc")) == expected
+        assert list(iter_API_results(2000, seed="abc")) == expected
+        assert stub.requests_served == 3
+
+
+def test_streaming_API_error(monkeypatch, http_client_without_backoff):
+    with RandomUserStub(error_rate=1.0) as stub:
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+        with pytest.raises(HTTPError):
+            list(iter_API_results(10))
+
+
+def test_ingestion_pipeline_streams_pages(monkeypatch, empty_app_and_client):
+    app, _ = empty_app_and_client
+    get = http_client.get
+
+    def get_streamed(*args, **kwargs):
+        assert kwargs.get("stream")
+        return get(*args, **kwargs)
+
+    def load_whole_body(*args, **kwargs):
+        raise AssertionError("Response body is parsed as a whole")
+
+    with RandomUserStub() as stub, app.app_context():
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+        monkeypatch.setattr(models, "INGEST_CHUNK_SIZE", 100)
+        monkeypatch.setattr(models, "api_response_cache", None)
+        monkeypatch.setattr(http_client, "get", get_streamed)
+        monkeypatch.setattr(models.json, "loads", load_whole_body)
+        DatabaseHandler.create_table()
+        DatabaseHandler.rerecord_data(300, processes=0)
+        assert DatabaseHandler.count_entries() == 300
+        assert stub.requests_served == 3
+
+
+def test_disk_cache_lru_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    for number in range(3):
+        cache.set(cache.key_for(number), bytes(100))
+        os.utime(cache.path_for(cache.key_for(number)), (number, number))
+    assert cache.get(cache.key_for(0)) is None
+    assert cache.get(cache.key_for(1)) == bytes(100)
+
+    cache.set(cache.key_for(3), bytes(100))
+    assert cache.get(cache.key_for(1)) == bytes(100)
+    assert cache.get(cache.key_for(2)) is None
+
+
+# ------------ Testing warm-up and readiness ---------------- #
+
+
+def test_warm_up_command(monkeypatch, empty_app_and_client):
+    def mock_get(*args, **kwargs):
+        return MockResponse()
+
+    monkeypatch.setattr(http_client, "get", mock_get)
+    monkeypatch.setattr(warmup, "warm_up_state", warmup.WarmUpState())
+    monkeypatch.setattr(health_routes, "warm_up_state", warmup.warm_up_state)
+
+    app, client = empty_app_and_client
+    assert client.get("/ready").status_code == 503
+
+    result = app.test_cli_runner().invoke(args=["warm-up", "--quantity", "1000"])
+    assert result.exit_code == 0
+    assert "Ready in" in result.output
+    rv = client.get("/ready")
+    assert rv.status_code == 200
+    assert rv.get_json()["time_to_ready"] > 0
+
+    app.test_cli_runner().invoke(args=["warm-up", "--quantity", "10"])
+    with app.app_context():
+        assert DatabaseHandler.count_entries() == 1000
+
+
+def test_concurrent_warm_ups(monkeypatch, empty_app_and_client):
+    requested = []
+    monkeypatch.setattr(
+        http_client,
+        "get",
+        lambda *args, **kwargs: requested.append(args) or MockResponse(),
+    )
+    monkeypatch.setattr(warmup, "warm_up_state", warmup.WarmUpState())
+    monkeypatch.setattr(warmup, "CLAIM_POLL_SECONDS", 0.01)
+    app, _ = empty_app_and_client
+    warmed_up = []
+
+    def run_warm_up():
+        with app.app_context():
+            warmed_up.append(warmup.warm_up(1000))
+
+    threads = [threading.Thread(target=run_warm_up) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(warmed_up) == [False, True]
+    assert len(requested) == 1
+    with app.app_context():
+        assert DatabaseHandler.count_entries() == 1000
+        # Another process reports the duration of the warm-up
+        state = warmup.WarmUpState()
+        assert state.is_ready()
+        assert state.time_to_ready == warmup.warm_up_state.time_to_ready > 0
+
+
+def test_abandoned_warm_up_claimed_again(monkeypatch, empty_app_and_client):
+    monkeypatch.setattr(http_client, "get", lambda *args, **kwargs: MockResponse())
+    monkeypatch.setattr(warmup, "warm_up_state", warmup.WarmUpState())
+    app, _ = empty_app_and_client
+    with app.app_context():
+        DatabaseHandler.create_table()
+        abandoned_at = datetime.utcnow() - timedelta(
+            seconds=app.config["WARM_UP_TIMEOUT"] + 1
+        )
+        db.session.add(WarmUp(id=1, started_at=abandoned_at))
+        db.session.commit()
+        assert not warmup.WarmUpState().is_ready()
+        assert warmup.warm_up(10)
+        assert DatabaseHandler.count_entries() == 1000
+
+
+def test_ready_when_warmed_up_by_another_process(monkeypatch, app_and_client):
+    monkeypatch.setattr(health_routes, "warm_up_state", warmup.WarmUpState())
+    client = app_and_client[1]
+    assert client.get("/ready").status_code == 200
+
+
+def test_health_with_pool_stats(empty_app_and_client):
+    app, client = empty_app_and_client
+    rv = client.get("/health")
+    assert rv.status_code == 200
+    stats = rv.get_json()["pools"]["primary"]
+    assert stats["pool"] == "NullPool" and stats["connects"] >= 1
+    assert rv.get_json()["pools"]["replicas"] == []
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:////missing/directory/app.db"
+    rv = client.get("/health")
+    assert rv.status_code == 503
+    assert rv.get_json()["error"] == "OperationalError"
+
+
+def test_pool_options():
+    options = dict(Config.SQLALCHEMY_ENGINE_OPTIONS, statement_timeout=5000)
+    sqlite_options = engine_options_for(make_url("sqlite:///app.db"), options)
+    assert sqlite_options["pool_pre_ping"]
+    assert "pool_size" not in sqlite_options
+    assert "statement_timeout" not in sqlite_options
+    postgres_options = engine_options_for(make_url("postgresql://db/app"), options)
+    assert postgres_options["pool_size"] == options["pool_size"]
+    assert postgres_options["connect_args"] == {"options": "-c statement_timeout=5000"}
+    asyncpg_options = engine_options_for(
+        make_url("postgresql+asyncpg://db/app"), options
+    )
+    assert asyncpg_options["connect_args"] == {
+        "server_settings": {"statement_timeout": "5000"}
+    }
+
+
+# ------------ Testing startup time ---------------- #
+
+# Generous for slow CI machines, importing takes about 0.45 s on a laptop
+IMPORT_TIME_BUDGET_US = 1500000
+
+
+def test_serving_process_import_time():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import wsgi"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, "MIGRATE_ENABLED": "0"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times = {}
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, module_name = line.split("|")
+        import_times[module_name.strip()] = int(cumulative)
+
+    for lazy_module in ("requests", "flask_migrate", "alembic"):
+        assert lazy_module not in import_times
+    assert import_times["wsgi"] < IMPORT_TIME_BUDGET_US
+
+
+# ------------ Testing async views ---------------- #
+
+
+class AsyncViewsConfig(Config):
+    ASYNC_VIEWS_ENABLED = True
+    WTF_CSRF_ENABLED = False
+
+
+def test_async_views(monkeypatch, tmp_path):
+    app = create_app(AsyncViewsConfig)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'async.db'}"
+    with app.app_context():
+        DatabaseHandler.create_table()
+    client = app.test_client()
+
+    with RandomUserStub() as stub:
+        monkeypatch.setattr(aio, "RANDOMUSER_API_URL", stub.url)
+
+        rv = client.post("/async/", data={"quantity": 2500})
+        assert rv.status_code == 302
+        # Entries dropped as duplicates of generated emails are topped up
+        assert stub.requests_served >= 3
+        with app.app_context():
+            assert DatabaseHandler.count_entries() == 2500
+
+        rv = client.get("/async/index/9")
+        assert rv.status_code == 200
+        # Links lead to async views
+        assert b'href="/async/person/2401"' in rv.data
+        assert b'href="/async/index/8"' in rv.data
+        assert client.get("/async/index/10").status_code == 404
+        rv = client.get("/async/person/1")
+        assert rv.status_code == 200
+        assert b'href="/async/edit-person/1"' in rv.data
+        assert client.get("/async/person/2501").status_code == 404
+
+        person_data = {
+            "first_name": "Esther",
+            "last_name": "Ellis",
+            "gender": "female",
+            "cell": "(484)-889-2170",
+            "email": "esther.ellis@example.com",
+            "location": "Denton, United States",
+            "pic_link": f"{stub.base_url}/api/portraits/women/85.jpg",
+        }
+        rv = client.post("/async/new_person", data=person_data)
+        assert rv.status_code == 302
+        rv = client.post(
+            "/async/edit-person/2501", data={**person_data, "pic_link": stub.url}
+        )
+        assert b"Link does not lead to an image" in rv.data
+        rv = client.post(
+            "/async/edit-person/2501", data={**person_data, "first_name": "Célia"}
+        )
+        assert rv.status_code == 302
+
+    with app.app_context():
+        assert DatabaseHandler.count_entries() == 2501
+        assert DatabaseHandler.get_person_data(2501).first_name == "Célia"
+    client.post("/async/", data={"quantity": 100})
+    with app.app_context():
+        assert DatabaseHandler.count_entries() == 100
+        db.session.remove()
+
+
+# ------------ Testing compression ---------------- #
+
+
+def test_response_compression(empty_app_and_client):
+    app, client = empty_app_and_client
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(serialize_API_rows(mock_json["results"][:20]))
+        db.session.commit()
+
+    plain = client.get("/")
+    assert "Content-Encoding" not in plain.headers
+    rv = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert rv.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in rv.vary
+    assert len(rv.data) < len(plain.data) / 3
+    # Pages have CSRF tokens with timestamps, JSON is the same every time
+    plain = client.get("/api/persons")
+    rv = client.get("/api/persons", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(rv.data) == plain.data
+    etag = rv.headers["ETag"]
+    assert etag.startswith("W/")
+    rv = client.get(
+        "/api/persons", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert rv.status_code == 304
+    # Responses below the minimum size are not compressed
+    rv = client.get("/api/persons?after=20", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in rv.headers
+
+
+def test_streamed_response_compression():
+    app = create_app()
+    rows = [f"{number},{'x' * 100}\n" for number in range(100)]
+    sent = []
+
+    def generate_rows():
+        for row in rows:
+            sent.append(row)
+            yield row
+
+    app.add_url_rule(
+        "/rows.csv", "rows", lambda: Response(generate_rows(), mimetype="text/csv")
+    )
+    with app.test_client() as client:
+        rv = client.get(
+            "/rows.csv", headers={"Accept-Encoding": "gzip"}, buffered=False
+        )
+        assert rv.headers["Content-Encoding"] == "gzip"
+        assert "Content-Length" not in rv.headers
+        # Every row is flushed, so the first part decompresses before the others are made
+        chunks = iter(rv.response)
+        first_chunk = next(chunks)
+        assert zlib.decompressobj(31).decompress(first_chunk) == rows[0].encode()
+        assert len(sent) == 1
+        body = first_chunk + b"".join(chunks)
+        assert gzip.decompress(body) == "".join(rows).encode()
+        rv.close()
+
+
+def test_built_assets(tmp_path):
+    class AssetsConfig(Config):
+        ASSETS_BUILD_DIR = str(tmp_path)
+
+    app = create_app(AssetsConfig)
+    manifest = build_assets(app.static_folder, str(tmp_path))
+    styles = manifest["files"]["css/styles.css"]
+    assert styles.startswith("css/styles.") and "gzip" in manifest["encodings"][styles]
+    with open(os.path.join(app.static_folder, "css", "styles.css"), "rb") as css:
+        original = css.read()
+
+    app = create_app(AssetsConfig)
+    with app.test_client() as client:
+        page = client.get("/new_person").get_data(as_text=True)
+        assert f"/assets/{styles}" in page
+        rv = client.get(f"/assets/{styles}", headers={"Accept-Encoding": "gzip"})
+        assert rv.headers["Content-Encoding"] == "gzip"
+        assert rv.mimetype == "text/css"
+        assert rv.cache_control.immutable
+        assert rv.cache_control.max_age == Config.ASSETS_MAX_AGE
+        assert gzip.decompress(rv.data) == original
+        rv.close()
+        rv = client.get(f"/assets/{styles}")
+        assert "Content-Encoding" not in rv.headers and rv.data == original
+        rv.close()
+        assert client.get("/assets/css/styles.css").status_code == 404
+
+
+# ------------ Testing read replicas ---------------- #
+
+
+def test_read_replicas(tmp_path):
+    class ReplicaConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_REPLICA_URIS = [
+            f"sqlite:///{tmp_path / f'replica{number}.db'}" for number in (1, 2)
+        ]
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(serialize_API_rows(mock_json["results"][:3]))
+        db.session.commit()
+    for number in (1, 2):
+        shutil.copy(tmp_path / "primary.db", tmp_path / f"replica{number}.db")
+        with sqlite3.connect(tmp_path / f"replica{number}.db") as connection:
+            connection.execute("UPDATE person SET first_name = ?", (f"R{number}",))
+
+    def first_name(client):
+        return client.get("/api/persons?limit=1").get_json()["persons"][0]["first_name"]
+
+    with app.test_client() as client:
+        names = [first_name(client) for _ in range(4)]
+        assert set(names) == {"R1", "R2"} and names[0] != names[1] == names[3]
+        rv = client.patch(
+            "/api/persons/bulk", json={"persons": [{"id": 1, "first_name": "Me"}]}
+        )
+        assert rv.get_json() == {"updated": 1}
+        # The client reads its own change from the primary database for a while
+        assert [first_name(client) for _ in range(2)] == ["Me", "Me"]
+    with app.test_client() as client:
+        assert first_name(client) in ("R1", "R2")
+
+    app.config["REPLICA_CHOICE"] = "least-connections"
+    busy_replica, _ = replica_router.get_engines(app)
+    with busy_replica.connect(), app.test_client() as client:
+        assert [first_name(client) for _ in range(3)] == ["R2", "R2", "R2"]
+
+
+def test_random_person_page_with_lagging_replicas(tmp_path):
+    class ReplicaConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_REPLICA_URIS = [
+            f"sqlite:///{tmp_path / f'replica{number}.db'}" for number in (1, 2)
+        ]
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        DatabaseHandler.create_table()
+        insert_rows(serialize_API_rows(mock_json["results"][:2]))
+        db.session.commit()
+    # Every replica has only the entry the other one lacks
+    for number in (1, 2):
+        shutil.copy(tmp_path / "primary.db", tmp_path / f"replica{number}.db")
+        with sqlite3.connect(tmp_path / f"replica{number}.db") as connection:
+            connection.execute("DELETE FROM person WHERE id != ?", (number,))
+
+    with app.test_client() as client:
+        for _ in range(4):
+            assert client.get("/random").status_code == 200
+
+
+# ------------ Testing request profiling ---------------- #
+
+
+def test_profiling_with_signed_header(monkeypatch, app_and_client, tmp_path):
+    app, client = app_and_client
+    app.config["PROFILING_ENABLED"] = True
+    app.config["PROFILING_DIR"] = str(tmp_path)
+    token = profiler.generate_token(app)
+
+    rv = client.get("/person/2")
+    assert rv.status_code == 200
+    assert not list(tmp_path.iterdir())
+
+    rv = client.get("/person/2", headers={PROFILING_HEADER: "forged"})
+    assert rv.status_code == 200
+    assert not list(tmp_path.iterdir())
+
+    rv = client.get("/person/2", headers={PROFILING_HEADER: token})
+    assert rv.status_code == 200
+    assert len(list(tmp_path.glob("*.collapsed"))) == 1
+    speedscope_file = next(tmp_path.glob("*.speedscope.json"))
+    assert json.loads(speedscope_file.read_text())["profiles"][0]["type"] == "sampled"
+
+    for profile in tmp_path.iterdir():
+        profile.unlink()
+    expiry = time.time() + app.config["PROFILING_TOKEN_MAX_AGE"] + 1
+    monkeypatch.setattr(time, "time", lambda: expiry)
+    rv = client.get("/person/2", headers={PROFILING_HEADER: token})
+    assert rv.status_code == 200
+    assert not list(tmp_path.iterdir())
+
+
+def test_profiling_rate_limit():
+    rate_limiter = RateLimiter(max_per_minute=2)
+    assert rate_limiter.acquire()
+    assert rate_limiter.acquire()
+    assert not rate_limiter.acquire()
+
+
+# ------------ Testing with a local randomuser.me stand-in ---------------- #
+
+
+def test_API_response_from_local_stub(monkeypatch):
+    with RandomUserStub() as stub:
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+
+        result = get_API_response(10, seed="abc", page=2)
+        assert len(result["results"]) == 10
+        assert result["info"]["seed"] == "abc"
+        assert set(result["results"][0]) == {
+            "gender",
+            "name",
+            "cell",
+            "email",
+            "location",
+            "picture",
+        }
+        assert get_API_response(10, seed="abc", page=2) == result
+        assert get_API_response(10, seed="abc", page=3) != result
+        assert isinstance(serialize_API_data(result["results"])[0], Person)
+
+
+@pytest.fixture
+def http_client_without_backoff(monkeypatch):
+    monkeypatch.setitem(http_client.settings, "HTTP_BACKOFF_FACTOR", 0)
+    http_client.close()
+    yield http_client
+    http_client.close()
+
+
+def test_local_stub_error_rate(monkeypatch, http_client_without_backoff):
+    with RandomUserStub(error_rate=1.0) as stub:
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+        assert "error" in get_API_response(10)
+        assert stub.requests_served == 1 + http_client.settings["HTTP_RETRIES"]
+
+
+def test_pooled_http_client(http_client_without_backoff):
+    with RandomUserStub() as stub:
+        link = f"{stub.base_url}/api/portraits/women/1.jpg"
+        assert check_if_image(link)
+        assert not check_if_image(stub.url)
+        pool = http_client.session.get_adapter(link).poolmanager.connection_from_url(
+            link
+        )
+        assert pool.num_connections == 1
+        assert pool.num_requests == 2
+
+
+def test_http_client_closed_at_exit_once(monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    create_app()
+    create_app()
+    assert not registered
+    client = HTTPClient(create_app())
+    assert registered == [client.close]
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_parallel_rerecord_data(monkeypatch, empty_app_and_client, start_method):
+    app, _ = empty_app_and_client
+    monkeypatch.setattr(
+        models,
+        "ProcessPoolExecutor",
+        partial(
+            ProcessPoolExecutor, mp_context=multiprocessing.get_context(start_method)
+        ),
+    )
+    with RandomUserStub() as stub, app.app_context():
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+        monkeypatch.setattr(models, "INGEST_CHUNK_SIZE", 100)
+        DatabaseHandler.create_table()
+
+        DatabaseHandler.rerecord_data(250, processes=2, seed="abc")
+        assert DatabaseHandler.count_entries() == 250
+        assert stub.requests_served == 3
+        third_page = get_API_response(50, seed="abc", page=3)["results"]
+        assert DatabaseHandler.get_person_data(201).email == third_page[0]["email"]
+
+        API_results = get_API_response(5, seed="abc")["results"]
+    columns = serialize_API_columns(API_results)
+    assert len(columns) == len(PERSON_COLUMNS)
+    assert rows_from_columns(columns) == serialize_API_rows(API_results)
+
+
+def test_resumed_rerecord_data(monkeypatch, empty_app_and_client):
+    app, _ = empty_app_and_client
+    open_API_response = models.open_API_response
+    fetched_pages = []
+
+    def fetch_failing_on_page_3(quantity, seed=None, page=None):
+        if page == 3:
+            raise ConnectionError("Connection dropped")
+        return open_API_response(quantity, seed, page)
+
+    def fetch_recording_pages(quantity, seed=None, page=None):
+        fetched_pages.append((seed, page))
+        return open_API_response(quantity, seed, page)
+
+    with RandomUserStub() as stub, app.app_context():
+        monkeypatch.setattr(models, "RANDOMUSER_API_URL", stub.url)
+        monkeypatch.setattr(models, "INGEST_CHUNK_SIZE", 100)
+        DatabaseHandler.create_table()
+
+        monkeypatch.setattr(models, "open_API_response", fetch_failing_on_page_3)
+        with pytest.raises(ConnectionError):
+            DatabaseHandler.rerecord_data(500, checkpointed=True)
+        seed = db.session.query(IngestionRun).one().seed
+        completed_pages = {
+            checkpoint.page for checkpoint in db.session.query(IngestionCheckpoint)
+        }
+        assert 3 not in completed_pages
+        assert DatabaseHandler.count_entries() <= 100 * len(completed_pages)
+
+        monkeypatch.setattr(models, "open_API_response", fetch_recording_pages)
+        DatabaseHandler.rerecord_data(500, checkpointed=True)
+        assert DatabaseHandler.count_entries() == 500
+        resumed_pages = {page for page_seed, page in fetched_pages if page_seed == seed}
+        assert resumed_pages == {1, 2, 3, 4, 5} - completed_pages
+        assert db.session.query(IngestionRun).count() == 0
+        assert db.session.query(IngestionCheckpoint).count() == 0
+
+
 # --------- test of API Response (response is not mocked) ----------- #
 def test_API_response():
     result = get_API_response(10)
@@ -1,10 +1,14 @@
+import os
+
 from persons_table import create_app
-from persons_table.models import DatabaseHandler
+from persons_table.warmup import start_warm_up_in_background
 
 app = create_app()
 
 if __name__ == "__main__":
-    with app.app_context():
-        DatabaseHandler.create_table()
-        DatabaseHandler.rerecord_data(1000)
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    debug = True
+    # The reloader of debug mode runs this module in a watching process too,
+    # only the process serving requests warms up
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warm_up_in_background(app)
+    app.run(debug=debug, host="0.0.0.0", port=5000)